@@ -1,60 +1,131 @@
+import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
-from django.template.loader import render_to_string
 from dotenv import dotenv_values
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 config = dotenv_values(".env")
 
+EMAIL_TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'templates')
+
+
+class EmailTemplates:
+    """
+    Compiled email templates, loaded once per process.
+
+    Jinja2 keeps every compiled template in the environment's cache. With DEBUG on it
+    checks the file's modification time on each lookup so edits show up without a restart.
+    """
+    _environment = None
+
+    @classmethod
+    def environment(cls):
+        if cls._environment is None:
+            cls._environment = Environment(
+                loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+                autoescape=select_autoescape(['html']),
+                auto_reload=settings.DEBUG,
+                cache_size=-1
+            )
+        return cls._environment
+
+    @staticmethod
+    def template_name(html_template):
+        # Callers pass paths like '../templates/create_password.html', relative to the templates directory
+        path = os.path.normpath(os.path.join(EMAIL_TEMPLATES_DIR, html_template))
+        return os.path.relpath(path, EMAIL_TEMPLATES_DIR).replace(os.sep, '/')
+
+    @classmethod
+    def get_template(cls, html_template):
+        return cls.environment().get_template(cls.template_name(html_template))
+
+
 class CustomEmailBackend(BaseEmailBackend):
-    
+
     def __init__(self, email_messages, html_template):
         self.email_messages = email_messages
         self.html_template = html_template
-    
-    @classmethod
-    def send_messages(cls, email_messages,html_template):
-        EMAIL_HOST = config['EMAIL_HOST']
-        EMAIL_PASSWORD = config['EMAIL_HOST_PASSWORD']
-        EMAIL_USER = config['EMAIL_HOST_USER']
-        EMAIL_PORT = config['EMAIL_PORT']
-        EMAIL_USE_TLS = config['EMAIL_USE_TLS']
-        DEFAULT_FROM_EMAIL = config['DEFAULT_FROM_EMAIL']
-                
-        html_content = render_to_string(html_template, {'data': email_messages})
-        
-        # Create a Jinja2 environment with the HTML template
-        env = Environment(loader=FileSystemLoader(html_template))
-        template = env.from_string(html_content)
-
-        # Render the template with the provided context
-        rendered_template = template.render({'data': email_messages})
-    
+
+    @staticmethod
+    def render_message(email_messages, html_template):
+        # Render the compiled template with the provided context
+        return EmailTemplates.get_template(html_template).render({'data': email_messages})
+
+    @staticmethod
+    def build_message(receiver, subject, html_content):
         # Create a multipart message and set the headers
         msg = MIMEMultipart()
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = email_messages['receiver_details']
-        msg['Subject'] = email_messages['subject']
+        msg['From'] = config['DEFAULT_FROM_EMAIL']
+        msg['To'] = receiver
+        msg['Subject'] = subject
 
         # Attach the rendered HTML content as the email body
-        msg.attach(MIMEText(rendered_template, 'html'))
-        
+        msg.attach(MIMEText(html_content, 'html'))
+        return msg
+
+    @staticmethod
+    def open_connection():
         # Create a secure SSL/TLS connection to the SMTP server
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
+        server = smtplib.SMTP(config['EMAIL_HOST'], config['EMAIL_PORT'])
         # server.set_debuglevel(1)
-        if EMAIL_USE_TLS=="True":
+        if config['EMAIL_USE_TLS']=="True":
             server.starttls()
 
         # Login to the email account
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
+        server.login(config['EMAIL_HOST_USER'], config['EMAIL_HOST_PASSWORD'])
+        return server
+
+    @classmethod
+    def send_message(cls, server, receiver, subject, html_content):
+        """Send one rendered email over an already open connection"""
+        msg = cls.build_message(receiver, subject, html_content)
+        server.sendmail(config['DEFAULT_FROM_EMAIL'], receiver, msg.as_string())
+
+    @classmethod
+    def send_messages(cls, email_messages,html_template):
+        rendered_template = cls.render_message(email_messages, html_template)
+
+        server = cls.open_connection()
 
         # Send the email
-        server.sendmail(DEFAULT_FROM_EMAIL, email_messages['receiver_details'], msg.as_string())
+        cls.send_message(server, email_messages['receiver_details'], email_messages['subject'], rendered_template)
 
         # Disconnect from the server
         server.quit()
 
-        return True
\ No newline at end of file
+        return True
+
+    @classmethod
+    def queue_messages(cls, email_messages, html_template):
+        """
+        Render the email and store it in the outbox instead of sending it.
+
+        Call this inside the request's transaction: the email only becomes visible to the
+        send_queued_emails worker if the transaction commits.
+        """
+        from Accounts.models import OutgoingEmail
+
+        return OutgoingEmail.objects.create(
+            email_recipient = email_messages['receiver_details'],
+            email_subject = email_messages['subject'],
+            email_body = cls.render_message(email_messages, html_template)
+        )
+
+    @classmethod
+    def queue_bulk_messages(cls, email_messages_list, html_template):
+        """Render one email per context with the same template and queue them with a single insert"""
+        from Accounts.models import OutgoingEmail
+
+        template = EmailTemplates.get_template(html_template)
+        return OutgoingEmail.objects.bulk_create([
+            OutgoingEmail(
+                email_recipient = email_messages['receiver_details'],
+                email_subject = email_messages['subject'],
+                email_body = template.render({'data': email_messages})
+            )
+            for email_messages in email_messages_list
+        ])
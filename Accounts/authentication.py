@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class TokenRevocation:
+    """
+    Revoked tokens, kept in the Django cache until they would have expired anyway.
+
+    Only consulted when JWT_REVOCATION_ENABLED is set, and only effective across
+    processes when CACHES points at a shared backend.
+    """
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'JWT_REVOCATION_ENABLED', False)
+
+    @staticmethod
+    def token_key(jti):
+        return f"accounts:revoked_token:{jti}"
+
+    @staticmethod
+    def user_key(user_id):
+        return f"accounts:revoked_user:{user_id}"
+
+    @staticmethod
+    def revoke_token(token):
+        remaining = int(token.get('exp', 0) - time.time())
+        if remaining > 0:
+            cache.set(TokenRevocation.token_key(token[api_settings.JTI_CLAIM]), True, remaining)
+
+    @staticmethod
+    def revoke_user(user_id):
+        """Revoke every token issued to the user up to now"""
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        cache.set(TokenRevocation.user_key(user_id), int(time.time()), int(lifetime.total_seconds()))
+
+    @staticmethod
+    def is_revoked(token):
+        keys = [
+            TokenRevocation.token_key(token.get(api_settings.JTI_CLAIM)),
+            TokenRevocation.user_key(token.get(api_settings.USER_ID_CLAIM)),
+        ]
+        revoked = cache.get_many(keys)
+        if revoked.get(keys[0]):
+            return True
+        revoked_before = revoked.get(keys[1])
+        return revoked_before is not None and token.get('iat', 0) <= revoked_before
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates from the access token alone and returns a TokenUser, no database
+    query is made. Revoked tokens are rejected when JWT_REVOCATION_ENABLED is set.
+
+    The user is never loaded, so is_active is not checked: only used for reads, through
+    ClaimsReadAuthenticationMixin. The default JWTAuthentication covers everything else.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if TokenRevocation.enabled() and TokenRevocation.is_revoked(validated_token):
+            raise InvalidToken({"detail": "Token has been revoked", "code": "token_revoked"})
+        return validated_token
+
+
+class ClaimsReadAuthenticationMixin:
+    """
+    View mixin authenticating read requests with ClaimsJWTAuthentication, so they cost no
+    auth query. Writes go through the default authentication classes, which load the user
+    and reject deactivated ones.
+    """
+
+    def get_authenticators(self):
+        # Called before the DRF request exists, self.request is still the HttpRequest
+        if self.request.method in SAFE_METHODS:
+            return [ClaimsJWTAuthentication()]
+        return super().get_authenticators()
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    target_class = 'Accounts.authentication.ClaimsJWTAuthentication'
@@ -0,0 +1,66 @@
+import io
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from Accounts.EmailUtils import CustomEmailBackend
+from Accounts.models import OutgoingEmail, OutgoingEmailStatusChoice
+
+BENCHMARK_SUBJECT = 'Outbox benchmark'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how fast send_queued_emails drains the outbox into a local SMTP server, against "
+        "one connection per email. Everything written is rolled back. Needs requirements-dev.txt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=50, help="Emails claimed per transaction")
+
+    def handle(self, *args, **options):
+        # Imported here so the command list loads without the development requirements
+        from Accounts.testing import local_smtp_server
+
+        if OutgoingEmail.objects.filter(email_status=OutgoingEmailStatusChoice.PENDING).exists():
+            raise CommandError("The outbox has pending emails, run the benchmark against an empty outbox")
+        count = options['emails']
+        body = '<p>Your mission was updated.</p>\n' * 40
+
+        with local_smtp_server() as handler:
+            started = time.perf_counter()
+            for number in range(count):
+                server = CustomEmailBackend.open_connection()
+                CustomEmailBackend.send_message(server, f'user{number}@example.com', BENCHMARK_SUBJECT, body)
+                server.quit()
+            per_email = time.perf_counter() - started
+            if len(handler.messages) != count:
+                raise CommandError(f"The server got {len(handler.messages)} of {count} emails")
+            handler.messages.clear()
+            handler.logins = 0
+
+            try:
+                with transaction.atomic():
+                    OutgoingEmail.objects.bulk_create([
+                        OutgoingEmail(email_recipient=f'user{number}@example.com', email_subject=BENCHMARK_SUBJECT, email_body=body)
+                        for number in range(count)
+                    ])
+                    started = time.perf_counter()
+                    call_command('send_queued_emails', batch_size=options['batch_size'], stdout=io.StringIO())
+                    drained = time.perf_counter() - started
+                    sent = OutgoingEmail.objects.filter(email_status=OutgoingEmailStatusChoice.SENT).count()
+                    raise Rollback
+            except Rollback:
+                pass
+
+        if sent != count or len(handler.messages) != count:
+            raise CommandError(f"The outbox sent {sent} and the server got {len(handler.messages)} of {count} emails")
+        self.stdout.write(f"one connection per email  {count / per_email:8.0f} emails/s")
+        self.stdout.write(f"send_queued_emails        {count / drained:8.0f} emails/s over {handler.logins} connection(s)")
+        self.stdout.write(self.style.SUCCESS(f"The outbox drains {per_email / drained:.1f}x faster"))
@@ -0,0 +1,120 @@
+import smtplib
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from Accounts.EmailUtils import CustomEmailBackend
+from Accounts.models import OutgoingEmail, OutgoingEmailStatusChoice
+
+# Delay before the first retry, doubled on every further attempt
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+
+# Seconds a claimed email is held for the worker sending it
+CLAIM_LEASE = 600
+
+
+class Command(BaseCommand):
+    help = "Send the queued outgoing emails in batches over a single SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Emails claimed per transaction")
+        parser.add_argument('--max-attempts', type=int, default=5, help="Attempts before an email is marked failed")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting when it is empty")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to wait between polls with --loop")
+
+    def handle(self, *args, **options):
+        self.server = None
+        sent = failed = 0
+        try:
+            while True:
+                batch_sent, batch_failed, claimed = self.send_batch(options['batch_size'], options['max_attempts'])
+                sent += batch_sent
+                failed += batch_failed
+                if claimed:
+                    continue
+                if not options['loop']:
+                    break
+                # Do not hold an idle connection open between polls
+                self.close_connection()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close_connection()
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} failed"))
+
+    def send_batch(self, batch_size, max_attempts):
+        """Claim due emails, send them and record the outcome. Returns (sent, failed, claimed)"""
+        emails = self.claim_batch(batch_size)
+
+        # Sent outside any transaction, a slow server must not hold row locks
+        sent = failed = 0
+        for email in emails:
+            try:
+                self.deliver(email)
+            except (smtplib.SMTPException, OSError) as error:
+                # A rejected message leaves the connection usable, anything else may not
+                if not isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)):
+                    self.close_connection()
+                email.email_last_error = str(error)
+                if email.email_attempts >= max_attempts:
+                    email.email_status = OutgoingEmailStatusChoice.FAILED
+                    failed += 1
+                else:
+                    delay = min(RETRY_BASE_DELAY * 2 ** (email.email_attempts - 1), RETRY_MAX_DELAY)
+                    email.email_next_attempt_at = timezone.now() + timedelta(seconds=delay)
+                self.stderr.write(f"Could not send email {email.email_unique_id} to {email.email_recipient}: {error}")
+                continue
+            email.email_status = OutgoingEmailStatusChoice.SENT
+            email.email_sent_date = timezone.now()
+            email.email_last_error = ''
+            sent += 1
+
+        OutgoingEmail.objects.bulk_update(emails, [
+            'email_status', 'email_next_attempt_at', 'email_last_error', 'email_sent_date'
+        ])
+        return sent, failed, len(emails)
+
+    def claim_batch(self, batch_size):
+        """
+        Claim due emails in a transaction of their own: the attempt is counted and the email
+        leased for CLAIM_LEASE seconds, so other workers skip it. An email whose worker dies
+        before recording the outcome is retried once the lease runs out, and may then be
+        delivered twice.
+        """
+        with transaction.atomic():
+            # Rows claimed by another worker are skipped instead of waited on
+            emails = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(email_status=OutgoingEmailStatusChoice.PENDING, email_next_attempt_at__lte=timezone.now())
+                .order_by('email_next_attempt_at', 'primary_key')[:batch_size]
+            )
+            leased_until = timezone.now() + timedelta(seconds=CLAIM_LEASE)
+            for email in emails:
+                email.email_attempts += 1
+                email.email_next_attempt_at = leased_until
+            OutgoingEmail.objects.bulk_update(emails, ['email_attempts', 'email_next_attempt_at'])
+        return emails
+
+    def deliver(self, email):
+        if self.server is None:
+            self.server = CustomEmailBackend.open_connection()
+        try:
+            CustomEmailBackend.send_message(self.server, email.email_recipient, email.email_subject, email.email_body)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection, reconnect once and retry
+            self.server = CustomEmailBackend.open_connection()
+            CustomEmailBackend.send_message(self.server, email.email_recipient, email.email_subject, email.email_body)
+
+    def close_connection(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.server = None
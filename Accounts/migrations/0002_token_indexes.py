@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forgotpasswordrequestuser',
+            name='request_token',
+            field=models.CharField(db_index=True, default=None, editable=False, max_length=300),
+        ),
+        migrations.AddIndex(
+            model_name='accountactivationrequestusers',
+            index=models.Index(fields=['account_activation_token', 'account_activation_is_used', 'account_activation_is_active'], name='account_activation_token_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Case-insensitive prefix indexes for the user directory search, matching the
+# UPPER(column::text) LIKE UPPER('term%') that istartswith compiles to on PostgreSQL
+SEARCH_INDEXES = [
+    ('auth_user_email_upper_idx', 'auth_user', 'email'),
+    ('user_profiles_org_upper_idx', 'user_profiles', 'profile_organization'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} (UPPER(({column})::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Accounts', '0002_token_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
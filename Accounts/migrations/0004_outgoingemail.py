@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:15
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Accounts', '0003_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('primary_key', models.AutoField(primary_key=True, serialize=False)),
+                ('email_unique_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('email_recipient', models.CharField(max_length=9000)),
+                ('email_subject', models.CharField(default='', max_length=9000)),
+                ('email_body', models.TextField()),
+                ('email_status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('email_attempts', models.PositiveIntegerField(default=0)),
+                ('email_next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('email_last_error', models.TextField(blank=True, default='')),
+                ('email_created_date', models.DateTimeField(auto_now_add=True)),
+                ('email_sent_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'OUTGOING EMAILS',
+                'db_table': 'outgoing_emails',
+                'ordering': ['primary_key'],
+                'indexes': [models.Index(fields=['email_status', 'email_next_attempt_at'], name='outgoing_email_due_idx')],
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 import uuid
 from datetime import datetime,timedelta
+from django.utils import timezone
 
 class ProfileTypeChoice(models.TextChoices):
     SUPER_ADMIN = "Super Admin"
@@ -38,6 +39,12 @@ class AccountActivationRequestUsers(models.Model):
         db_table = 'account_activation_request'
         ordering = ['-primary_key']
         verbose_name_plural = "ACCOUNT ACTIVATION REQUESTS"
+        indexes = [
+            models.Index(
+                fields=['account_activation_token', 'account_activation_is_used', 'account_activation_is_active'],
+                name='account_activation_token_idx'
+            ),
+        ]
 
     def __str__(self):
         return "{} - {}".format(self.account_activation_user, self.account_activation_token)
@@ -46,7 +53,7 @@ class AccountActivationRequestUsers(models.Model):
 class ForgotPasswordRequestUser(models.Model):
     primary_key = models.AutoField(primary_key=True)
     request_user = models.ForeignKey(User, related_name='request_profile', on_delete=models.CASCADE)
-    request_token = models.CharField(max_length=300, editable=False, default=None)
+    request_token = models.CharField(max_length=300, editable=False, default=None, db_index=True)
     request_is_used = models.BooleanField(default=False)
     request_is_active = models.BooleanField(default=True)
     request_created_date = models.DateTimeField(auto_now_add=True)
@@ -100,4 +107,34 @@ class UsersWithRoles(models.Model):
     class Meta:
         db_table = 'user_with_roles'
         ordering = ['-primary_key']
-        verbose_name_plural = "USERS WITH ROLES"
\ No newline at end of file
+        verbose_name_plural = "USERS WITH ROLES"
+
+class OutgoingEmailStatusChoice(models.TextChoices):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class OutgoingEmail(models.Model):
+    primary_key = models.AutoField(primary_key=True)
+    email_unique_id = models.UUIDField(editable=False, default=uuid.uuid4, unique=True)
+    email_recipient = models.CharField(max_length=9000)
+    email_subject = models.CharField(default='', max_length=9000)
+    email_body = models.TextField()
+    email_status = models.CharField(default=OutgoingEmailStatusChoice.PENDING, choices=OutgoingEmailStatusChoice.choices, max_length=20)
+    email_attempts = models.PositiveIntegerField(default=0)
+    email_next_attempt_at = models.DateTimeField(default=timezone.now)
+    email_last_error = models.TextField(default='', blank=True)
+    email_created_date = models.DateTimeField(auto_now_add=True)
+    email_sent_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'outgoing_emails'
+        ordering = ['primary_key']
+        verbose_name_plural = "OUTGOING EMAILS"
+        indexes = [
+            models.Index(fields=['email_status', 'email_next_attempt_at'], name='outgoing_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email_recipient} - {self.email_subject} ({self.email_status})"
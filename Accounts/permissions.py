@@ -0,0 +1,33 @@
+from rest_framework.permissions import BasePermission
+from Accounts.utils import RoleUtils
+
+VENDOR_ROLE = "vendor"
+ADMIN_ROLE = "admin"
+
+
+class HasRole(BasePermission):
+    """
+    Allows authenticated users holding any of allowed_roles. Roles come from the
+    in-process role cache, so a cache hit costs no query.
+    """
+    allowed_roles = ()
+    message = "You do not have the role required to perform this action."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return RoleUtils.user_has_role(user.pk, *self.allowed_roles)
+
+
+class IsVendor(HasRole):
+    allowed_roles = (VENDOR_ROLE,)
+
+
+class IsAdmin(HasRole):
+    allowed_roles = (ADMIN_ROLE,)
+
+
+def has_role(*role_names):
+    """Build a permission class for roles created at runtime, e.g. has_role("driver", "admin")"""
+    return type(f"HasRole_{'_'.join(role_names)}", (HasRole,), {'allowed_roles': role_names})
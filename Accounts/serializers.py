@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from Accounts.authentication import TokenRevocation
 from Accounts.models import *
 from django.contrib.auth.password_validation import validate_password
 
@@ -7,19 +10,26 @@ from django.contrib.auth.password_validation import validate_password
 class CustomTokenSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
-        
-        # Get the user from the token
-        user = self.user
-        
+
         # Get the user's role
-        user_with_role = UsersWithRoles.objects.filter(user_with_role_user=user).first()
+        user_with_role = UsersWithRoles.objects.filter(user_with_role_user=self.user).select_related('user_with_role_role').first()
         if user_with_role:
-            role = user_with_role.user_with_role_role
-            data.update({'role': role.role_name})
-        
+            data.update({'role': user_with_role.user_with_role_role.role_name})
+
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        if TokenRevocation.enabled() and TokenRevocation.is_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken({"detail": "Token has been revoked", "code": "token_revoked"})
+        return super().validate(attrs)
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+
 class UserProfileSerializer(serializers.Serializer):
     profile_unique_id = serializers.CharField(required = False, allow_blank = True)
     profile_organization = serializers.CharField(required=False, allow_blank=True)
@@ -52,12 +62,30 @@ class GetUserProfileSerializer(serializers.Serializer):
     user_role = UserRolesSerializer()
 
 
-class AllUsersResponseSerializer(serializers.Serializer):
-    total_pages = serializers.IntegerField()
-    current_page = serializers.IntegerField()
-    total_users = serializers.IntegerField()
-    users_per_page = serializers.IntegerField()
-    data = GetUserProfileSerializer(many = True)
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """
+    Output-only serializer for the user directory, reads the profile and role loaded with
+    select_related('profile') and the prefetched role_user relation.
+    """
+    profile_unique_id = serializers.UUIDField(source='profile.profile_unique_id', read_only=True)
+    profile_organization = serializers.CharField(source='profile.profile_organization', read_only=True)
+    profile_firstname = serializers.CharField(source='first_name', read_only=True)
+    profile_lastname = serializers.CharField(source='last_name', read_only=True)
+    profile_email = serializers.EmailField(source='email', read_only=True)
+    profile_phone = serializers.CharField(source='profile.profile_phone', read_only=True)
+    profile_type = serializers.CharField(source='profile.profile_type', read_only=True)
+    user_role = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'profile_unique_id', 'profile_organization', 'profile_firstname', 'profile_lastname',
+                  'profile_email', 'profile_phone', 'profile_type', 'user_role']
+
+    def get_user_role(self, user):
+        user_roles = user.role_user.all()
+        if not user_roles:
+            return None
+        return UserRolesSerializer(user_roles[0].user_with_role_role).data
 
 
 class AccountActivationSerializer(serializers.Serializer):
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from Accounts.models import UsersWithRoles, UserProfile
+from Accounts.authentication import TokenRevocation
+from Accounts.models import UserRoles, UsersWithRoles, UserProfile
+from Accounts.utils import RoleUtils
 from food_track.models import Vendor, Contact
 from datetime import datetime
 import logging
@@ -38,4 +40,29 @@ def create_vendor_contact(sender, instance, created, **kwargs):
             except Exception as contact_error:
                 logger.error(f"Failed to create contact: {str(contact_error)}")
     except Exception as e:
-        logger.error(f"Error in create_vendor_contact signal: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error in create_vendor_contact signal: {str(e)}")
+
+@receiver(post_save, sender=User)
+def revoke_deactivated_user_tokens(sender, instance, created, **kwargs):
+    """
+    Signal to revoke the tokens of a user who is deactivated. Stateless authentication
+    never reloads the user, so without this the tokens stay valid until they expire.
+    """
+    if not created and not instance.is_active and TokenRevocation.enabled():
+        TokenRevocation.revoke_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UsersWithRoles)
+def invalidate_user_roles(sender, instance, **kwargs):
+    """
+    Signal to drop the cached roles of a user when a role is granted or removed
+    """
+    RoleUtils.invalidate_user(instance.user_with_role_user_id)
+
+
+@receiver([post_save, post_delete], sender=UserRoles)
+def invalidate_all_roles(sender, instance, **kwargs):
+    """
+    Signal to drop every cached role when a role is renamed, deactivated or deleted
+    """
+    RoleUtils.invalidate_all()
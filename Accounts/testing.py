@@ -0,0 +1,68 @@
+"""SMTP stand-in shared by the tests and email_outbox_benchmark, needs requirements-dev.txt"""
+import logging
+import socket
+from contextlib import contextmanager
+from unittest import mock
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from Accounts import EmailUtils
+
+
+class RecordingHandler:
+    """aiosmtpd handler keeping the delivered messages, and refusing the recipients in refused"""
+
+    def __init__(self):
+        self.messages = []
+        self.logins = 0
+        self.refused = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return '550 Mailbox unavailable'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        return '250 Message accepted for delivery'
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=True)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_smtp_server():
+    """
+    An SMTP server in a background thread, with the email settings pointed at it while the
+    block runs. Yields its RecordingHandler.
+    """
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(
+        handler, hostname='127.0.0.1', port=port,
+        authenticator=handler.authenticate, auth_require_tls=False
+    )
+    # aiosmtpd logs a deprecation warning on every login
+    logging.getLogger('mail.log').setLevel(logging.ERROR)
+    controller.start()
+    settings = {
+        'EMAIL_HOST': '127.0.0.1',
+        'EMAIL_PORT': str(port),
+        'EMAIL_USE_TLS': 'False',
+        'EMAIL_HOST_USER': 'outbox',
+        'EMAIL_HOST_PASSWORD': 'outbox',
+        'DEFAULT_FROM_EMAIL': 'outbox@example.com',
+    }
+    try:
+        with mock.patch.dict(EmailUtils.config, settings):
+            yield handler
+    finally:
+        controller.stop()
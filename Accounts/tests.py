@@ -1,3 +1,154 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework_simplejwt.models import TokenUser
+from Accounts import EmailUtils
+from Accounts.management.commands.send_queued_emails import CLAIM_LEASE, RETRY_BASE_DELAY, Command as SendQueuedEmails
+from Accounts.models import OutgoingEmail, OutgoingEmailStatusChoice
+from Accounts.testing import free_port, local_smtp_server
+from Accounts.utils import RoleUtils
+from food_track.testing import client_for, create_vendor_user
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        RoleUtils.invalidate_all()
+        self.vendor, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+
+    def test_vendor_portal_reads_use_token_claims(self):
+        response = self.client.get('/api/vendor/trucks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.renderer_context['request'].user, TokenUser)
+
+    def test_writes_load_the_user(self):
+        response = self.client.post('/api/vendor/trucks/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIsInstance(response.renderer_context['request'].user, User)
+
+    def test_deactivated_user_cannot_write(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(
+            '/api/vendor/trucks/',
+            {'vehicle_name': 'T1', 'year': 2020, 'model': 'M', 'capacity': 100},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(self.vendor.truck_set.exists())
+
+    def test_deactivated_user_is_rejected_outside_the_vendor_portal(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/missions/').status_code, 401)
+
+
+class OutboxTests(TestCase):
+    """send_queued_emails against an SMTP server running in the test process"""
+
+    def queue(self, *recipients):
+        return [
+            OutgoingEmail.objects.create(email_recipient=recipient, email_subject='Hello', email_body='<p>Hello</p>')
+            for recipient in recipients
+        ]
+
+    def drain(self, **options):
+        call_command('send_queued_emails', stdout=io.StringIO(), stderr=io.StringIO(), **options)
+
+    def test_queue_is_drained_over_one_connection(self):
+        emails = self.queue(*(f'user{number}@example.com' for number in range(7)))
+        with local_smtp_server() as server:
+            self.drain(batch_size=3)
+        self.assertEqual(sorted(rcpt_tos[0] for _, rcpt_tos, _ in server.messages), sorted(e.email_recipient for e in emails))
+        self.assertEqual(server.logins, 1)
+        self.assertFalse(OutgoingEmail.objects.exclude(email_status=OutgoingEmailStatusChoice.SENT).exists())
+
+    def test_refused_email_is_retried_with_backoff(self):
+        refused, delivered = self.queue('refused@example.com', 'ok@example.com')
+        with local_smtp_server() as server:
+            server.refused.add(refused.email_recipient)
+            before = timezone.now()
+            self.drain()
+            refused.refresh_from_db()
+            self.assertEqual(refused.email_status, OutgoingEmailStatusChoice.PENDING)
+            self.assertEqual(refused.email_attempts, 1)
+            self.assertIn('550', refused.email_last_error)
+            self.assertGreaterEqual(refused.email_next_attempt_at, before + timedelta(seconds=RETRY_BASE_DELAY))
+
+            # Not due yet
+            self.drain()
+            refused.refresh_from_db()
+            self.assertEqual(refused.email_attempts, 1)
+
+            # The delay doubles on the next failure
+            OutgoingEmail.objects.filter(pk=refused.pk).update(email_next_attempt_at=timezone.now())
+            before = timezone.now()
+            self.drain()
+            refused.refresh_from_db()
+            self.assertEqual(refused.email_attempts, 2)
+            self.assertGreaterEqual(refused.email_next_attempt_at, before + timedelta(seconds=2 * RETRY_BASE_DELAY))
+
+            # Delivered once the server accepts it
+            server.refused.clear()
+            OutgoingEmail.objects.filter(pk=refused.pk).update(email_next_attempt_at=timezone.now())
+            self.drain()
+        refused.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual(refused.email_status, OutgoingEmailStatusChoice.SENT)
+        self.assertEqual(refused.email_last_error, '')
+        self.assertEqual(delivered.email_status, OutgoingEmailStatusChoice.SENT)
+        self.assertEqual(delivered.email_attempts, 1)
+
+    def test_email_fails_after_max_attempts(self):
+        email, = self.queue('refused@example.com')
+        with local_smtp_server() as server:
+            server.refused.add(email.email_recipient)
+            for _ in range(3):
+                OutgoingEmail.objects.filter(pk=email.pk).update(email_next_attempt_at=timezone.now())
+                self.drain(max_attempts=3)
+        email.refresh_from_db()
+        self.assertEqual(email.email_status, OutgoingEmailStatusChoice.FAILED)
+        self.assertEqual(email.email_attempts, 3)
+        self.assertEqual(server.messages, [])
+
+    def test_unreachable_server_is_retried(self):
+        email, = self.queue('user@example.com')
+        closed_port = {'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': str(free_port())}
+        with mock.patch.dict(EmailUtils.config, closed_port):
+            self.drain()
+        email.refresh_from_db()
+        self.assertEqual(email.email_status, OutgoingEmailStatusChoice.PENDING)
+        self.assertEqual(email.email_attempts, 1)
+        self.assertNotEqual(email.email_last_error, '')
+
+    def test_interrupted_worker_leaves_the_email_leased(self):
+        email, = self.queue('user@example.com')
+        before = timezone.now()
+        with mock.patch.object(SendQueuedEmails, 'deliver', side_effect=KeyboardInterrupt):
+            self.drain()
+        email.refresh_from_db()
+        self.assertEqual(email.email_status, OutgoingEmailStatusChoice.PENDING)
+        self.assertEqual(email.email_attempts, 1)
+        self.assertGreaterEqual(email.email_next_attempt_at, before + timedelta(seconds=CLAIM_LEASE))
+
+
+class OutboxClaimTests(TransactionTestCase):
+    def test_claim_commits_before_sending(self):
+        OutgoingEmail.objects.create(email_recipient='user@example.com', email_subject='Hello', email_body='<p>Hello</p>')
+        deliveries = []
+
+        def deliver(command, email):
+            deliveries.append((transaction.get_connection().in_atomic_block, OutgoingEmail.objects.get(pk=email.pk).email_attempts))
+
+        with mock.patch.object(SendQueuedEmails, 'deliver', autospec=True, side_effect=deliver):
+            call_command('send_queued_emails', stdout=io.StringIO())
+        self.assertEqual(deliveries, [(False, 1)])
+        self.assertEqual(OutgoingEmail.objects.get().email_status, OutgoingEmailStatusChoice.SENT)
@@ -1,5 +1,4 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from Accounts.views import *
 
@@ -11,7 +10,8 @@ urlpatterns = [
     path("forgot_password/", view=ForgotPasswordView.as_view(), name="forgot_password"),
     path("reset_password/", view=ResetPasswordView.as_view(), name="reset_password"),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', RevokeTokenView.as_view(), name='token_revoke'),
     path('users/', view=GetAllUsersView.as_view(), name="get_all_users"),
     path('users/me', view=GetUser.as_view(), name="get_user"),
 ]
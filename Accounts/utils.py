@@ -1,7 +1,87 @@
+import threading
+import time
 import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from Accounts.models import UsersWithRoles
 
 class UserUtils:
     @staticmethod
     def get_unique_token():
         token = str(uuid.uuid4())
         return token
+
+
+class RoleCache:
+    """
+    Per-process LRU cache of user id -> role names. Entries expire after timeout seconds,
+    which bounds how stale another process can be after a role change.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            roles, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return roles
+
+    def set(self, user_id, roles):
+        with self._lock:
+            self._entries[user_id] = (roles, time.monotonic() + self.timeout)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+role_cache = RoleCache(
+    max_size=getattr(settings, 'ROLE_CACHE_SIZE', 10000),
+    timeout=getattr(settings, 'ROLE_CACHE_TIMEOUT', 60)
+)
+
+
+class RoleUtils:
+    @staticmethod
+    def get_user_roles(user_id):
+        """Names of the active roles of a user, served from role_cache when possible"""
+        roles = role_cache.get(user_id)
+        if roles is None:
+            roles = frozenset(
+                UsersWithRoles.objects.filter(
+                    user_with_role_user_id=user_id,
+                    user_with_role_role__role_is_active=True
+                ).values_list('user_with_role_role__role_name', flat=True)
+            )
+            role_cache.set(user_id, roles)
+        return roles
+
+    @staticmethod
+    def user_has_role(user_id, *role_names):
+        return not RoleUtils.get_user_roles(user_id).isdisjoint(role_names)
+
+    @staticmethod
+    def invalidate_user(user_id):
+        role_cache.delete(user_id)
+
+    @staticmethod
+    def invalidate_all():
+        role_cache.clear()
@@ -1,18 +1,23 @@
 from django.utils import timezone
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Prefetch, Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 import pytz
 from dotenv import dotenv_values
 from datetime import datetime, timedelta
 from Accounts.models import *
 from Accounts.EmailUtils import CustomEmailBackend
+from Accounts.authentication import TokenRevocation
 from Accounts.serializers import *
 from Accounts.utils import UserUtils
 
@@ -33,6 +38,45 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenSerializer
 
 
+class CustomTokenRefreshView(TokenRefreshView):
+    """
+    Takes a refresh token and returns a new access token carrying the same role and
+    vendor claims. Revoked refresh tokens are rejected.
+    """
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class RevokeTokenView(APIView):
+    """
+    Revokes the access token used for this request and, if given, a refresh token.
+    Requires JWT_REVOCATION_ENABLED.
+    """
+    http_method_names = ["post"]
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def post(request):
+        if not TokenRevocation.enabled():
+            return Response({"error": "Token revocation is not enabled"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TokenRevokeSerializer(data = request.data)
+        serializer.is_valid(raise_exception=True)
+
+        tokens = [request.auth]
+        if serializer.validated_data.get("refresh"):
+            try:
+                refresh = RefreshToken(serializer.validated_data["refresh"])
+            except TokenError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if refresh[api_settings.USER_ID_CLAIM] != request.user.id:
+                return Response({"error": "Refresh token belongs to another user"}, status=status.HTTP_400_BAD_REQUEST)
+            tokens.append(refresh)
+
+        for token in tokens:
+            TokenRevocation.revoke_token(token)
+        return Response({"success": True, "message": "Token revoked"}, status=status.HTTP_200_OK)
+
+
 class CreateUserView(APIView):
     """
     Creates a new user account in the system.
@@ -89,7 +133,8 @@ class CreateUserView(APIView):
             'subject': "WFP portal Account activation"
         }
 
-        CustomEmailBackend.send_messages(body, '../templates/create_password.html')
+        # Sent by the send_queued_emails worker once this transaction commits
+        CustomEmailBackend.queue_messages(body, '../templates/create_password.html')
         return Response({"success": True, "data": serializer.data}, status=status.HTTP_201_CREATED)
         
         # # Return validation errors
@@ -275,7 +320,11 @@ class ChangePasswordView(APIView):
                 return Response({"success": False, "data": "Incorrect password"})
             user.set_password(serializer["new_password"])
             user.save()
-            
+
+            # Tokens issued with the old password stop working
+            if TokenRevocation.enabled():
+                TokenRevocation.revoke_user(user.pk)
+
             return Response({"success": True, "message":"password changed successful"}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             print(e)
@@ -292,43 +341,46 @@ class CreateUserRolesView(viewsets.ModelViewSet):
 
 class GetAllUsersView(APIView):
     """
-    Lists all users with pagination.
+    Lists users a page at a time, ordered by id.
+    
+    Pass the returned next_cursor as ?after= to get the following page and ?page_size= to
+    change the page length. ?search= matches the start of the email or organization.
     """
     # permission_classes = [IsAdminUser]
     
     @staticmethod
     def get(request):
-        users = User.objects.all()
-        page_number = request.query_params.get("page", 1)
-        page_size = 1
-
-        paginator = Paginator(users, page_size)
         try:
-            paginated_users = paginator.page(page_number)
-        except PageNotAnInteger:
+            page_size = int(request.query_params.get("page_size", settings.API_PAGE_SIZE))
+            after = int(request.query_params.get("after", 0))
+        except ValueError:
             return Response(
-                {"error": "Invalid page number."}, 
+                {"error": "page_size and after must be integers."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except EmptyPage:
-            return Response(
-                {"error": "Page number out of range."}, 
-                status=status.HTTP_404_NOT_FOUND
+        page_size = max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+        users = User.objects.select_related("profile").prefetch_related(
+            Prefetch("role_user", queryset=UsersWithRoles.objects.select_related("user_with_role_role"))
+        ).filter(id__gt=after).order_by("id")
+
+        search = request.query_params.get("search")
+        if search:
+            users = users.filter(
+                Q(email__istartswith=search) | Q(profile__profile_organization__istartswith=search)
             )
-        
-        data = list(map(lambda x: get_user_data(x.pk), paginated_users))
+
+        # Fetch one extra row to know whether another page follows, instead of a COUNT(*)
+        page = list(users[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
 
         response = {
-            "total_pages": paginator.num_pages,
-            "current_page": paginated_users.number,
-            "total_users": paginator.count,
             "users_per_page": page_size,
-            "data" : data
+            "next_cursor": page[-1].id if has_more else None,
+            "data": UserDirectorySerializer(page, many=True).data
         }
-
-        serializer = AllUsersResponseSerializer(data = response)
-        serializer.is_valid(raise_exception=True)
-        return Response(serializer.data, status = status.HTTP_200_OK)
+        return Response(response, status = status.HTTP_200_OK)
     
 
 class GetUser(APIView):
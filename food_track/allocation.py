@@ -0,0 +1,267 @@
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from food_track.models import Cargo, CargoItems, Mission, Truck, TrucksForMission, TruckCargoItem
+from food_track.caching import invalidate_responses
+from food_track.realtime import publish_allocation_changes, publish_event
+from food_track.summaries import schedule_summary_refresh
+from food_track.sync import record_mission_changes
+
+
+class CargoAllocationError(Exception):
+    """Raised when a cargo allocation request is rejected, carries the list of error messages"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def parse_cargo_request(cargo_items):
+    """
+    Normalise a list of {"cargo_item_id", "quantity"} dicts into {cargo item uuid: quantity}.
+    Later entries for the same cargo item replace earlier ones.
+    """
+    requested = {}
+    errors = []
+    for item in cargo_items:
+        if not item.get('cargo_item_id') or not item.get('quantity'):
+            errors.append("Each cargo item must have cargo_item_id and quantity")
+            continue
+        try:
+            cargo_item_id = uuid.UUID(str(item['cargo_item_id']))
+            quantity = int(item['quantity'])
+        except (TypeError, ValueError):
+            errors.append(f"Invalid cargo item entry {item}")
+            continue
+        if quantity <= 0:
+            errors.append(f"Quantity for cargo item {cargo_item_id} must be positive")
+            continue
+        requested[cargo_item_id] = quantity
+    return requested, errors
+
+
+@transaction.atomic
+def allocate_cargo_to_truck(truck_mission, cargo_items):
+    """
+    Replace the cargo loaded on a truck assignment with the requested list.
+
+    The assignment and every affected CargoItems row are locked once, availability and truck
+    capacity are checked in memory and the allocations are written in bulk. Either the whole
+    list is applied or nothing is, so concurrent requests cannot over-allocate a cargo item.
+    """
+    requested, errors = parse_cargo_request(cargo_items)
+    if errors:
+        raise CargoAllocationError(errors)
+
+    # Serialise concurrent changes to the same assignment
+    truck_mission = TrucksForMission.objects.select_for_update(of=('self',)).select_related('truck').get(
+        pk=truck_mission.pk
+    )
+    mission_cargo = Cargo.objects.filter(mission_id=truck_mission.mission_id).order_by('id').first()
+    if not mission_cargo:
+        raise CargoAllocationError(["No cargo found for this mission"])
+
+    existing = {
+        allocation.cargo_item_id: allocation
+        for allocation in TruckCargoItem.objects.filter(truck_mission=truck_mission)
+    }
+
+    # Lock the requested items and the ones being released, in primary key order to avoid deadlocks
+    locked_items = CargoItems.objects.select_for_update(of=('self',)).select_related('product').filter(
+        Q(cargo=mission_cargo, unique_id__in=list(requested)) | Q(pk__in=list(existing))
+    ).order_by('pk')
+    items_by_uuid = {item.unique_id: item for item in locked_items}
+
+    total_quantity = 0
+    for cargo_item_id, quantity in requested.items():
+        cargo_item = items_by_uuid.get(cargo_item_id)
+        if cargo_item is None or cargo_item.cargo_id != mission_cargo.id:
+            errors.append(f"Cargo item with ID {cargo_item_id} not found or doesn't belong to this mission")
+            continue
+
+        current = existing[cargo_item.pk].transferring_quantity if cargo_item.pk in existing else 0
+        available = cargo_item.quantity - cargo_item.allocated_quantity + current
+        if quantity > available:
+            errors.append(f"Cargo item {cargo_item.product.name} only has {available} units available")
+            continue
+        total_quantity += quantity
+
+    if not errors and total_quantity > truck_mission.truck.capacity:
+        errors.append(f"Total cargo quantity ({total_quantity}) exceeds truck capacity ({truck_mission.truck.capacity})")
+    if errors:
+        raise CargoAllocationError(errors)
+
+    # Released allocations give their quantity back through the post_delete signal
+    requested_pks = {items_by_uuid[cargo_item_id].pk for cargo_item_id in requested}
+    released = [allocation.pk for cargo_item_pk, allocation in existing.items() if cargo_item_pk not in requested_pks]
+    if released:
+        TruckCargoItem.objects.filter(pk__in=released).delete()
+
+    # bulk_update() does not apply auto_now, stamp the changed rows explicitly
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    changed_items = []
+    for cargo_item_id, quantity in requested.items():
+        cargo_item = items_by_uuid[cargo_item_id]
+        allocation = existing.get(cargo_item.pk)
+        if allocation is None:
+            to_create.append(TruckCargoItem(
+                truck_mission=truck_mission,
+                cargo_item=cargo_item,
+                transferring_quantity=quantity
+            ))
+            delta = quantity
+        else:
+            delta = quantity - allocation.transferring_quantity
+            if delta:
+                allocation.transferring_quantity = quantity
+                allocation.updated_at = now
+                to_update.append(allocation)
+        if delta:
+            cargo_item.allocated_quantity += delta
+            cargo_item.updated_at = now
+            changed_items.append(cargo_item)
+
+    TruckCargoItem.objects.bulk_create(to_create)
+    TruckCargoItem.objects.bulk_update(to_update, ['transferring_quantity', 'updated_at'])
+    CargoItems.objects.bulk_update(changed_items, ['allocated_quantity', 'updated_at'])
+
+    # Every allocation of this assignment is now one of the requested ones
+    truck_mission.assigned_load = total_quantity
+    truck_mission.save(update_fields=['assigned_load', 'updated_at'])
+
+    # Bulk writes skip the model signals
+    schedule_summary_refresh([truck_mission.mission_id])
+    record_mission_changes([truck_mission.mission_id])
+    publish_allocation_changes([truck_mission.pk])
+    invalidate_responses(CargoItems, TruckCargoItem)
+
+    return truck_mission
+
+
+class BulkAssignmentError(Exception):
+    """Raised when any row of a bulk truck assignment is rejected, carries the per-row results"""
+
+    def __init__(self, results):
+        super().__init__(results)
+        self.results = results
+
+
+@transaction.atomic
+def assign_trucks_to_mission(vendor, mission, assignments):
+    """
+    Create many truck assignments for a mission, each with its cargo list.
+
+    The mission's cargo items are locked once and every row is validated against that single
+    snapshot, so rows in the same request also compete for the remaining quantity. Rows are
+    written with bulk inserts and the whole request is applied or rejected together.
+    Returns the created TrucksForMission instances in request order.
+    """
+    results = [{'index': index, 'truck': row.get('truck'), 'errors': []} for index, row in enumerate(assignments)]
+
+    # Serialise bulk assignments to the same mission, so the duplicate check below sees the
+    # trucks a concurrent request has just assigned
+    Mission.objects.select_for_update().filter(pk=mission.pk).first()
+
+    truck_ids = [row.get('truck') for row in assignments]
+    trucks = Truck.objects.filter(vendor=vendor, pk__in=truck_ids).in_bulk()
+    already_assigned = set(
+        TrucksForMission.objects.filter(mission=mission, truck_id__in=truck_ids).values_list('truck_id', flat=True)
+    )
+
+    mission_cargo = Cargo.objects.filter(mission=mission).order_by('id').first()
+    items_by_uuid = {}
+    if mission_cargo:
+        items_by_uuid = {
+            item.unique_id: item
+            for item in CargoItems.objects.select_for_update(of=('self',)).select_related('product')
+            .filter(cargo=mission_cargo).order_by('pk')
+        }
+    # Quantity still available per cargo item as rows consume it
+    available = {item.pk: item.quantity - item.allocated_quantity for item in items_by_uuid.values()}
+
+    seen_trucks = set()
+    planned = []
+    for row, result in zip(assignments, results):
+        errors = result['errors']
+        truck = trucks.get(row.get('truck'))
+        if truck is None:
+            errors.append(f"Truck {row.get('truck')} not found or doesn't belong to your vendor")
+        elif truck.pk in already_assigned:
+            errors.append(f"Truck {truck.vehicle_name} is already assigned to this mission")
+        elif truck.pk in seen_trucks:
+            errors.append(f"Truck {truck.vehicle_name} appears more than once in the request")
+        seen_trucks.add(row.get('truck'))
+
+        requested, parse_errors = parse_cargo_request(row.get('cargo_items') or [])
+        errors.extend(parse_errors)
+        if requested and not mission_cargo:
+            errors.append("No cargo found for this mission")
+            requested = {}
+
+        allocations = []
+        for cargo_item_id, quantity in requested.items():
+            cargo_item = items_by_uuid.get(cargo_item_id)
+            if cargo_item is None:
+                errors.append(f"Cargo item with ID {cargo_item_id} not found or doesn't belong to this mission")
+            elif quantity > available[cargo_item.pk]:
+                errors.append(f"Cargo item {cargo_item.product.name} only has {available[cargo_item.pk]} units available")
+            else:
+                available[cargo_item.pk] -= quantity
+                allocations.append((cargo_item, quantity))
+
+        total_quantity = sum(quantity for _, quantity in allocations)
+        if truck is not None and total_quantity > truck.capacity:
+            errors.append(f"Total cargo quantity ({total_quantity}) exceeds truck capacity ({truck.capacity})")
+        planned.append((truck, allocations, total_quantity))
+
+    if any(result['errors'] for result in results):
+        raise BulkAssignmentError(results)
+
+    try:
+        with transaction.atomic():
+            truck_missions = TrucksForMission.objects.bulk_create([
+                TrucksForMission(mission=mission, truck=truck, vendor=vendor, assigned_load=total_quantity)
+                for truck, _, total_quantity in planned
+            ])
+    except IntegrityError:
+        # A single assignment, which does not take the mission lock, got in first
+        for result in results:
+            result['errors'].append("A truck in this request was assigned to the mission concurrently, retry the request")
+        raise BulkAssignmentError(results)
+
+    now = timezone.now()
+    truck_cargo_items = []
+    changed_items = {}
+    for truck_mission, (_, allocations, _) in zip(truck_missions, planned):
+        for cargo_item, quantity in allocations:
+            truck_cargo_items.append(TruckCargoItem(
+                truck_mission=truck_mission,
+                cargo_item=cargo_item,
+                transferring_quantity=quantity
+            ))
+            cargo_item.allocated_quantity += quantity
+            cargo_item.updated_at = now
+            changed_items[cargo_item.pk] = cargo_item
+
+    TruckCargoItem.objects.bulk_create(truck_cargo_items)
+    CargoItems.objects.bulk_update(list(changed_items.values()), ['allocated_quantity', 'updated_at'])
+    # New assignments change the mission's payload
+    Mission.objects.filter(pk=mission.pk).update(updated_at=now)
+
+    # Bulk writes skip the model signals
+    schedule_summary_refresh([mission.pk])
+    record_mission_changes([mission.pk])
+    for truck_mission in truck_missions:
+        publish_event(vendor.pk, {
+            'event': 'assignment.created',
+            'assignment_id': truck_mission.pk,
+            'mission_id': mission.pk,
+            'truck_id': truck_mission.truck_id,
+        })
+    invalidate_responses(CargoItems, TrucksForMission, TruckCargoItem)
+
+    return truck_missions
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+from food_track.models import Truck, TrucksForMission, Vendor, VendorMission
+
+
+def analytics_cache_key(vendor_id, start_date_from, start_date_to):
+    return f"food_track:vendor_analytics:{vendor_id or 'all'}:{start_date_from or ''}:{start_date_to or ''}"
+
+
+def mission_date_filter(prefix, start_date_from, start_date_to):
+    """Filter on the start date of the related mission, prefix is the path to the mission"""
+    filters = Q()
+    if start_date_from:
+        filters &= Q(**{f'{prefix}start_date__gte': start_date_from})
+    if start_date_to:
+        filters &= Q(**{f'{prefix}start_date__lte': start_date_to})
+    return filters
+
+
+def compute_vendor_analytics(vendor_id=None, start_date_from=None, start_date_to=None):
+    """
+    Vendor KPIs from four grouped queries, whatever the number of vendors.
+
+    Missions and loads count only missions starting in the date range, fleet counts are
+    current. Units come from the assigned_load counters, which sum the truck's
+    TruckCargoItem rows, so the allocations table is not scanned.
+    """
+    vendors = Vendor.objects.order_by('pk')
+    if vendor_id is not None:
+        vendors = vendors.filter(pk=vendor_id)
+    vendor_filter = Q(vendor_id=vendor_id) if vendor_id is not None else Q()
+
+    missions = {
+        row['vendor_id']: row
+        for row in VendorMission.objects.filter(
+            vendor_filter, mission_date_filter('mission__', start_date_from, start_date_to)
+        ).values('vendor_id').annotate(
+            missions_served=Count('mission_id', distinct=True),
+            missions_completed=Count('mission_id', distinct=True, filter=Q(mission__status='Completed')),
+        ).order_by()
+    }
+
+    loads = {
+        row['vendor_id']: row
+        for row in TrucksForMission.objects.filter(
+            vendor_filter, mission_date_filter('mission__', start_date_from, start_date_to)
+        ).values('vendor_id').annotate(
+            truck_assignments=Count('id'),
+            units_allocated=Sum('assigned_load'),
+            units_moved=Sum('assigned_load', filter=Q(mission__status='Completed')),
+            average_truck_utilization=Avg(
+                Cast('assigned_load', FloatField()) / NullIf(F('truck__capacity'), 0)
+            ),
+        ).order_by()
+    }
+
+    fleets = {
+        row['vendor_id']: row
+        for row in Truck.objects.filter(vendor_filter).values('vendor_id').annotate(
+            trucks_active=Count('id', filter=Q(status='active')),
+            trucks_maintenance=Count('id', filter=Q(status='maintenance')),
+        ).order_by()
+    }
+
+    results = []
+    for pk, name in vendors.values_list('pk', 'name'):
+        mission_row = missions.get(pk, {})
+        load_row = loads.get(pk, {})
+        fleet_row = fleets.get(pk, {})
+        utilization = load_row.get('average_truck_utilization')
+        results.append({
+            'vendor': pk,
+            'vendor_name': name,
+            'missions_served': mission_row.get('missions_served', 0),
+            'missions_completed': mission_row.get('missions_completed', 0),
+            'truck_assignments': load_row.get('truck_assignments', 0),
+            'units_allocated': load_row.get('units_allocated') or 0,
+            'units_moved': load_row.get('units_moved') or 0,
+            'average_truck_utilization': round(utilization, 4) if utilization is not None else None,
+            'trucks_active': fleet_row.get('trucks_active', 0),
+            'trucks_maintenance': fleet_row.get('trucks_maintenance', 0),
+        })
+    return results
+
+
+def get_vendor_analytics(vendor_id=None, start_date_from=None, start_date_to=None):
+    """compute_vendor_analytics cached for VENDOR_ANALYTICS_CACHE_TIMEOUT seconds per set of filters"""
+    timeout = getattr(settings, 'VENDOR_ANALYTICS_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return compute_vendor_analytics(vendor_id, start_date_from, start_date_to)
+
+    key = analytics_cache_key(vendor_id, start_date_from, start_date_to)
+    results = cache.get(key)
+    if results is None:
+        results = compute_vendor_analytics(vendor_id, start_date_from, start_date_to)
+        cache.set(key, results, timeout)
+    return results
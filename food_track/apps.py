@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FoodTrackConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food_track'
+    
+    def ready(self):
+        import food_track.checks
+        import food_track.signals
@@ -0,0 +1,190 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+from food_track.models import CargoItems, TrucksForMission, TruckCargoItem
+from food_track.utils import VendorUtils
+
+# Models whose changes invalidate cached responses, filled in by ResponseCacheMixin subclasses
+tracked_models = set()
+
+
+class ResponseCacheVersions:
+    """
+    One version number per model in the cache. Every cached response key embeds the
+    versions of the models it was built from, so bumping a version on save or delete
+    makes the old entries unreachable without having to find and delete them.
+    """
+
+    @staticmethod
+    def key(model):
+        return f"food_track:response_version:{model._meta.label_lower}"
+
+    @staticmethod
+    def get_many(models):
+        keys = [ResponseCacheVersions.key(model) for model in models]
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Start from the clock, an evicted version must never come back as an old number
+                cache.add(key, time.time_ns(), None)
+                versions[key] = cache.get(key)
+        return [versions[key] for key in keys]
+
+    @staticmethod
+    def bump(model):
+        key = ResponseCacheVersions.key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def invalidate_responses(*models):
+    """
+    Invalidate the cached responses built from these models once the current transaction
+    commits, so a concurrent request cannot cache the old rows under the new version.
+    """
+    for model in models:
+        if model in tracked_models:
+            transaction.on_commit(lambda model=model: ResponseCacheVersions.bump(model))
+
+
+class ResponseCacheMixin:
+    """
+    Caches the serialized data of list and retrieve responses and answers conditional
+    requests with 304.
+
+    The key covers the URL with its query parameters, the Accept header, the caller's vendor
+    and the version of every model in cache_models. The ETag is derived from the same key, so
+    a matching If-None-Match is answered before any query or serialization runs. Responses
+    are only cached with RESPONSE_CACHE_ENABLED on, which needs a cache shared by all workers.
+    """
+    cache_models = ()
+    cached_actions = ('list', 'retrieve')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        tracked_models.update(cls.cache_models)
+
+    def get_response_cache_key(self, request):
+        vendor = VendorUtils.get_request_vendor(request)
+        versions = ResponseCacheVersions.get_many(self.cache_models)
+        parts = [
+            request.build_absolute_uri(),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(vendor.pk if vendor else ''),
+            *(str(version) for version in versions),
+        ]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        etag = f'"{key}"'
+
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        cache_key = f"food_track:response:{key}"
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data, headers={'ETag': etag})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 600))
+            response['ETag'] = etag
+        return response
+
+    def caches(self, action):
+        return action in self.cached_actions and getattr(settings, 'RESPONSE_CACHE_ENABLED', False)
+
+    def list(self, request, *args, **kwargs):
+        if not self.caches('list'):
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.caches('retrieve'):
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+def newest_of(row, fields):
+    """Latest non-null timestamp among the given keys of a values() row"""
+    timestamps = [row[field] for field in fields if row[field] is not None]
+    return max(timestamps) if timestamps else None
+
+
+def mission_last_modified(missions):
+    """
+    Newest updated_at across a mission, its cargo items, truck assignments and allocations,
+    read with one query. missions is a queryset filtered down to the mission; returns None
+    when it is empty. Changes to the trucks, products, vendors and contacts a mission embeds
+    move its updated_at forward in signals.py.
+    """
+    newest = lambda queryset, group_by: Subquery(
+        queryset.order_by().values(group_by).annotate(newest=Max('updated_at')).values('newest')
+    )
+    row = missions.order_by().annotate(
+        cargo_items_updated=newest(CargoItems.objects.filter(cargo__mission=OuterRef('pk')), 'cargo__mission'),
+        trucks_updated=newest(TrucksForMission.objects.filter(mission=OuterRef('pk')), 'mission'),
+        allocations_updated=newest(
+            TruckCargoItem.objects.filter(truck_mission__mission=OuterRef('pk')), 'truck_mission__mission'
+        ),
+    ).values('updated_at', 'cargo_items_updated', 'trucks_updated', 'allocations_updated').first()
+    if row is None:
+        return None
+    return newest_of(row, ['updated_at', 'cargo_items_updated', 'trucks_updated', 'allocations_updated'])
+
+
+def assignment_last_modified(assignments):
+    """
+    Newest updated_at across a truck assignment, its mission, its allocations and their cargo
+    items, read with one query. Returns None when the queryset is empty.
+    """
+    row = assignments.order_by().values('pk').annotate(
+        own_updated=Max('updated_at'),
+        mission_updated=Max('mission__updated_at'),
+        allocations_updated=Max('truck_cargo_items__updated_at'),
+        cargo_items_updated=Max('truck_cargo_items__cargo_item__updated_at'),
+    ).first()
+    if row is None:
+        return None
+    return newest_of(row, ['own_updated', 'mission_updated', 'allocations_updated', 'cargo_items_updated'])
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match / If-Modified-Since on retrieve with 304 before the object is
+    loaded or serialized. Subclasses implement get_last_modified() to return the newest
+    updated_at across the rows the response is built from, or None if the object is missing.
+    """
+    etag_prefix = None
+
+    def get_last_modified(self):
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            # Let the regular lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        etag = f'"{self.etag_prefix}-{lookup}-{int(last_modified.timestamp() * 1000000)}"'
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
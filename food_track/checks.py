@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def check_response_cache_backend(app_configs, **kwargs):
+    """Cached responses in a per-process cache go stale as soon as more than one worker runs"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if getattr(settings, 'RESPONSE_CACHE_ENABLED', False) and backend in PER_PROCESS_CACHES:
+        return [Warning(
+            "RESPONSE_CACHE_ENABLED is on with a per-process cache",
+            hint=(
+                "Each worker keeps its own cached responses and invalidations, so other workers serve "
+                "stale data after a write. Set REDIS_URL, or turn RESPONSE_CACHE_ENABLED off."
+            ),
+            id='food_track.W001',
+        )]
+    return []
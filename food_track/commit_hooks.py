@@ -0,0 +1,57 @@
+"""
+Work batched over a transaction and done once after it commits.
+
+Signals fire once per saved row, a batch collects what they ask for so a transaction
+touching many rows refreshes, logs or publishes them together. The batch of the open
+transaction is kept per thread and database alias, through a weak reference: Django drops
+the hooks of a transaction that rolls back, and with its hook gone the batch is gone too.
+"""
+import threading
+import weakref
+
+from django.db import transaction
+
+_pending = threading.local()
+
+
+class CommitBatch:
+    """
+    Base for on_commit callbacks collecting work over a transaction. Subclasses set up
+    their collections in __init__ and do the work in run().
+    """
+
+    def __init__(self):
+        self.done = False
+        # Robust hooks that fail are logged by their __qualname__, which instances lack
+        self.__qualname__ = type(self).__qualname__
+
+    def __call__(self):
+        self.done = True
+        self.run()
+
+    def run(self):
+        raise NotImplementedError
+
+    @classmethod
+    def add(cls, fill, using=None):
+        """
+        Call fill with the batch of the current transaction, registering a new batch as a
+        robust on_commit hook when there is none. Outside a transaction the batch runs
+        straight away, after fill.
+        """
+        connection = transaction.get_connection(using)
+        batches = getattr(_pending, 'batches', None)
+        if batches is None:
+            batches = _pending.batches = {}
+        key = (cls, connection.alias)
+        reference = batches.get(key)
+        batch = reference() if reference is not None else None
+        if batch is not None and not batch.done and connection.in_atomic_block:
+            fill(batch)
+            return
+        batch = cls()
+        fill(batch)
+        if connection.in_atomic_block:
+            batches[key] = weakref.ref(batch)
+        # A failing batch is logged and must not stop the hooks after it, or the request
+        transaction.on_commit(batch, using=using, robust=True)
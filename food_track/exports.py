@@ -0,0 +1,103 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from food_track.models import CargoItems, Mission, TruckCargoItem, VendorMission
+
+# Rows read per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# Flat columns per dataset, read with values_list() so no model instances are built
+EXPORT_DATASETS = {
+    'missions': (
+        Mission,
+        [
+            'id', 'unique_id', 'title', 'type', 'status', 'number_of_beneficiaries',
+            'dept_location', 'destination_location', 'start_date', 'end_date',
+        ],
+    ),
+    'cargo-items': (
+        CargoItems,
+        [
+            'id', 'unique_id', 'cargo__mission_id', 'cargo__mission__title', 'cargo_id',
+            'product_id', 'product__name', 'quantity', 'allocated_quantity',
+        ],
+    ),
+    'truck-cargo': (
+        TruckCargoItem,
+        [
+            'id', 'unique_id', 'truck_mission__mission_id', 'truck_mission__vendor_id',
+            'truck_mission__truck_id', 'truck_mission__truck__plate_number', 'cargo_item_id',
+            'cargo_item__product__name', 'transferring_quantity',
+        ],
+    ),
+}
+
+# Query parameters accepted as filters, per dataset
+EXPORT_FILTERS = {
+    'missions': {'status': 'status', 'type': 'type'},
+    'cargo-items': {'mission': 'cargo__mission_id'},
+    'truck-cargo': {'mission': 'truck_mission__mission_id', 'vendor': 'truck_mission__vendor_id'},
+}
+
+# Filters taking a record id, which must fit the bigint id columns
+EXPORT_ID_FILTERS = {'mission', 'vendor'}
+MAX_ID = 2 ** 63 - 1
+
+
+class Echo:
+    """File-like object that hands back what is written, lets csv.writer feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def parse_export_filters(dataset, params):
+    """ORM filters from the query parameters of a dataset. Raises ValueError on a malformed id"""
+    filters = {}
+    for param, lookup in EXPORT_FILTERS[dataset].items():
+        value = params.get(param)
+        if not value:
+            continue
+        if param in EXPORT_ID_FILTERS:
+            if not value.isascii() or not value.isdigit() or not 0 < int(value) <= MAX_ID:
+                raise ValueError(f"{param} must be a positive integer id")
+            value = int(value)
+        filters[lookup] = value
+    return filters
+
+
+def vendor_rows(dataset, vendor):
+    """Filter keeping the rows of a dataset that belong to the vendor"""
+    vendor_missions = VendorMission.objects.filter(vendor=vendor).values('mission_id')
+    return {
+        'missions': Q(id__in=vendor_missions),
+        'cargo-items': Q(cargo__mission_id__in=vendor_missions),
+        'truck-cargo': Q(truck_mission__vendor=vendor),
+    }[dataset]
+
+
+def export_rows(dataset, filters, vendor=None):
+    """
+    Return the column names and a lazy iterator over the rows of a dataset matching the
+    filters, only the vendor's rows when a vendor is given
+    """
+    model, fields = EXPORT_DATASETS[dataset]
+    queryset = model.objects.filter(**filters)
+    if vendor is not None:
+        queryset = queryset.filter(vendor_rows(dataset, vendor))
+    rows = queryset.order_by('id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return fields, rows
+
+
+def stream_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(fields, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
@@ -0,0 +1,93 @@
+"""
+Plain geometry on longitude/latitude degrees, no database access.
+
+Region boundaries are GeoJSON Polygon or MultiPolygon objects: rings of [longitude, latitude]
+positions, the first ring of a polygon is its outline and the others are holes.
+"""
+import math
+
+import numpy
+
+EARTH_RADIUS_KM = 6371.0088
+# Kilometres per degree of latitude, and of longitude on the equator
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def parse_boundary(boundary):
+    """
+    Polygons of a GeoJSON Polygon or MultiPolygon, each a list of rings given as (N, 2) arrays
+    of longitude, latitude. Raises ValueError describing the first problem found.
+    """
+    if not isinstance(boundary, dict):
+        raise ValueError("boundary must be a GeoJSON Polygon or MultiPolygon object")
+    kind = boundary.get('type')
+    coordinates = boundary.get('coordinates')
+    if kind == 'Polygon':
+        polygons = [coordinates]
+    elif kind == 'MultiPolygon':
+        polygons = coordinates
+    else:
+        raise ValueError("boundary type must be Polygon or MultiPolygon")
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("boundary has no coordinates")
+
+    parsed = []
+    for polygon in polygons:
+        if not isinstance(polygon, list) or not polygon:
+            raise ValueError("Each polygon must be a list of rings")
+        rings = []
+        for ring in polygon:
+            try:
+                ring = numpy.array(ring, dtype=float)
+            except (TypeError, ValueError):
+                raise ValueError("Each ring must be a list of [longitude, latitude] positions")
+            if ring.ndim != 2 or ring.shape[1] != 2:
+                raise ValueError("Each ring must be a list of [longitude, latitude] positions")
+            if len(ring) < 4:
+                raise ValueError("A ring needs at least 4 positions")
+            if not numpy.array_equal(ring[0], ring[-1]):
+                raise ValueError("A ring must end on its first position")
+            if not numpy.isfinite(ring).all() or (numpy.abs(ring[:, 0]) > 180).any() or (numpy.abs(ring[:, 1]) > 90).any():
+                raise ValueError("Positions must have a longitude within -180..180 and a latitude within -90..90")
+            rings.append(ring)
+        parsed.append(rings)
+    return parsed
+
+
+def boundary_bounds(polygons):
+    """(min latitude, min longitude, max latitude, max longitude) of parsed polygons"""
+    outlines = numpy.concatenate([rings[0] for rings in polygons])
+    return (
+        float(outlines[:, 1].min()), float(outlines[:, 0].min()),
+        float(outlines[:, 1].max()), float(outlines[:, 0].max()),
+    )
+
+
+def ring_contains(ring, longitude, latitude):
+    """Even-odd ray casting of one point against a ring, over all of its edges at once"""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    straddles = (y0 > latitude) != (y1 > latitude)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        crossing = x0 + (latitude - y0) * (x1 - x0) / (y1 - y0)
+    return bool(numpy.count_nonzero(straddles & (longitude < crossing)) % 2)
+
+
+def polygons_contain(polygons, longitude, latitude):
+    """Whether the point is inside one of the polygons and outside that polygon's holes"""
+    for rings in polygons:
+        if ring_contains(rings[0], longitude, latitude) and not any(
+            ring_contains(hole, longitude, latitude) for hole in rings[1:]
+        ):
+            return True
+    return False
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat1 = math.radians(latitude)
+    lat2 = numpy.radians(latitudes)
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = numpy.radians(longitudes - longitude) / 2
+    a = numpy.sin(half_dlat) ** 2 + math.cos(lat1) * numpy.cos(lat2) * numpy.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from food_track.positions import create_position_partitions
+
+
+class Command(BaseCommand):
+    help = "Create the monthly truck position partitions ahead of time, run it at least monthly"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=3, help="Months to cover, starting with the current one")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Truck positions are only partitioned on PostgreSQL")
+
+        created = create_position_partitions(options['months'])
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
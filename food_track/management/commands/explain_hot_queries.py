@@ -0,0 +1,68 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from Accounts.models import AccountActivationRequestUsers, ForgotPasswordRequestUser
+from food_track.models import (
+    Contact, Mission, MissionSummary, Truck, TruckCargoItem, TruckPosition, TrucksForMission, VendorMission
+)
+
+
+def hot_queries():
+    """The lookups behind the busiest endpoints, each expected to be served by an index"""
+    return {
+        'vendor of user': Contact.objects.filter(user_id=1).values('vendor_id'),
+        'vendor mission check': VendorMission.objects.filter(vendor_id=1, mission_id=1),
+        'vendor missions': VendorMission.objects.filter(vendor_id=1).values('mission_id'),
+        'cargo item allocations': TruckCargoItem.objects.filter(cargo_item_id=1).values('cargo_item').annotate(
+            total=Sum('transferring_quantity')
+        ),
+        'truck allocations': TruckCargoItem.objects.filter(truck_mission_id=1),
+        'vendor truck assignments': TrucksForMission.objects.filter(vendor_id=1, mission_id=1),
+        'missions by status': Mission.objects.filter(status='Active', start_date__gte=datetime.date(2025, 1, 1)),
+        'mission page': Mission.objects.filter(id__gt=0).order_by('id')[:50],
+        'mission summaries by status': MissionSummary.objects.filter(status='Active', id__gt=0).order_by('id')[:50],
+        'vendor fleet by status': Truck.objects.filter(vendor_id=1, status='active'),
+        'truck position history': TruckPosition.objects.filter(
+            truck_id=1, recorded_at__gte=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        ).order_by('recorded_at'),
+        'password reset token': ForgotPasswordRequestUser.objects.filter(request_token='token'),
+        'activation token': AccountActivationRequestUsers.objects.filter(
+            account_activation_token='token', account_activation_is_used=False, account_activation_is_active=True
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot lookups with sequential scans disabled and fail if any of them can only be "
+        "answered with a sequential scan. This checks that a usable index exists, not that the planner "
+        "picks it on production-sized data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not only the failing ones")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("explain_hot_queries needs PostgreSQL")
+
+        failures = []
+        with transaction.atomic():
+            # With sequential scans priced out a "Seq Scan" node means no usable index exists,
+            # which keeps the check meaningful on small development databases
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, queryset in hot_queries().items():
+                plan = queryset.explain()
+                if options['verbose_plans']:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                if 'Seq Scan' in plan:
+                    failures.append(name)
+                    if not options['verbose_plans']:
+                        self.stdout.write(f"{name}:\n{plan}\n")
+
+        if failures:
+            raise CommandError(f"Sequential scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(f"All {len(hot_queries())} hot queries use indexes"))
@@ -0,0 +1,119 @@
+import math
+import time
+
+import numpy
+from django.core.management.base import BaseCommand, CommandError
+from food_track.geometry import parse_boundary
+from food_track.spatial import RegionIndex, TruckIndex
+
+
+def synthetic_trucks(count, vendors, rng):
+    """Truck positions gathered around depots in East Africa, like a real fleet"""
+    depots = numpy.column_stack([rng.uniform(-12, 5, 40), rng.uniform(28, 42, 40)])
+    depot = rng.integers(0, len(depots), count)
+    latitudes = numpy.clip(depots[depot, 0] + rng.normal(0, 0.8, count), -90, 90)
+    longitudes = depots[depot, 1] + rng.normal(0, 0.8, count)
+    return numpy.arange(1, count + 1), rng.integers(1, vendors + 1, count), latitudes, longitudes
+
+
+def synthetic_regions(count, rng):
+    """Irregular polygons tiling the same area, every fifth one with a hole"""
+    side = math.ceil(math.sqrt(count))
+    height, width = 17 / side, 14 / side
+    regions = []
+    for number in range(count):
+        south = -12 + (number // side) * height
+        west = 28 + (number % side) * width
+        angles = numpy.linspace(0, 2 * math.pi, 24, endpoint=False)
+        radius = rng.uniform(0.6, 1.0, len(angles))
+        ring = numpy.column_stack([
+            west + width / 2 + numpy.cos(angles) * radius * width / 2,
+            south + height / 2 + numpy.sin(angles) * radius * height / 2,
+        ]).tolist()
+        rings = [ring + ring[:1]]
+        if number % 5 == 0:
+            hole = [
+                [west + width * 0.45, south + height * 0.45], [west + width * 0.55, south + height * 0.45],
+                [west + width * 0.55, south + height * 0.55], [west + width * 0.45, south + height * 0.55],
+                [west + width * 0.45, south + height * 0.45],
+            ]
+            rings.append(hole)
+        regions.append((number + 1, parse_boundary({'type': 'Polygon', 'coordinates': rings})))
+    return regions
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the grid region and truck indexes against a full scan and measure their "
+        "query latency on a synthetic fleet. No database access"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trucks', type=int, default=50000)
+        parser.add_argument('--vendors', type=int, default=200)
+        parser.add_argument('--regions', type=int, default=400)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--cell-size', type=float, default=0.5, help="Grid cell size in degrees")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = numpy.random.default_rng(options['seed'])
+        k = options['k']
+
+        started = time.perf_counter()
+        trucks = TruckIndex(*synthetic_trucks(options['trucks'], options['vendors'], rng), options['cell_size'])
+        truck_build = time.perf_counter() - started
+        regions = synthetic_regions(options['regions'], rng)
+        started = time.perf_counter()
+        region_index = RegionIndex(regions, options['cell_size'])
+        region_build = time.perf_counter() - started
+        self.stdout.write(
+            f"Built the truck index of {len(trucks)} trucks in {truck_build * 1000:.1f} ms "
+            f"and the region index of {len(region_index)} regions in {region_build * 1000:.1f} ms"
+        )
+
+        points = numpy.column_stack([rng.uniform(-12, 5, options['queries']), rng.uniform(28, 42, options['queries'])]).tolist()
+        vendor_ids = rng.integers(1, options['vendors'] + 1, options['queries']).tolist()
+
+        def timed(query):
+            timings = []
+            results = []
+            for number, (latitude, longitude) in enumerate(points):
+                started = time.perf_counter()
+                results.append(query(number, latitude, longitude))
+                timings.append(time.perf_counter() - started)
+            timings = numpy.array(timings) * 1000
+            return results, timings
+
+        def report(name, timings):
+            self.stdout.write(
+                f"{name:40} p50 {numpy.percentile(timings, 50):7.3f} ms  p99 {numpy.percentile(timings, 99):7.3f} ms"
+            )
+
+        checks = [
+            ("nearest trucks", lambda number, lat, lon: trucks.nearest(lat, lon, k),
+             lambda number, lat, lon: trucks.nearest_brute_force(lat, lon, k)),
+            ("nearest trucks of one vendor", lambda number, lat, lon: trucks.nearest(lat, lon, k, vendor_ids[number]),
+             lambda number, lat, lon: trucks.nearest_brute_force(lat, lon, k, vendor_ids[number])),
+        ]
+        for name, grid_query, scan_query in checks:
+            grid_results, grid_timings = timed(grid_query)
+            scan_results, scan_timings = timed(scan_query)
+            for point, grid, scan in zip(points, grid_results, scan_results):
+                # Trucks at the same distance may come in any order, their distances may not
+                if not numpy.allclose(grid[3], scan[3]):
+                    raise CommandError(f"{name} at {point}: grid found {grid[0]}, full scan {scan[0]}")
+            report(f"{name} (grid)", grid_timings)
+            report(f"{name} (full scan)", scan_timings)
+
+        grid_results, grid_timings = timed(lambda number, lat, lon: sorted(region_index.locate(lat, lon)))
+        scan_results, scan_timings = timed(lambda number, lat, lon: sorted(region_index.locate_brute_force(lat, lon)))
+        if grid_results != scan_results:
+            raise CommandError("Region lookups through the grid differ from the full scan")
+        report("region containing a point (grid)", grid_timings)
+        report("region containing a point (full scan)", scan_timings)
+        self.stdout.write(self.style.SUCCESS(
+            f"Grid results match the full scan for {len(points)} points, "
+            f"{sum(map(bool, grid_results))} of them inside a region"
+        ))
@@ -0,0 +1,77 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from food_track.management.commands.position_ingest_benchmark import synthetic_fleet_pings
+from food_track.position_format import COORDINATE_SCALE, SPEED_SCALE, decode_pings, encode_pings, parse_records
+from food_track.positions import parse_pings
+
+
+def check_round_trip(pings, rows):
+    """Decoded rows must match the pings up to the precision of the binary format"""
+    for ping, (truck_id, recorded_at, latitude, longitude, speed) in zip(pings, rows):
+        if (
+            truck_id != ping['truck']
+            or int(recorded_at.timestamp()) != int(ping['timestamp'])
+            or abs(latitude - ping['lat']) > 1 / COORDINATE_SCALE
+            or abs(longitude - ping['lon']) > 1 / COORDINATE_SCALE
+            or (speed is None) != (ping.get('speed') is None)
+            or (speed is not None and abs(speed - ping['speed']) > 1 / SPEED_SCALE)
+        ):
+            raise CommandError(f"Round trip changed {ping} into {truck_id, recorded_at, latitude, longitude, speed}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that binary position batches round-trip and compare their size and decode "
+        "throughput with JSON. No database writes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trucks', type=int, default=500)
+        parser.add_argument('--pings', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=1000, help="Pings per request body")
+        parser.add_argument('--repeat', type=int, default=3, help="Best of this many runs is reported")
+
+    def handle(self, *args, **options):
+        pings = synthetic_fleet_pings(list(range(1, options['trucks'] + 1)), options['pings'])
+        for ping in pings:
+            ping['timestamp'] = int(datetime.datetime.fromisoformat(ping['timestamp']).timestamp())
+        # Edge values of the format
+        pings[0].update(lat=-90.0, lon=-180.0, speed=None)
+        pings[1].update(lat=90.0, lon=180.0, speed=0.0)
+
+        size = options['batch_size']
+        batches = [pings[start:start + size] for start in range(0, len(pings), size)]
+        json_bodies = [json.dumps(batch).encode() for batch in batches]
+        binary_bodies = [encode_pings(batch) for batch in batches]
+
+        now = timezone.now()
+        for batch, body in zip(batches, binary_bodies):
+            indexes, rows, rejected = parse_records(decode_pings(body), now)
+            if rejected or len(rows) != len(batch):
+                raise CommandError(f"Valid pings were rejected: {rejected[:3]}")
+            check_round_trip(batch, rows)
+        self.stdout.write(f"Round trip of {len(pings)} pings OK")
+
+        def best_of(decode, bodies):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                for body in bodies:
+                    decode(body)
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        json_time = best_of(lambda body: parse_pings(json.loads(body), now), json_bodies)
+        binary_time = best_of(lambda body: parse_records(decode_pings(body), now), binary_bodies)
+
+        json_bytes = sum(len(body) for body in json_bodies)
+        binary_bytes = sum(len(body) for body in binary_bodies)
+        self.stdout.write(f"JSON    {json_bytes / len(pings):6.1f} bytes/ping  {len(pings) / json_time:10.0f} pings/s decoded and validated")
+        self.stdout.write(f"binary  {binary_bytes / len(pings):6.1f} bytes/ping  {len(pings) / binary_time:10.0f} pings/s decoded and validated")
+        self.stdout.write(self.style.SUCCESS(
+            f"Binary is {json_bytes / binary_bytes:.1f}x smaller and decodes {json_time / binary_time:.1f}x faster"
+        ))
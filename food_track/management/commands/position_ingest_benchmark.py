@@ -0,0 +1,78 @@
+import datetime
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from food_track.models import Truck, TruckLatestPosition, TruckPosition, Vendor
+from food_track.positions import ingest_positions
+
+
+def synthetic_fleet_pings(truck_ids, count, seed=0):
+    """Pings of trucks driving random walks from a common depot, one ping per truck in turn"""
+    generator = random.Random(seed)
+    started = timezone.now() - datetime.timedelta(seconds=count // max(len(truck_ids), 1) * 10)
+    state = {truck_id: [-1.2921, 36.8219] for truck_id in truck_ids}
+    pings = []
+    for number in range(count):
+        truck_id = truck_ids[number % len(truck_ids)]
+        position = state[truck_id]
+        position[0] += generator.uniform(-0.001, 0.001)
+        position[1] += generator.uniform(-0.001, 0.001)
+        pings.append({
+            'truck': truck_id,
+            'timestamp': (started + datetime.timedelta(seconds=number // len(truck_ids) * 10)).isoformat(),
+            'lat': round(position[0], 6),
+            'lon': round(position[1], 6),
+            'speed': round(generator.uniform(0, 90), 1),
+        })
+    return pings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure position ingestion throughput with a synthetic fleet. Everything is written "
+        "in a transaction that is rolled back at the end"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trucks', type=int, default=500)
+        parser.add_argument('--pings', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=1000, help="Pings per ingestion request")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vendor = Vendor.objects.create(
+                name="Benchmark fleet", vendor_type='logistic_provider', fleet_size=options['trucks'],
+                description="Synthetic fleet for position_ingest_benchmark"
+            )
+            trucks = Truck.objects.bulk_create([
+                Truck(vehicle_name=f"Benchmark {number}", year=2020, model="Synthetic", capacity=1000, vendor=vendor)
+                for number in range(options['trucks'])
+            ])
+            pings = synthetic_fleet_pings([truck.pk for truck in trucks], options['pings'])
+            # Requests arrive as JSON, decoding is part of the cost
+            bodies = [
+                json.dumps(pings[start:start + options['batch_size']])
+                for start in range(0, len(pings), options['batch_size'])
+            ]
+
+            started = time.perf_counter()
+            accepted = 0
+            for body in bodies:
+                stored, rejected = ingest_positions(vendor, json.loads(body))
+                accepted += stored
+            elapsed = time.perf_counter() - started
+
+            latest = TruckLatestPosition.objects.filter(truck__vendor=vendor).count()
+            history = TruckPosition.objects.filter(truck_id__in=[truck.pk for truck in trucks]).count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{accepted} pings from {options['trucks']} trucks in {len(bodies)} batches of {options['batch_size']}: "
+            f"{elapsed:.2f} s, {elapsed / len(bodies) * 1000:.1f} ms per batch"
+        )
+        self.stdout.write(f"Stored {history} positions and {latest} latest positions")
+        self.stdout.write(self.style.SUCCESS(f"{accepted / elapsed:.0f} pings per second"))
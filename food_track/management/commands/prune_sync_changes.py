@@ -0,0 +1,20 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from food_track.sync import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete old vendor sync changes, clients with an older cursor get a full sync. Run it daily"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'SYNC_RETENTION_DAYS', 30),
+            help="Keep the changes of the last days"
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(timezone.now() - datetime.timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} sync changes"))
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from food_track.realtime import get_broker
+from food_track.streams import authenticate_stream, websocket_updates
+
+
+class LoadTestSocket:
+    """In-memory client side of one WebSocket connection driven through websocket_updates"""
+
+    def __init__(self, load_test):
+        self.load_test = load_test
+        self.connected = False
+        self.accepted = False
+
+    async def receive(self):
+        if not self.connected:
+            self.connected = True
+            return {'type': 'websocket.connect'}
+        await self.load_test.closing.wait()
+        return {'type': 'websocket.disconnect', 'code': 1000}
+
+    async def send(self, message):
+        if message['type'] == 'websocket.accept':
+            self.accepted = True
+        elif message['type'] == 'websocket.send':
+            self.load_test.delivered += 1
+            if self.load_test.delivered >= self.load_test.expected:
+                self.load_test.all_delivered.set()
+
+
+class LoadTest:
+    def __init__(self, token, vendor_id, subscribers, idle, events):
+        self.token = token
+        self.vendor_id = vendor_id
+        self.subscribers = subscribers
+        self.idle = idle
+        self.events = events
+        self.delivered = 0
+        self.expected = subscribers * events
+
+    async def run(self):
+        self.closing = asyncio.Event()
+        self.all_delivered = asyncio.Event()
+        broker = get_broker()
+        baseline = broker.subscriber_count()
+
+        tracemalloc.start()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        sockets = [LoadTestSocket(self) for _ in range(self.subscribers)]
+        scope = {'type': 'websocket', 'path': '/ws/updates/', 'query_string': f'token={self.token}'.encode()}
+        tasks = [asyncio.create_task(websocket_updates(scope, socket.receive, socket.send)) for socket in sockets]
+        while broker.subscriber_count() < baseline + self.subscribers:
+            if any(task.done() for task in tasks):
+                raise CommandError("A load test connection was rejected")
+            await asyncio.sleep(0.05)
+        memory = tracemalloc.get_traced_memory()[0] - start_memory
+        tracemalloc.stop()
+
+        # Connected and idle: nothing should run
+        cpu = time.process_time()
+        await asyncio.sleep(self.idle)
+        idle_cpu = time.process_time() - cpu
+
+        # Publish from another thread, the way model signals do
+        started = time.perf_counter()
+        cpu = time.process_time()
+        for number in range(self.events):
+            await asyncio.to_thread(broker.publish, self.vendor_id, {'event': 'load_test', 'number': number})
+        await asyncio.wait_for(self.all_delivered.wait(), 60)
+        fan_out = time.perf_counter() - started
+        fan_out_cpu = time.process_time() - cpu
+
+        self.closing.set()
+        await asyncio.gather(*tasks)
+        return memory, idle_cpu, fan_out, fan_out_cpu
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cost of idle live update subscribers with clients polling an endpoint. "
+        "Runs the WebSocket handler in process, no server is needed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Vendor user the subscribers and polling requests authenticate as")
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--idle', type=float, default=5, help="Seconds the subscribers stay idle")
+        parser.add_argument('--events', type=int, default=10, help="Events fanned out to every subscriber")
+        parser.add_argument('--poll-path', default='/api/missions/')
+        parser.add_argument('--poll-interval', type=float, default=5, help="Seconds between polls of one client")
+        parser.add_argument('--poll-requests', type=int, default=20, help="Requests timed to price one poll")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user {options['username']}")
+        token = str(RefreshToken.for_user(user).access_token)
+        vendor_id = authenticate_stream(token)
+        if vendor_id is None:
+            raise CommandError(f"{user.username} is not a vendor user")
+
+        subscribers = options['subscribers']
+        load_test = LoadTest(token, vendor_id, subscribers, options['idle'], options['events'])
+        memory, idle_cpu, fan_out, fan_out_cpu = asyncio.run(load_test.run())
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+        client.get(options['poll_path'])
+        with CaptureQueriesContext(connection) as queries:
+            cpu = time.process_time()
+            started = time.perf_counter()
+            for _ in range(options['poll_requests']):
+                response = client.get(options['poll_path'])
+                if response.status_code != 200:
+                    raise CommandError(f"{options['poll_path']} answered {response.status_code}")
+            poll_wall = (time.perf_counter() - started) / options['poll_requests']
+            poll_cpu = (time.process_time() - cpu) / options['poll_requests']
+        poll_queries = len(queries.captured_queries) / options['poll_requests']
+        polls_per_second = subscribers / options['poll_interval']
+
+        self.stdout.write(f"{subscribers} idle subscribers:")
+        self.stdout.write(f"  memory            {memory / subscribers / 1024:.1f} KiB per subscriber")
+        self.stdout.write(f"  CPU while idle    {idle_cpu * 1000:.1f} ms over {options['idle']:g} s, 0 queries")
+        self.stdout.write(
+            f"  fan-out           {options['events']} events in {fan_out * 1000:.1f} ms "
+            f"({fan_out_cpu / load_test.expected * 1e6:.1f} us CPU per delivery)"
+        )
+        self.stdout.write(f"{subscribers} clients polling {options['poll_path']} every {options['poll_interval']:g} s:")
+        self.stdout.write(
+            f"  one poll          {poll_wall * 1000:.1f} ms, {poll_cpu * 1000:.1f} ms CPU, {poll_queries:g} queries"
+        )
+        self.stdout.write(
+            f"  sustained         {polls_per_second:.0f} requests/s, {polls_per_second * poll_cpu:.2f} CPU s/s, "
+            f"{polls_per_second * poll_queries:.0f} queries/s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Idle subscribers used {idle_cpu / options['idle']:.4f} CPU s/s against "
+            f"{polls_per_second * poll_cpu:.2f} CPU s/s for polling"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from food_track.summaries import SUMMARY_BATCH_SIZE, rebuild_mission_summaries, refresh_mission_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the mission dashboard summaries from the missions, cargo and truck assignments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('missions', nargs='*', type=int, help="Only rebuild these mission ids")
+        parser.add_argument('--batch-size', type=int, default=SUMMARY_BATCH_SIZE, help="Missions recomputed per batch")
+
+    def handle(self, *args, **options):
+        if options['missions']:
+            count = refresh_mission_summaries(options['missions'])
+        else:
+            count = rebuild_mission_summaries(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} mission summaries"))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+from food_track.models import CargoItems, TrucksForMission, TruckCargoItem
+from food_track.summaries import refresh_mission_summaries
+
+
+class Command(BaseCommand):
+    help = "Verify the allocated_quantity and assigned_load counters against the allocations and optionally repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Rewrite drifted counters with the recomputed totals")
+
+    def handle(self, *args, **options):
+        drifted_items = list(
+            CargoItems.objects.with_remaining()
+            .filter(~Q(allocated_quantity=F('assigned_quantity')))
+            .values_list('pk', 'allocated_quantity', 'assigned_quantity')
+        )
+        drifted_loads = list(
+            TrucksForMission.objects.annotate(
+                actual_load=Coalesce(Sum('truck_cargo_items__transferring_quantity'), 0)
+            )
+            .filter(~Q(assigned_load=F('actual_load')))
+            .values_list('pk', 'assigned_load', 'actual_load')
+        )
+
+        for pk, counter, actual in drifted_items:
+            self.stdout.write(f"CargoItems {pk}: counter {counter}, actual {actual}")
+        for pk, counter, actual in drifted_loads:
+            self.stdout.write(f"TrucksForMission {pk}: counter {counter}, actual {actual}")
+
+        if not drifted_items and not drifted_loads:
+            self.stdout.write(self.style.SUCCESS("Allocation counters are consistent"))
+            return
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drifted_items)} cargo items and {len(drifted_loads)} truck assignments have drifted, run with --fix to repair"
+            ))
+            return
+
+        # Recompute inside the UPDATE so allocations written meanwhile are taken into account
+        allocations = TruckCargoItem.objects.order_by()
+        CargoItems.objects.filter(pk__in=[row[0] for row in drifted_items]).update(
+            allocated_quantity=Coalesce(Subquery(
+                allocations.filter(cargo_item=OuterRef('pk')).values('cargo_item')
+                .annotate(total=Sum('transferring_quantity')).values('total')
+            ), Value(0)),
+            updated_at=Now()
+        )
+        TrucksForMission.objects.filter(pk__in=[row[0] for row in drifted_loads]).update(
+            assigned_load=Coalesce(Subquery(
+                allocations.filter(truck_mission=OuterRef('pk')).values('truck_mission')
+                .annotate(total=Sum('transferring_quantity')).values('total')
+            ), Value(0)),
+            updated_at=Now()
+        )
+        # The mission summaries read the counters, bring the affected ones in line
+        refresh_mission_summaries(
+            set(CargoItems.objects.filter(pk__in=[row[0] for row in drifted_items]).values_list('cargo__mission_id', flat=True))
+            | set(TrucksForMission.objects.filter(pk__in=[row[0] for row in drifted_loads]).values_list('mission_id', flat=True))
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Repaired {len(drifted_items)} cargo items and {len(drifted_loads)} truck assignments"
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:09
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_allocation_counters(apps, schema_editor):
+    CargoItems = apps.get_model('food_track', 'CargoItems')
+    TrucksForMission = apps.get_model('food_track', 'TrucksForMission')
+    TruckCargoItem = apps.get_model('food_track', 'TruckCargoItem')
+
+    allocations = TruckCargoItem.objects.order_by().values('cargo_item')
+    CargoItems.objects.update(allocated_quantity=Coalesce(Subquery(
+        allocations.filter(cargo_item=OuterRef('pk')).annotate(total=Sum('transferring_quantity')).values('total')
+    ), Value(0)))
+
+    loads = TruckCargoItem.objects.order_by().values('truck_mission')
+    TrucksForMission.objects.update(assigned_load=Coalesce(Subquery(
+        loads.filter(truck_mission=OuterRef('pk')).annotate(total=Sum('transferring_quantity')).values('total')
+    ), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0015_truck_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cargoitems',
+            name='allocated_quantity',
+            field=models.PositiveIntegerField(default=0, help_text='Total quantity allocated to trucks, maintained by TruckCargoItem'),
+        ),
+        migrations.AddField(
+            model_name='trucksformission',
+            name='assigned_load',
+            field=models.PositiveIntegerField(default=0, help_text='Total quantity loaded on this truck, maintained by TruckCargoItem'),
+        ),
+        migrations.RunPython(backfill_allocation_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_vendor_missions(apps, schema_editor):
+    VendorMission = apps.get_model('food_track', 'VendorMission')
+    keep = VendorMission.objects.values('vendor', 'mission').annotate(keep_id=Min('id')).values('keep_id')
+    VendorMission.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0016_allocation_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['user', 'vendor'], name='contact_user_vendor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['status', 'start_date'], name='mission_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truck',
+            index=models.Index(fields=['vendor', 'status'], name='truck_vendor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truckcargoitem',
+            index=models.Index(fields=['cargo_item', 'transferring_quantity'], name='truckcargoitem_cargo_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trucksformission',
+            index=models.Index(fields=['vendor', 'mission'], name='trucksformission_vendor_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_vendor_missions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vendormission',
+            constraint=models.UniqueConstraint(fields=('vendor', 'mission'), name='unique_vendor_mission'),
+        ),
+    ]
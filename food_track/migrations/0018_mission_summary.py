@@ -0,0 +1,76 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_mission_summaries(apps, schema_editor):
+    Mission = apps.get_model('food_track', 'Mission')
+    MissionSummary = apps.get_model('food_track', 'MissionSummary')
+    CargoItems = apps.get_model('food_track', 'CargoItems')
+    TrucksForMission = apps.get_model('food_track', 'TrucksForMission')
+
+    cargo_totals = {
+        row['cargo__mission_id']: row
+        for row in CargoItems.objects.values('cargo__mission_id').annotate(
+            cargo_item_count=Count('id'), total_quantity=Sum('quantity'), allocated_quantity=Sum('allocated_quantity')
+        ).order_by()
+    }
+    truck_totals = {
+        row['mission_id']: row
+        for row in TrucksForMission.objects.values('mission_id').annotate(
+            trucks_assigned=Count('id'), truck_capacity=Sum('truck__capacity')
+        ).order_by()
+    }
+
+    summaries = []
+    for mission in Mission.objects.iterator():
+        cargo = cargo_totals.get(mission.pk, {})
+        trucks = truck_totals.get(mission.pk, {})
+        summaries.append(MissionSummary(
+            mission_id=mission.pk,
+            title=mission.title,
+            type=mission.type,
+            status=mission.status,
+            start_date=mission.start_date,
+            end_date=mission.end_date,
+            cargo_item_count=cargo.get('cargo_item_count', 0),
+            total_quantity=cargo.get('total_quantity') or 0,
+            allocated_quantity=cargo.get('allocated_quantity') or 0,
+            trucks_assigned=trucks.get('trucks_assigned', 0),
+            truck_capacity=trucks.get('truck_capacity') or 0,
+        ))
+    MissionSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0017_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MissionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('type', models.CharField(choices=[('specialized', 'Specialized Delivery'), ('regular', 'Regular Scheduled'), ('emergency', 'Emergency')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('Completed', 'Completed'), ('Active', 'Active')], max_length=50)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('cargo_item_count', models.PositiveIntegerField(default=0)),
+                ('total_quantity', models.PositiveIntegerField(default=0)),
+                ('allocated_quantity', models.PositiveIntegerField(default=0)),
+                ('trucks_assigned', models.PositiveIntegerField(default=0)),
+                ('truck_capacity', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='food_track.mission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='missionsummary_status_idx'), models.Index(fields=['type', 'id'], name='missionsummary_type_idx'), models.Index(fields=['start_date'], name='missionsummary_start_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_mission_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0019_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('contact', 'Contact'), ('truck', 'Truck'), ('mission', 'Mission')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to='food_track.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'id'], name='syncchange_vendor_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:35
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def month_bounds(first, count):
+    for _ in range(count):
+        following = (first + datetime.timedelta(days=32)).replace(day=1)
+        yield first, following
+        first = following
+
+
+def create_truck_position_table(apps, schema_editor):
+    TruckPosition = apps.get_model('food_track', 'TruckPosition')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(TruckPosition)
+        return
+
+    # Partitioned tables need the partition key in the primary key
+    schema_editor.execute("""
+        CREATE TABLE food_track_truckposition (
+            id bigserial NOT NULL,
+            truck_id bigint NOT NULL,
+            recorded_at timestamp with time zone NOT NULL,
+            latitude double precision NOT NULL,
+            longitude double precision NOT NULL,
+            speed double precision NULL,
+            received_at timestamp with time zone NOT NULL,
+            PRIMARY KEY (id, recorded_at)
+        ) PARTITION BY RANGE (recorded_at)
+    """)
+    schema_editor.execute(
+        "CREATE INDEX truckposition_truck_time_idx ON food_track_truckposition (truck_id, recorded_at)"
+    )
+    schema_editor.execute("CREATE TABLE food_track_truckposition_default PARTITION OF food_track_truckposition DEFAULT")
+    # Later months are added ahead of time by the create_position_partitions command
+    first = datetime.date.today().replace(day=1)
+    for start, end in month_bounds(first, 3):
+        schema_editor.execute(
+            f"CREATE TABLE food_track_truckposition_{start:%Y_%m} PARTITION OF food_track_truckposition "
+            f"FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"
+        )
+
+
+def drop_truck_position_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('food_track', 'TruckPosition'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0020_sync_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TruckLatestPosition',
+            fields=[
+                ('truck', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_position', serialize=False, to='food_track.truck')),
+                ('recorded_at', models.DateTimeField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('speed', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='TruckPosition',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('recorded_at', models.DateTimeField()),
+                        ('latitude', models.FloatField()),
+                        ('longitude', models.FloatField()),
+                        ('speed', models.FloatField(blank=True, null=True)),
+                        ('received_at', models.DateTimeField(auto_now_add=True)),
+                        ('truck', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='positions', to='food_track.truck')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['truck', 'recorded_at'], name='truckposition_truck_time_idx')],
+                    },
+                ),
+            ],
+        ),
+        # Created by hand, PostgreSQL gets a partitioned table
+        migrations.RunPython(create_truck_position_table, drop_truck_position_table),
+    ]
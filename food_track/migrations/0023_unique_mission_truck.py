@@ -0,0 +1,60 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:58
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_truck_assignments(apps, schema_editor):
+    """
+    Merge the assignments of a truck to the same mission into the oldest one. Their cargo
+    allocations move to the kept row, summed per cargo item, so the cargo item totals
+    (allocated_quantity) are unchanged and only the kept row's assigned_load is recomputed.
+    """
+    TrucksForMission = apps.get_model('food_track', 'TrucksForMission')
+    TruckCargoItem = apps.get_model('food_track', 'TruckCargoItem')
+
+    duplicates = (
+        TrucksForMission.objects.values('mission', 'truck')
+        .annotate(keep_id=Min('id'), assignments=Count('id')).filter(assignments__gt=1)
+    )
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        merged = TrucksForMission.objects.filter(
+            mission=duplicate['mission'], truck=duplicate['truck']
+        ).exclude(id=keep_id)
+        kept_items = {
+            allocation.cargo_item_id: allocation
+            for allocation in TruckCargoItem.objects.filter(truck_mission_id=keep_id)
+        }
+        for allocation in TruckCargoItem.objects.filter(truck_mission__in=merged).order_by('id'):
+            kept = kept_items.get(allocation.cargo_item_id)
+            if kept is None:
+                allocation.truck_mission_id = keep_id
+                allocation.save(update_fields=['truck_mission'])
+                kept_items[allocation.cargo_item_id] = allocation
+            else:
+                kept.transferring_quantity += allocation.transferring_quantity
+                kept.save(update_fields=['transferring_quantity'])
+                allocation.delete()
+        merged.delete()
+        load = TruckCargoItem.objects.filter(truck_mission_id=keep_id).aggregate(total=Sum('transferring_quantity'))['total']
+        TrucksForMission.objects.filter(id=keep_id).update(assigned_load=load or 0)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # Deferred foreign key checks of the moved rows would block the ALTER TABLE below
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0022_region_boundary_mission_coordinates'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_truck_assignments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trucksformission',
+            constraint=models.UniqueConstraint(fields=('mission', 'truck'), name='unique_mission_truck'),
+        ),
+    ]
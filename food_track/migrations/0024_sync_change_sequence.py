@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_changes(apps, schema_editor):
+    SyncChange = apps.get_model('food_track', 'SyncChange')
+    # Ids were the cursors so far, clients keep theirs
+    SyncChange.objects.update(sequence=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_track', '0023_unique_mission_truck'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncPrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField()),
+                ('deleted', models.PositiveIntegerField(default=0)),
+                ('pruned_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='syncchange',
+            name='syncchange_vendor_seq_idx',
+        ),
+        migrations.AddField(
+            model_name='syncchange',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='syncchange',
+            name='vendor',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to='food_track.vendor'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['vendor', 'sequence'], name='syncchange_vendor_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['sequence'], name='syncchange_sequence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(condition=models.Q(('sequence', None)), fields=['id'], name='syncchange_unnumbered_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.db.models import F
+from django.db.models.functions import Coalesce
 import uuid
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 import os
 import datetime
+from food_track.geometry import boundary_bounds, parse_boundary
 # Create your models here.
 class Vendor(models.Model):
     VENDOR_TYPES = [
@@ -68,19 +72,36 @@ class Cargo(models.Model):
     def __str__(self):
         return f'Cargo-{self.mission.title}'
 
+class CargoItemsQuerySet(models.QuerySet):
+    def with_remaining(self):
+        """
+        Annotate the quantity allocated to trucks, summed from the allocations themselves.
+        Used to verify the allocated_quantity counter.
+        """
+        return self.annotate(
+            assigned_quantity=Coalesce(models.Sum('truck_allocations__transferring_quantity'), 0)
+        )
+
 class CargoItems(models.Model):
     unique_id = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     cargo = models.ForeignKey(Cargo, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    allocated_quantity = models.PositiveIntegerField(
+        default=0,
+        help_text="Total quantity allocated to trucks, maintained by TruckCargoItem"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CargoItemsQuerySet.as_manager()
     
     @property
     def remaining_quantity(self):
         """Calculate remaining quantity after allocations to trucks"""
-        assigned = TruckCargoItem.objects.filter(cargo_item=self).aggregate(
-            models.Sum('transferring_quantity')
-        )['transferring_quantity__sum'] or 0
-        return self.quantity - assigned
+        if hasattr(self, 'assigned_quantity'):
+            # Loaded through CargoItems.objects.with_remaining()
+            return self.quantity - self.assigned_quantity
+        return self.quantity - self.allocated_quantity
     
     def __str__(self):
         return f"{self.product.name} - {self.quantity}"
@@ -88,12 +109,31 @@ class CargoItems(models.Model):
 class Region(models.Model):
     unique_id = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     region_name = models.CharField(max_length=255, unique=True)
+    # GeoJSON Polygon or MultiPolygon, the bounding box is derived from it on save
+    boundary = models.JSONField(null=True, blank=True)
+    min_latitude = models.FloatField(null=True, blank=True, editable=False)
+    min_longitude = models.FloatField(null=True, blank=True, editable=False)
+    max_latitude = models.FloatField(null=True, blank=True, editable=False)
+    max_longitude = models.FloatField(null=True, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        bounds = boundary_bounds(parse_boundary(self.boundary)) if self.boundary else (None,) * 4
+        self.min_latitude, self.min_longitude, self.max_latitude, self.max_longitude = bounds
+        if kwargs.get('update_fields') is not None and 'boundary' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'min_latitude', 'min_longitude', 'max_latitude', 'max_longitude'}
+        super().save(*args, **kwargs)
 
 class Contact(models.Model):
     contact_id = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Covers the user -> vendor lookup done on every vendor-portal request
+            models.Index(fields=['user', 'vendor'], name='contact_user_vendor_idx'),
+        ]
+
     def __str__(self):
         return f'{self.user.first_name} {self.user.last_name}'
 
@@ -112,6 +152,11 @@ class Truck(models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default="active")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'status'], name='truck_vendor_status_idx'),
+        ]
+
     def __str__(self):
         return self.vehicle_name
 
@@ -120,6 +165,19 @@ class TrucksForMission(models.Model):
     mission = models.ForeignKey("Mission", on_delete=models.CASCADE)
     truck = models.ForeignKey(Truck, on_delete=models.CASCADE)
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    assigned_load = models.PositiveIntegerField(
+        default=0,
+        help_text="Total quantity loaded on this truck, maintained by TruckCargoItem"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'mission'], name='trucksformission_vendor_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['mission', 'truck'], name='unique_mission_truck'),
+        ]
     
     def __str__(self):
         return f"{self.truck.vehicle_name} for {self.mission.title}"
@@ -134,33 +192,74 @@ class TruckCargoItem(models.Model):
     transferring_quantity = models.PositiveIntegerField(
         help_text="Quantity of this cargo item being transferred by this truck"
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('truck_mission', 'cargo_item')
+        indexes = [
+            # Lets allocation totals per cargo item be summed from the index alone
+            models.Index(fields=['cargo_item', 'transferring_quantity'], name='truckcargoitem_cargo_qty_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted allocation so save() can apply the difference to the counters
+        instance._persisted_allocation = (
+            instance.__dict__.get('cargo_item_id'),
+            instance.__dict__.get('truck_mission_id'),
+            instance.__dict__.get('transferring_quantity'),
+        )
+        return instance
+
+    def _previous_quantity_for(self, cargo_item_id):
+        previous = getattr(self, '_persisted_allocation', None)
+        if previous and previous[0] == cargo_item_id:
+            return previous[2] or 0
+        return 0
         
     def clean(self):
         """Validate that transferring quantity doesn't exceed available quantity"""
-        if self.cargo_item and self.transferring_quantity:
-            # Get total allocated to other trucks
-            other_allocations = TruckCargoItem.objects.filter(
-                cargo_item=self.cargo_item
-            ).exclude(id=self.id).aggregate(
-                models.Sum('transferring_quantity')
-            )['transferring_quantity__sum'] or 0
+        if self.cargo_item_id and self.transferring_quantity:
+            # Read the allocation counter rather than summing the other allocations
+            quantity, allocated = CargoItems.objects.filter(pk=self.cargo_item_id).values_list(
+                'quantity', 'allocated_quantity'
+            ).get()
+            other_allocations = allocated - self._previous_quantity_for(self.cargo_item_id)
             
-            available = self.cargo_item.quantity - other_allocations
+            available = quantity - other_allocations
             if self.transferring_quantity > available:
                 raise ValidationError({
                     'transferring_quantity': f'Exceeds available quantity. Only {available} units available.'
                 })
     
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.clean()
+            super().save(*args, **kwargs)
+
+            previous = getattr(self, '_persisted_allocation', None)
+            if previous and previous[:2] == (self.cargo_item_id, self.truck_mission_id):
+                adjust_allocation_counters(
+                    self.cargo_item_id, self.truck_mission_id, self.transferring_quantity - (previous[2] or 0)
+                )
+            else:
+                if previous:
+                    adjust_allocation_counters(previous[0], previous[1], -(previous[2] or 0))
+                adjust_allocation_counters(self.cargo_item_id, self.truck_mission_id, self.transferring_quantity)
+            self._persisted_allocation = (self.cargo_item_id, self.truck_mission_id, self.transferring_quantity)
     
     def __str__(self):
         return f"{self.truck_mission} - {self.cargo_item.product.name} ({self.transferring_quantity})"
 
+def adjust_allocation_counters(cargo_item_id, truck_mission_id, delta):
+    """Apply an allocation change to the CargoItems and TrucksForMission counters"""
+    if not delta:
+        return
+    now = timezone.now()
+    CargoItems.objects.filter(pk=cargo_item_id).update(allocated_quantity=F('allocated_quantity') + delta, updated_at=now)
+    TrucksForMission.objects.filter(pk=truck_mission_id).update(assigned_load=F('assigned_load') + delta, updated_at=now)
+
 class Mission(models.Model):
     MISSION_TYPES = [
         ('specialized', 'Specialized Delivery'),
@@ -181,9 +280,19 @@ class Mission(models.Model):
     description = models.TextField()
     dept_location = models.CharField(max_length=255)
     destination_location = models.CharField(max_length=255)
+    dept_latitude = models.FloatField(null=True, blank=True)
+    dept_longitude = models.FloatField(null=True, blank=True)
+    destination_latitude = models.FloatField(null=True, blank=True)
+    destination_longitude = models.FloatField(null=True, blank=True)
     start_date = models.DateField()
     end_date = models.DateField()
     status = models.CharField(max_length=50, choices=STATUS_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'start_date'], name='mission_status_start_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -193,6 +302,135 @@ class VendorMission(models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     mission = models.ForeignKey(Mission, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'mission'], name='unique_vendor_mission'),
+        ]
+
+class MissionSummary(models.Model):
+    """
+    Per-mission dashboard totals, kept up to date by food_track.summaries.
+    Mission fields used for filtering are copied so the dashboard reads one table.
+    """
+    mission = models.OneToOneField(Mission, on_delete=models.CASCADE, related_name="summary")
+    title = models.CharField(max_length=255)
+    type = models.CharField(max_length=20, choices=Mission.MISSION_TYPES)
+    status = models.CharField(max_length=50, choices=Mission.STATUS_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    cargo_item_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.PositiveIntegerField(default=0)
+    allocated_quantity = models.PositiveIntegerField(default=0)
+    trucks_assigned = models.PositiveIntegerField(default=0)
+    truck_capacity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='missionsummary_status_idx'),
+            models.Index(fields=['type', 'id'], name='missionsummary_type_idx'),
+            models.Index(fields=['start_date'], name='missionsummary_start_idx'),
+        ]
+
+    @property
+    def allocation_rate(self):
+        """Share of the mission's cargo already allocated to trucks"""
+        return round(self.allocated_quantity / self.total_quantity, 4) if self.total_quantity else 0
+
+    @property
+    def capacity_utilization(self):
+        """Share of the assigned trucks' capacity that is loaded"""
+        return round(self.allocated_quantity / self.truck_capacity, 4) if self.truck_capacity else 0
+
+    def __str__(self):
+        return f"Summary of {self.title}"
+
+class SyncChange(models.Model):
+    """
+    Append-only log of changes to the records a vendor syncs, written in the transaction of
+    the change. Committed changes get a sequence number afterwards, one numbering at a time
+    (see food_track.sync.number_changes), the number clients pass back as their sync cursor.
+    """
+    ENTITY_CHOICES = [
+        ('contact', 'Contact'),
+        ('truck', 'Truck'),
+        ('mission', 'Mission'),
+    ]
+
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # No database constraint: deleting a vendor logs the deletion of its contacts and trucks
+    # while the vendor row goes away, prune_sync_changes removes those rows later
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name="sync_changes", db_constraint=False)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    sequence = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'sequence'], name='syncchange_vendor_seq_idx'),
+            models.Index(fields=['sequence'], name='syncchange_sequence_idx'),
+            models.Index(fields=['id'], condition=models.Q(sequence=None), name='syncchange_unnumbered_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sequence}: {self.action} {self.entity} {self.object_id}"
+
+
+class SyncPrune(models.Model):
+    """A run of prune_sync_changes. Cursors up to pruned_through can no longer be served as deltas"""
+    pruned_through = models.BigIntegerField()
+    deleted = models.PositiveIntegerField(default=0)
+    pruned_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pruned through {self.pruned_through} at {self.pruned_at}"
+
+class TruckPosition(models.Model):
+    """
+    Append-only history of the position pings sent by trucks, written in bulk by
+    food_track.positions. On PostgreSQL the table is range partitioned by month on
+    recorded_at, so old months can be detached or dropped without touching the rest.
+
+    The truck is not a database constraint and deleting a truck keeps its history: a cascade
+    would have to load every ping of the truck.
+    """
+    id = models.BigAutoField(primary_key=True)
+    truck = models.ForeignKey(
+        Truck, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="positions"
+    )
+    recorded_at = models.DateTimeField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    speed = models.FloatField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['truck', 'recorded_at'], name='truckposition_truck_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.truck_id} at {self.recorded_at}: {self.latitude}, {self.longitude}"
+
+class TruckLatestPosition(models.Model):
+    """Newest known position of every truck, upserted with each ingested batch"""
+    truck = models.OneToOneField(Truck, on_delete=models.CASCADE, primary_key=True, related_name="latest_position")
+    recorded_at = models.DateTimeField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    speed = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.truck_id} at {self.recorded_at}: {self.latitude}, {self.longitude}"
+
 class OperationRegion(models.Model):
     unique_id = models.UUIDField(unique=True, default=uuid.uuid4)
     region = models.ForeignKey(Region, on_delete=models.CASCADE)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the indexed primary key.
+    
+    Pages are fetched with WHERE id > cursor instead of OFFSET, so the cost of a page does not
+    grow with the size of the table. Clients may ask for a smaller or larger page with
+    ?page_size= up to API_MAX_PAGE_SIZE.
+    """
+    ordering = 'id'
+    page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
@@ -0,0 +1,14 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from food_track.position_format import MEDIA_TYPE, decode_pings
+
+
+class PositionBatchParser(BaseParser):
+    """Decodes a binary position batch into its numpy records, see food_track.position_format"""
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return decode_pings(stream.read())
+        except ValueError as error:
+            raise ParseError(str(error))
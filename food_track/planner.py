@@ -0,0 +1,149 @@
+from bisect import bisect_left, insort
+from itertools import combinations
+
+from food_track.models import Cargo, CargoItems, Truck, TrucksForMission
+
+# Above this many candidate trucks the truck selection falls back to the greedy heuristic
+EXACT_SELECTION_LIMIT = 14
+
+
+def select_trucks(trucks, total_quantity, exact_limit=EXACT_SELECTION_LIMIT):
+    """
+    Pick the fewest trucks whose combined capacity covers total_quantity.
+
+    The minimum count comes from taking the largest trucks first. Among selections of that
+    size the one with the least spare capacity is preferred, which keeps the bigger trucks
+    free for other missions: exhaustively for small fleets, by greedy swaps otherwise.
+    trucks is a list of (key, capacity). If the fleet cannot carry everything, all trucks
+    are returned.
+    """
+    by_capacity = sorted(trucks, key=lambda truck: truck[1], reverse=True)
+    covered = 0
+    count = 0
+    for _, capacity in by_capacity:
+        if covered >= total_quantity:
+            break
+        covered += capacity
+        count += 1
+    if covered < total_quantity:
+        return by_capacity
+    if count == 0:
+        return []
+
+    if len(by_capacity) <= exact_limit:
+        best = min(
+            (selection for selection in combinations(by_capacity, count)
+             if sum(capacity for _, capacity in selection) >= total_quantity),
+            key=lambda selection: sum(capacity for _, capacity in selection)
+        )
+        return list(best)
+
+    # Swap each chosen truck, largest first, for the smallest unused truck that still covers the load
+    chosen = list(range(count))
+    unused = sorted((by_capacity[index][1], index) for index in range(count, len(by_capacity)))
+    for position, index in enumerate(chosen):
+        capacity = by_capacity[index][1]
+        needed = capacity - (covered - total_quantity)
+        candidate = bisect_left(unused, (needed, -1))
+        if candidate < len(unused) and unused[candidate][0] < capacity:
+            replacement_capacity, replacement = unused.pop(candidate)
+            insort(unused, (capacity, index))
+            covered += replacement_capacity - capacity
+            chosen[position] = replacement
+    return [by_capacity[index] for index in chosen]
+
+
+def pack_items(items, trucks):
+    """
+    Load items onto the selected trucks with best-fit decreasing.
+
+    Each item goes whole onto the truck with the least remaining space that can hold it. Items
+    too large for any truck's remaining space are split across the emptiest trucks. items is a
+    list of (key, quantity), trucks a list of (key, capacity). Returns the loads as
+    {truck key: [(item key, quantity)]} and the quantity per item that did not fit.
+    """
+    loads = {key: [] for key, _ in trucks}
+    # Sorted (remaining capacity, position) pairs for logarithmic best-fit lookups
+    remaining = sorted((capacity, position) for position, (_, capacity) in enumerate(trucks) if capacity > 0)
+    unplanned = []
+
+    for item_key, quantity in sorted(items, key=lambda item: item[1], reverse=True):
+        index = bisect_left(remaining, (quantity, -1))
+        if index < len(remaining):
+            space, position = remaining.pop(index)
+            loads[trucks[position][0]].append((item_key, quantity))
+            if space > quantity:
+                insort(remaining, (space - quantity, position))
+            continue
+
+        # Nothing holds the whole item, fill the emptiest trucks until it is placed
+        while quantity and remaining:
+            space, position = remaining.pop()
+            loaded = min(space, quantity)
+            loads[trucks[position][0]].append((item_key, loaded))
+            quantity -= loaded
+            if space > loaded:
+                insort(remaining, (space - loaded, position))
+        if quantity:
+            unplanned.append((item_key, quantity))
+
+    return {key: load for key, load in loads.items() if load}, unplanned
+
+
+def plan_truck_loads(items, trucks, exact_limit=EXACT_SELECTION_LIMIT):
+    """Choose trucks for the items and pack them, see select_trucks and pack_items"""
+    items = [(key, quantity) for key, quantity in items if quantity > 0]
+    total_quantity = sum(quantity for _, quantity in items)
+    selected = select_trucks(trucks, total_quantity, exact_limit)
+    return pack_items(items, selected)
+
+
+def build_mission_load_plan(vendor, mission):
+    """
+    Plan how the unallocated cargo of a mission fits on the vendor's active trucks
+    that are not yet assigned to it.
+    """
+    mission_cargo = Cargo.objects.filter(mission=mission).order_by('id').first()
+    cargo_items = {
+        item.pk: item
+        for item in CargoItems.objects.filter(cargo=mission_cargo).select_related('product').order_by('pk')
+    }
+    assigned_trucks = TrucksForMission.objects.filter(mission=mission).values('truck_id')
+    trucks = {
+        truck.pk: truck
+        for truck in Truck.objects.filter(vendor=vendor, status='active').exclude(pk__in=assigned_trucks)
+    }
+
+    loads, unplanned = plan_truck_loads(
+        [(item.pk, item.quantity - item.allocated_quantity) for item in cargo_items.values()],
+        [(truck.pk, truck.capacity) for truck in trucks.values()]
+    )
+
+    assignments = []
+    for truck_id, load in loads.items():
+        truck = trucks[truck_id]
+        assignments.append({
+            'truck': truck.pk,
+            'vehicle_name': truck.vehicle_name,
+            'capacity': truck.capacity,
+            'load': sum(quantity for _, quantity in load),
+            'cargo_items': [
+                {
+                    'cargo_item_id': str(cargo_items[item_id].unique_id),
+                    'product_name': cargo_items[item_id].product.name,
+                    'quantity': quantity
+                }
+                for item_id, quantity in load
+            ]
+        })
+
+    return {
+        'mission': mission.pk,
+        'trucks_used': len(assignments),
+        'total_quantity': sum(assignment['load'] for assignment in assignments),
+        'assignments': assignments,
+        'unplanned': [
+            {'cargo_item_id': str(cargo_items[item_id].unique_id), 'quantity': quantity}
+            for item_id, quantity in unplanned
+        ],
+    }
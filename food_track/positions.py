@@ -0,0 +1,213 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from food_track.models import Truck, TruckLatestPosition, TruckPosition
+from food_track.position_format import parse_records
+
+POSITION_WRITE_BATCH_SIZE = 1000
+
+# Truck ids are bigint primary keys
+MAX_TRUCK_ID = 2 ** 63 - 1
+
+
+def parse_timestamp(value):
+    """ISO 8601 string or seconds since the epoch, as an aware datetime"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+        return parsed
+    return None
+
+
+def parse_pings(pings, now=None):
+    """
+    Validate {"truck", "timestamp", "lat", "lon", "speed"} dicts into
+    (truck id, recorded_at, latitude, longitude, speed) rows, returned with the index of
+    each row's ping. Invalid pings are left out and reported as {"index", "errors"}, they
+    do not reject the rest of the batch.
+    """
+    latest_allowed = (now or timezone.now()) + datetime.timedelta(
+        seconds=getattr(settings, 'POSITION_MAX_CLOCK_SKEW', 300)
+    )
+    indexes = []
+    rows = []
+    rejected = []
+    for index, ping in enumerate(pings):
+        if not isinstance(ping, dict):
+            rejected.append({'index': index, 'errors': ["Each ping must be an object"]})
+            continue
+        errors = []
+        truck_id = ping.get('truck')
+        if not isinstance(truck_id, int) or isinstance(truck_id, bool) or not 0 < truck_id <= MAX_TRUCK_ID:
+            errors.append("truck must be a truck id")
+        try:
+            recorded_at = parse_timestamp(ping.get('timestamp'))
+        except (ValueError, OverflowError, OSError):
+            recorded_at = None
+        if recorded_at is None:
+            errors.append("timestamp must be an ISO 8601 date time or seconds since the epoch")
+        elif recorded_at > latest_allowed:
+            errors.append("timestamp is in the future")
+        try:
+            latitude = float(ping.get('lat'))
+            longitude = float(ping.get('lon'))
+        except (TypeError, ValueError):
+            errors.append("lat and lon must be numbers")
+        else:
+            if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+                errors.append("lat must be within -90..90 and lon within -180..180")
+        speed = ping.get('speed')
+        if speed is not None:
+            try:
+                speed = float(speed)
+            except (TypeError, ValueError):
+                speed = -1
+            if not speed >= 0:
+                errors.append("speed must be a positive number")
+        if errors:
+            rejected.append({'index': index, 'errors': errors})
+            continue
+        indexes.append(index)
+        rows.append((truck_id, recorded_at, latitude, longitude, speed))
+    return indexes, rows, rejected
+
+
+def insert_rows(sql, columns, rows):
+    """Run sql with one VALUES list per row, in batches, sql has a {values} placeholder"""
+    placeholder = f"({', '.join(['%s'] * columns)})"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), POSITION_WRITE_BATCH_SIZE):
+            batch = rows[start:start + POSITION_WRITE_BATCH_SIZE]
+            cursor.execute(sql.format(values=', '.join([placeholder] * len(batch))), [value for row in batch for value in row])
+
+
+def database_rows(rows, now):
+    """Rows with their timestamps adapted for the database and the write time appended"""
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(now)
+    return [
+        (truck_id, adapt(recorded_at), latitude, longitude, speed, now)
+        for truck_id, recorded_at, latitude, longitude, speed in rows
+    ]
+
+
+def upsert_latest_positions(rows, now):
+    """
+    Move TruckLatestPosition forward to the newest of the given rows per truck. A row older
+    than the stored position, e.g. a ping delivered late, leaves it unchanged.
+    """
+    newest = {}
+    for row in rows:
+        if row[0] not in newest or row[1] > newest[row[0]][1]:
+            newest[row[0]] = row
+    table = connection.ops.quote_name(TruckLatestPosition._meta.db_table)
+    insert_rows(
+        f"INSERT INTO {table} (truck_id, recorded_at, latitude, longitude, speed, updated_at) VALUES {{values}} "
+        f"ON CONFLICT (truck_id) DO UPDATE SET recorded_at = EXCLUDED.recorded_at, latitude = EXCLUDED.latitude, "
+        f"longitude = EXCLUDED.longitude, speed = EXCLUDED.speed, updated_at = EXCLUDED.updated_at "
+        f"WHERE EXCLUDED.recorded_at > {table}.recorded_at",
+        6,
+        database_rows(list(newest.values()), now)
+    )
+
+
+@transaction.atomic
+def write_positions(rows):
+    """
+    Append validated rows to TruckPosition and update the latest position of their trucks.
+    Written with plain multi-row INSERTs, building a model instance per ping costs more
+    than the insert itself.
+    """
+    if not rows:
+        return
+    now = timezone.now()
+    table = connection.ops.quote_name(TruckPosition._meta.db_table)
+    insert_rows(
+        f"INSERT INTO {table} (truck_id, recorded_at, latitude, longitude, speed, received_at) VALUES {{values}}",
+        6,
+        database_rows(rows, now)
+    )
+    upsert_latest_positions(rows, now)
+
+
+def ingest_positions(vendor, pings):
+    """
+    Validate and store a batch of position pings sent for the vendor's trucks.
+    Returns the number of stored pings and the rejected ones with their errors.
+    """
+    return store_positions(vendor, *parse_pings(pings))
+
+
+def ingest_position_records(vendor, records):
+    """ingest_positions for records decoded from a binary batch, see food_track.position_format"""
+    return store_positions(vendor, *parse_records(records, timezone.now()))
+
+
+def store_positions(vendor, indexes, rows, rejected):
+    """Write the parsed rows of trucks belonging to the vendor, rejecting the others"""
+    truck_ids = {row[0] for row in rows}
+    owned = set(Truck.objects.filter(vendor=vendor, pk__in=truck_ids).values_list('pk', flat=True))
+    if owned != truck_ids:
+        accepted = []
+        for index, row in zip(indexes, rows):
+            if row[0] in owned:
+                accepted.append(row)
+            else:
+                rejected.append({'index': index, 'errors': [f"Truck {row[0]} not found or doesn't belong to your vendor"]})
+        rejected.sort(key=lambda rejection: rejection['index'])
+        rows = accepted
+
+    write_positions(rows)
+    return len(rows), rejected
+
+
+def month_bounds(first, count):
+    """(start, end) dates of count months from the month of first"""
+    first = first.replace(day=1)
+    for _ in range(count):
+        following = (first + datetime.timedelta(days=32)).replace(day=1)
+        yield first, following
+        first = following
+
+
+def create_position_partitions(months, first=None):
+    """
+    Create the monthly TruckPosition partitions from the month of first (today by default)
+    onwards, PostgreSQL only. Existing partitions are left alone. Returns the created names.
+
+    Pings of a month without a partition land in the DEFAULT partition, and PostgreSQL
+    refuses to create a partition while the default holds rows of its range. Those rows
+    are moved to the new partition in the transaction creating it.
+    """
+    table = connection.ops.quote_name(TruckPosition._meta.db_table)
+    default = connection.ops.quote_name(f"{TruckPosition._meta.db_table}_default")
+    created = []
+    for start, end in month_bounds(first or datetime.date.today(), months):
+        name = f"{TruckPosition._meta.db_table}_{start:%Y_%m}"
+        bounds = [f"{start} 00:00:00+00", f"{end} 00:00:00+00"]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            # Pings written meanwhile would land in the default again, hold them until commit
+            cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(f"CREATE TEMPORARY TABLE truckposition_moved (LIKE {default})")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {default} WHERE recorded_at >= %s AND recorded_at < %s RETURNING *) "
+                f"INSERT INTO truckposition_moved SELECT * FROM moved",
+                bounds
+            )
+            cursor.execute(
+                f"CREATE TABLE {connection.ops.quote_name(name)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{bounds[0]}') TO ('{bounds[1]}')"
+            )
+            cursor.execute(f"INSERT INTO {table} SELECT * FROM truckposition_moved")
+            cursor.execute("DROP TABLE truckposition_moved")
+        created.append(name)
+    return created
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from food_track.commit_hooks import CommitBatch
+from food_track.models import TrucksForMission, VendorMission
+
+
+class Subscription:
+    """
+    One connected client. Events are handed over from any thread and queued on the event
+    loop the client was subscribed from. A client that stops reading gets a single resync
+    event instead of an unbounded backlog.
+    """
+
+    def __init__(self, vendor_id, loop, max_size):
+        self.vendor_id = vendor_id
+        self.loop = loop
+        self.queue = asyncio.Queue(max_size)
+        self.overflowed = False
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        if self.overflowed and self.queue.empty():
+            self.overflowed = False
+            return {'event': 'resync'}
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Fans events out to the subscribers of the same process. Enough for a single ASGI
+    worker; with several workers use RedisBroker so events reach every process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, vendor_id):
+        """Subscribe to the vendor's events, must be called from the event loop that reads them"""
+        subscription = Subscription(
+            vendor_id, asyncio.get_running_loop(), getattr(settings, 'REALTIME_QUEUE_SIZE', 100)
+        )
+        with self.lock:
+            self.subscribers.setdefault(vendor_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.vendor_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscribers.pop(subscription.vendor_id, None)
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscribers.values())
+
+    def publish(self, vendor_id, event):
+        self.deliver(vendor_id, event)
+
+    def deliver(self, vendor_id, event):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(vendor_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis pub/sub on REDIS_URL. Each process listens once, on the first
+    subscription, and fans what it receives out to its own subscribers.
+    """
+    channel_prefix = 'logitrack:realtime:'
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self.url = settings.REALTIME_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+        self.listener = None
+
+    def subscribe(self, vendor_id):
+        subscription = super().subscribe(vendor_id)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self.listen())
+        return subscription
+
+    def publish(self, vendor_id, event):
+        self.client.publish(f"{self.channel_prefix}{vendor_id}", json.dumps(event))
+
+    async def listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        async with client.pubsub() as pubsub:
+            await pubsub.psubscribe(f"{self.channel_prefix}*")
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                vendor_id = int(message['channel'].decode()[len(self.channel_prefix):])
+                self.deliver(vendor_id, json.loads(message['data']))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process wide broker, an instance of the REALTIME_BROKER class"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = getattr(settings, 'REALTIME_BROKER', 'food_track.realtime.InProcessBroker')
+                _broker = import_string(broker_class)()
+    return _broker
+
+
+class PendingEvents(CommitBatch):
+    """on_commit callback publishing the events of a transaction once it is committed"""
+
+    def __init__(self):
+        super().__init__()
+        self.events = {}
+        self.mission_statuses = {}
+        self.allocations = set()
+
+    def run(self):
+        publish_pending(self)
+
+
+def queue_events(add):
+    """Add to the transaction's pending events, registering them first if needed"""
+    PendingEvents.add(add)
+
+
+def publish_event(vendor_id, event):
+    """Publish an event to the vendor's subscribers once the current transaction commits"""
+    key = (vendor_id, json.dumps(event, sort_keys=True))
+    queue_events(lambda pending: pending.events.setdefault(key, (vendor_id, event)))
+
+
+def publish_mission_status(mission_id, status):
+    """Publish a mission's new status to the vendors it is assigned to"""
+    def add(pending):
+        pending.mission_statuses[mission_id] = status
+
+    queue_events(add)
+
+
+def publish_allocation_changes(truck_mission_ids):
+    """Publish that the cargo allocated to these truck assignments changed"""
+    truck_mission_ids = set(truck_mission_ids)
+    queue_events(lambda pending: pending.allocations.update(truck_mission_ids))
+
+
+def publish_pending(pending):
+    events = list(pending.events.values())
+
+    if pending.mission_statuses:
+        for mission_id, vendor_id in VendorMission.objects.filter(
+            mission_id__in=pending.mission_statuses
+        ).values_list('mission_id', 'vendor_id'):
+            events.append((vendor_id, {
+                'event': 'mission.status',
+                'mission_id': mission_id,
+                'status': pending.mission_statuses[mission_id],
+            }))
+
+    # Allocations of assignments deleted in the same transaction have nobody left to tell
+    if pending.allocations:
+        for truck_mission_id, mission_id, vendor_id in TrucksForMission.objects.filter(
+            pk__in=pending.allocations
+        ).values_list('id', 'mission_id', 'vendor_id'):
+            events.append((vendor_id, {
+                'event': 'allocation.changed',
+                'assignment_id': truck_mission_id,
+                'mission_id': mission_id,
+            }))
+
+    broker = get_broker()
+    for vendor_id, event in events:
+        broker.publish(vendor_id, event)
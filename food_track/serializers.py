@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 
-from Accounts.models import UserProfile
 from .models import *
+from food_track.geometry import parse_boundary
 import os
 
 User = get_user_model()
@@ -31,7 +32,15 @@ class ProductGetSerializer(serializers.ModelSerializer):
 class RegionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Region
-        fields = ['region_name']
+        fields = ['region_name', 'boundary']
+
+    def validate_boundary(self, value):
+        if value is not None:
+            try:
+                parse_boundary(value)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return value
 
 class RegionGetSerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,13 +50,44 @@ class RegionGetSerializer(serializers.ModelSerializer):
 class MissionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mission
-        fields = ['title', 'type', 'number_of_beneficiaries', 'description', 'dept_location', 'destination_location', 'start_date', 'end_date', 'status']
+        fields = ['title', 'type', 'number_of_beneficiaries', 'description', 'dept_location', 'destination_location',
+                  'dept_latitude', 'dept_longitude', 'destination_latitude', 'destination_longitude',
+                  'start_date', 'end_date', 'status']
+        extra_kwargs = {
+            'dept_latitude': {'min_value': -90, 'max_value': 90},
+            'dept_longitude': {'min_value': -180, 'max_value': 180},
+            'destination_latitude': {'min_value': -90, 'max_value': 90},
+            'destination_longitude': {'min_value': -180, 'max_value': 180},
+        }
+
+    def validate(self, data):
+        # A location's coordinates are given together or not at all
+        for location in ['dept', 'destination']:
+            latitude, longitude = (
+                data.get(field, getattr(self.instance, field, None))
+                for field in [f'{location}_latitude', f'{location}_longitude']
+            )
+            if (latitude is None) != (longitude is None):
+                raise serializers.ValidationError(f"{location}_latitude and {location}_longitude must be set together")
+        return data
 
 class MissionGetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mission
         fields = '__all__'
 
+class MissionSummarySerializer(serializers.ModelSerializer):
+    allocation_rate = serializers.FloatField(read_only=True)
+    capacity_utilization = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = MissionSummary
+        fields = [
+            'id', 'mission', 'title', 'type', 'status', 'start_date', 'end_date', 'cargo_item_count',
+            'total_quantity', 'allocated_quantity', 'trucks_assigned', 'truck_capacity',
+            'allocation_rate', 'capacity_utilization', 'updated_at',
+        ]
+
 # Dependent serializers
 class DriverCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -163,11 +203,10 @@ class TruckCargoItemCreateSerializer(serializers.ModelSerializer):
             })
             
         # Check available quantity
-        other_allocations = TruckCargoItem.objects.filter(
-            cargo_item=cargo_item
-        ).exclude(truck_mission=truck_mission).aggregate(
-            models.Sum('transferring_quantity')
-        )['transferring_quantity__sum'] or 0
+        own_allocation = TruckCargoItem.objects.filter(
+            cargo_item=cargo_item, truck_mission=truck_mission
+        ).values_list('transferring_quantity', flat=True).first() or 0
+        other_allocations = cargo_item.allocated_quantity - own_allocation
         
         available = cargo_item.quantity - other_allocations
         if transferring_quantity > available:
@@ -247,13 +286,7 @@ class TrucksForMissionCreateSerializer(serializers.ModelSerializer):
                 quantity = int(item['quantity'])
                 
                 # Check if quantity is valid
-                other_allocations = TruckCargoItem.objects.filter(
-                    cargo_item=cargo_item
-                ).aggregate(
-                    models.Sum('transferring_quantity')
-                )['transferring_quantity__sum'] or 0
-                
-                available = cargo_item.quantity - other_allocations
+                available = cargo_item.quantity - cargo_item.allocated_quantity
                 if quantity > available:
                     raise serializers.ValidationError({
                         "cargo_items": f"Cargo item {cargo_item.product.name} only has {available} units available"
@@ -277,6 +310,25 @@ class TrucksForMissionCreateSerializer(serializers.ModelSerializer):
         
         return trucks_for_mission
 
+class TruckAssignmentEntrySerializer(serializers.Serializer):
+    truck = serializers.IntegerField()
+    cargo_items = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        help_text="List of cargo items with quantities to assign to this truck"
+    )
+
+class TrucksForMissionBulkCreateSerializer(serializers.Serializer):
+    """Input for assigning many trucks, each with its cargo list, to one mission"""
+    mission = serializers.IntegerField()
+    assignments = TruckAssignmentEntrySerializer(many=True, allow_empty=False)
+
+class LoadPlanRequestSerializer(serializers.Serializer):
+    commit = serializers.BooleanField(
+        default=False,
+        help_text="Create the planned truck assignments instead of only returning the plan"
+    )
+
 class TrucksForMissionGetSerializer(serializers.ModelSerializer):
     mission = MissionGetSerializer()
     truck = TruckGetSerializer()
@@ -317,9 +369,7 @@ class TruckCargoAssignmentSerializer(serializers.ModelSerializer):
     def get_capacity_utilization(self, obj):
         """Calculate how much of the truck's capacity is being utilized"""
         truck = obj.truck
-        total_items = obj.truck_cargo_items.aggregate(
-            total=models.Sum('transferring_quantity')
-        )['total'] or 0
+        total_items = obj.assigned_load
         
         capacity = truck.capacity
         utilization_percentage = (total_items / capacity * 100) if capacity > 0 else 0
@@ -371,22 +421,55 @@ class ComprehensiveMissionSerializer(serializers.ModelSerializer):
         model = Mission
         fields = ['unique_id', 'id', 'title', 'type', 'number_of_beneficiaries', 
                  'description', 'dept_location', 'destination_location', 
+                 'dept_latitude', 'dept_longitude', 'destination_latitude', 'destination_longitude',
                  'start_date', 'end_date', 'status','cargo_items', 'assigned_trucks', 
                  'assigned_vendors']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Prefetch every relation the nested payload touches so that a page of
+        missions is serialized with a fixed number of queries
+        """
+        return queryset.prefetch_related(
+            Prefetch('cargo_set', queryset=Cargo.objects.order_by('id')),
+            Prefetch(
+                'cargo_set__cargoitems_set',
+                queryset=CargoItems.objects.select_related('product').order_by('id')
+            ),
+            Prefetch(
+                'trucksformission_set',
+                queryset=TrucksForMission.objects.select_related('truck__vendor').order_by('id')
+            ),
+            Prefetch(
+                'trucksformission_set__truck_cargo_items',
+                queryset=TruckCargoItem.objects.select_related(
+                    'cargo_item__product', 'cargo_item__cargo__mission'
+                ).order_by('id')
+            ),
+            Prefetch(
+                'vendormission_set',
+                queryset=VendorMission.objects.select_related('vendor').order_by('id')
+            ),
+            Prefetch(
+                'vendormission_set__vendor__contact_set',
+                queryset=Contact.objects.filter(user__is_active=True).select_related('user__profile').order_by('id')
+            ),
+        )
+    
     def get_cargo_items(self, mission):
         # Get the cargo associated with this mission
-        cargo = Cargo.objects.filter(mission=mission).first()
-        if not cargo:
+        cargos = list(mission.cargo_set.all())
+        if not cargos:
             return []
         
         # Get all cargo items for this cargo
-        cargo_items = CargoItems.objects.filter(cargo=cargo)
+        cargo_items = cargos[0].cargoitems_set.all()
         return CargoItemsGetSerializer(cargo_items, many=True).data
     
     def get_assigned_trucks(self, mission):
         # Get all truck assignments for this mission
-        truck_assignments = TrucksForMission.objects.filter(mission=mission)
+        truck_assignments = mission.trucksformission_set.all()
         
         # Format the data to include both truck details and cargo assignments
         result = []
@@ -395,7 +478,7 @@ class ComprehensiveMissionSerializer(serializers.ModelSerializer):
             truck_data = TruckGetSerializer(assignment.truck).data
             
             # Get cargo items assigned to this truck for this mission
-            truck_cargo_items = TruckCargoItem.objects.filter(truck_mission=assignment)
+            truck_cargo_items = assignment.truck_cargo_items.all()
             cargo_assignments = []
             
             # Calculate total quantity assigned to this truck
@@ -434,31 +517,29 @@ class ComprehensiveMissionSerializer(serializers.ModelSerializer):
     
     def get_assigned_vendors(self, mission):
         # Get all vendor assignments for this mission
-        vendor_missions = VendorMission.objects.filter(mission=mission)
+        vendor_missions = mission.vendormission_set.all()
         result = []
         
         for vm in vendor_missions:
             vendor_data = VendorGetSerializer(vm.vendor).data
             
-            # Get contacts for this vendor
-            contacts = Contact.objects.filter(vendor=vm.vendor)
+            # Get active contacts for this vendor
             contact_data = []
             
-            for contact in contacts:
-                user_data = User.objects.filter(id=contact.user.id, is_active=True).first()
-                if user_data:
-                    user_profile = UserProfile.objects.filter(profile_user=user_data, profile_is_active=True).first()
-                    if user_profile:
-                        # Convert UserProfile to a serializable dictionary
-                        contact_info = {
-                            'id': user_profile.id,
-                            'unique_id': str(user_profile.profile_unique_id),
-                            'name': f"{user_data.first_name} {user_data.last_name}",
-                            'email': user_data.email,
-                            'phone': user_profile.profile_phone,
-                            'organization': user_profile.profile_organization
-                        }
-                        contact_data.append(contact_info)
+            for contact in vm.vendor.contact_set.all():
+                user_data = contact.user
+                user_profile = getattr(user_data, 'profile', None)
+                if user_profile and user_profile.profile_is_active:
+                    # Convert UserProfile to a serializable dictionary
+                    contact_info = {
+                        'id': user_profile.id,
+                        'unique_id': str(user_profile.profile_unique_id),
+                        'name': f"{user_data.first_name} {user_data.last_name}",
+                        'email': user_data.email,
+                        'phone': user_profile.profile_phone,
+                        'organization': user_profile.profile_organization
+                    }
+                    contact_data.append(contact_info)
             
             # Create a complete vendor assignment object
             assignment_data = {
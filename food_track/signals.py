@@ -0,0 +1,283 @@
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from Accounts.models import UserProfile
+from food_track.models import (
+    Cargo, CargoItems, Contact, Mission, Product, Region, Truck, TrucksForMission, TruckCargoItem, Vendor,
+    VendorMission, adjust_allocation_counters
+)
+from food_track.caching import invalidate_responses
+from food_track.realtime import publish_allocation_changes, publish_event, publish_mission_status
+from food_track.spatial import region_index
+from food_track.summaries import schedule_summary_refresh
+from food_track.sync import record_changes, record_mission_changes
+from food_track.utils import VendorUtils
+
+@receiver(post_delete, sender=TruckCargoItem)
+def release_cargo_allocation(sender, instance, **kwargs):
+    """
+    Signal to give the allocated quantity back to the cargo item and truck counters.
+    Runs for queryset and cascade deletes as well as instance deletes.
+    """
+    adjust_allocation_counters(instance.cargo_item_id, instance.truck_mission_id, -instance.transferring_quantity)
+
+
+@receiver(pre_save, sender=Contact)
+def remember_contact_user(sender, instance, **kwargs):
+    """Signal to keep the previous user and vendor of a contact so both can be updated too"""
+    instance._previous_user_id = instance._previous_vendor_id = None
+    if instance.pk:
+        previous = Contact.objects.filter(pk=instance.pk).values_list('user_id', 'vendor_id').first()
+        if previous:
+            instance._previous_user_id, instance._previous_vendor_id = previous
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def invalidate_contact_vendor(sender, instance, **kwargs):
+    """Signal to drop the cached vendor of the users a contact links"""
+    VendorUtils.invalidate_users({instance.user_id, getattr(instance, '_previous_user_id', None)} - {None})
+
+
+@receiver(post_save, sender=Vendor)
+def invalidate_vendor_users(sender, instance, created, **kwargs):
+    """Signal to drop cached copies of a vendor that changed"""
+    if not created:
+        VendorUtils.invalidate_users(Contact.objects.filter(vendor=instance).values_list('user_id', flat=True))
+
+
+def mission_changed(mission_ids):
+    """Refresh the summaries of changed missions and log them for vendor sync"""
+    mission_ids = list(mission_ids)
+    schedule_summary_refresh(mission_ids)
+    record_mission_changes(mission_ids)
+
+
+@receiver(post_save, sender=Mission)
+def refresh_summary_for_mission(sender, instance, **kwargs):
+    """Signal to create or refresh the summary row of a mission and log the change"""
+    mission_changed([instance.pk])
+
+
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=Cargo)
+@receiver(post_save, sender=TrucksForMission)
+@receiver(post_delete, sender=TrucksForMission)
+def refresh_summary_for_mission_child(sender, instance, **kwargs):
+    """Signal to refresh the mission a cargo or truck assignment belongs to"""
+    mission_changed([instance.mission_id])
+
+
+@receiver(post_save, sender=CargoItems)
+@receiver(post_delete, sender=CargoItems)
+def refresh_summary_for_cargo_item(sender, instance, **kwargs):
+    """Signal to refresh the mission a cargo item belongs to"""
+    mission_changed(Cargo.objects.filter(pk=instance.cargo_id).values_list('mission_id', flat=True))
+
+
+@receiver(post_save, sender=TruckCargoItem)
+@receiver(post_delete, sender=TruckCargoItem)
+def refresh_summary_for_allocation(sender, instance, **kwargs):
+    """Signal to refresh the mission a cargo allocation belongs to"""
+    mission_changed(
+        TrucksForMission.objects.filter(pk=instance.truck_mission_id).values_list('mission_id', flat=True)
+    )
+
+
+@receiver(pre_save, sender=VendorMission)
+def remember_vendor_mission(sender, instance, **kwargs):
+    """Signal to keep the previous vendor and mission of an assignment so the old pair can be removed"""
+    instance._previous_vendor_id = instance._previous_mission_id = None
+    if instance.pk:
+        previous = VendorMission.objects.filter(pk=instance.pk).values_list('vendor_id', 'mission_id').first()
+        if previous:
+            instance._previous_vendor_id, instance._previous_mission_id = previous
+
+
+@receiver(post_save, sender=VendorMission)
+@receiver(post_delete, sender=VendorMission)
+def log_vendor_mission_sync(sender, instance, **kwargs):
+    """
+    Signal to sync a mission to a vendor it was assigned to, or remove it from one it left,
+    including the previous vendor when an assignment is moved
+    """
+    if kwargs['signal'] is post_delete:
+        record_changes([('delete', 'mission', instance.mission_id, instance.vendor_id)])
+        return
+    changes = [('upsert', 'mission', instance.mission_id, instance.vendor_id)]
+    previous = (getattr(instance, '_previous_mission_id', None), getattr(instance, '_previous_vendor_id', None))
+    if previous[0] and previous != (instance.mission_id, instance.vendor_id):
+        changes.append(('delete', 'mission', *previous))
+    record_changes(changes)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def log_contact_sync(sender, instance, **kwargs):
+    """Signal to sync a contact to its vendor, and remove it from the previous one if it moved"""
+    if kwargs['signal'] is post_delete:
+        record_changes([('delete', 'contact', instance.pk, instance.vendor_id)])
+        return
+    changes = [('upsert', 'contact', instance.pk, instance.vendor_id)]
+    previous_vendor_id = getattr(instance, '_previous_vendor_id', None)
+    if previous_vendor_id and previous_vendor_id != instance.vendor_id:
+        changes.append(('delete', 'contact', instance.pk, previous_vendor_id))
+    record_changes(changes)
+
+
+@receiver(post_save, sender=Truck)
+@receiver(post_delete, sender=Truck)
+def log_truck_sync(sender, instance, **kwargs):
+    """Signal to sync a truck to its vendor"""
+    action = 'delete' if kwargs['signal'] is post_delete else 'upsert'
+    record_changes([(action, 'truck', instance.pk, instance.vendor_id)])
+
+
+@receiver(post_save, sender=Truck)
+def refresh_summary_for_truck(sender, instance, created, **kwargs):
+    """Signal to refresh the summaries of the missions a truck is assigned to, its capacity may have changed"""
+    if not created:
+        schedule_summary_refresh(
+            TrucksForMission.objects.filter(truck=instance).values_list('mission_id', flat=True)
+        )
+
+
+# User fields shown in cached mission payloads. Logins save last_login only
+RESPONSE_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, update_fields=None, **kwargs):
+    """Signal to drop the cached responses built from the model that changed"""
+    if sender is User and update_fields is not None and RESPONSE_USER_FIELDS.isdisjoint(update_fields):
+        return
+    invalidate_responses(sender)
+
+
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=Cargo)
+@receiver(post_save, sender=VendorMission)
+@receiver(post_delete, sender=VendorMission)
+@receiver(post_delete, sender=TrucksForMission)
+def touch_mission(sender, instance, **kwargs):
+    """
+    Signal to move the mission's updated_at forward when a row it is built from changes or
+    goes away. Deleted rows cannot raise the newest updated_at themselves, so without this
+    the mission's ETag and Last-Modified would not change. A vendor assignment moved to
+    another mission changes the previous one too.
+    """
+    mission_ids = {instance.mission_id, getattr(instance, '_previous_mission_id', None)} - {None}
+    Mission.objects.filter(pk__in=mission_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=CargoItems)
+def touch_mission_for_cargo_item(sender, instance, **kwargs):
+    """Signal to move the mission's updated_at forward when one of its cargo items is deleted"""
+    Mission.objects.filter(cargo=instance.cargo_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=TruckCargoItem)
+def touch_mission_for_allocation(sender, instance, **kwargs):
+    """Signal to move the mission's updated_at forward when a cargo allocation is deleted"""
+    Mission.objects.filter(trucksformission=instance.truck_mission_id).update(updated_at=timezone.now())
+
+
+# User fields shown in mission payloads, a login only saves last_login
+MISSION_USER_FIELDS = {'first_name', 'last_name', 'email', 'is_active'}
+
+
+def touch_missions(missions):
+    """Move updated_at forward on the missions of a queryset, so their ETag and Last-Modified change"""
+    Mission.objects.filter(pk__in=missions.values('pk')).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Truck)
+def touch_missions_for_truck(sender, instance, created, **kwargs):
+    """Signal to move forward the missions a changed truck is assigned to, they embed the truck"""
+    if not created:
+        touch_missions(Mission.objects.filter(trucksformission__truck=instance.pk))
+
+
+@receiver(post_save, sender=Product)
+def touch_missions_for_product(sender, instance, created, **kwargs):
+    """Signal to move forward the missions carrying a changed product, they embed the product"""
+    if not created:
+        touch_missions(Mission.objects.filter(cargo__cargoitems__product=instance.pk))
+
+
+@receiver(post_save, sender=Vendor)
+def touch_missions_for_vendor(sender, instance, created, **kwargs):
+    """Signal to move forward the missions a changed vendor is assigned to or has trucks on"""
+    if not created:
+        touch_missions(Mission.objects.filter(
+            Q(vendormission__vendor=instance.pk) | Q(trucksformission__vendor=instance.pk)
+        ))
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def touch_missions_for_contact(sender, instance, **kwargs):
+    """Signal to move forward the missions of the vendors listing a changed contact"""
+    vendor_ids = {instance.vendor_id, getattr(instance, '_previous_vendor_id', None)} - {None}
+    touch_missions(Mission.objects.filter(vendormission__vendor__in=vendor_ids))
+
+
+@receiver(post_save, sender=User)
+def touch_missions_for_user(sender, instance, created, update_fields=None, **kwargs):
+    """Signal to move forward the missions listing a changed user as a vendor contact"""
+    if created or (update_fields is not None and not MISSION_USER_FIELDS & set(update_fields)):
+        return
+    touch_missions(Mission.objects.filter(vendormission__vendor__contact__user=instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def touch_missions_for_profile(sender, instance, **kwargs):
+    """Signal to move forward the missions listing the profile's user as a vendor contact"""
+    touch_missions(Mission.objects.filter(vendormission__vendor__contact__user=instance.profile_user_id))
+
+
+@receiver(pre_save, sender=Mission)
+def remember_mission_status(sender, instance, **kwargs):
+    """Signal to keep the previous status of a mission so a status change can be pushed"""
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = Mission.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Mission)
+def push_mission_status(sender, instance, created, **kwargs):
+    """Signal to push a mission's new status to the vendors it is assigned to"""
+    if not created and instance.status != getattr(instance, '_previous_status', instance.status):
+        publish_mission_status(instance.pk, instance.status)
+
+
+@receiver(post_save, sender=TrucksForMission)
+@receiver(post_delete, sender=TrucksForMission)
+def push_assignment(sender, instance, **kwargs):
+    """Signal to push new and removed truck assignments to their vendor"""
+    if kwargs['signal'] is post_save and not kwargs['created']:
+        return
+    publish_event(instance.vendor_id, {
+        'event': 'assignment.deleted' if kwargs['signal'] is post_delete else 'assignment.created',
+        'assignment_id': instance.pk,
+        'mission_id': instance.mission_id,
+        'truck_id': instance.truck_id,
+    })
+
+
+@receiver(post_save, sender=TruckCargoItem)
+@receiver(post_delete, sender=TruckCargoItem)
+def push_allocation(sender, instance, **kwargs):
+    """Signal to push that the cargo allocated to a truck assignment changed"""
+    publish_allocation_changes([instance.truck_mission_id])
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_region_index(sender, instance, **kwargs):
+    """Signal to rebuild this process's region index with the changed boundary"""
+    region_index.clear()
@@ -0,0 +1,280 @@
+"""
+In-process spatial indexes for region lookups and nearest truck queries.
+
+Both bucket their items into a uniform grid of GEO_INDEX_CELL_SIZE degree cells, so a
+query only looks at the few cells around its point. The indexes are built from the
+database on first use and kept per process for a timeout, the region index is also
+dropped as soon as a region changes in this process.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy
+from django.conf import settings
+from food_track.geometry import (
+    EARTH_RADIUS_KM, KM_PER_DEGREE, boundary_bounds, haversine_km, parse_boundary, polygons_contain
+)
+from food_track.models import Region, TruckLatestPosition, TrucksForMission, Vendor
+
+# Up to this many trucks, measuring all of a vendor's trucks beats filtering grid cells
+VENDOR_SCAN_MAX_TRUCKS = 5000
+
+
+class Grid:
+    """Cells of about cell_size degrees, a whole number of them around the globe"""
+
+    def __init__(self, cell_size):
+        self.rows = max(1, round(180 / cell_size))
+        self.columns = max(1, round(360 / cell_size))
+        self.cell_latitude = 180 / self.rows
+        self.cell_longitude = 360 / self.columns
+
+    def row(self, latitude):
+        return numpy.clip(numpy.floor((numpy.asarray(latitude) + 90) / self.cell_latitude), 0, self.rows - 1).astype(int)
+
+    def column(self, longitude):
+        # 180 and -180 are the same meridian and share the first column
+        return (numpy.floor((numpy.asarray(longitude) + 180) / self.cell_longitude) % self.columns).astype(int)
+
+    def key(self, row, column):
+        return row * self.columns + column
+
+
+class RegionIndex:
+    """Region outlines by the grid cells their bounding box covers"""
+
+    def __init__(self, regions, cell_size):
+        """regions are (region id, polygons) pairs, polygons as returned by parse_boundary"""
+        self.grid = Grid(cell_size)
+        self.polygons = {}
+        self.bounds = {}
+        self.cells = defaultdict(list)
+        for region_id, polygons in regions:
+            bounds = boundary_bounds(polygons)
+            self.polygons[region_id] = polygons
+            self.bounds[region_id] = bounds
+            min_latitude, min_longitude, max_latitude, max_longitude = bounds
+            last_column = self.grid.columns - 1 if max_longitude >= 180 else int(self.grid.column(max_longitude))
+            columns = range(int(self.grid.column(min_longitude)), last_column + 1)
+            for row in range(int(self.grid.row(min_latitude)), int(self.grid.row(max_latitude)) + 1):
+                for column in columns:
+                    self.cells[self.grid.key(row, column)].append(region_id)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def locate(self, latitude, longitude):
+        """Ids of the regions containing the point"""
+        key = int(self.grid.key(self.grid.row(latitude), self.grid.column(longitude)))
+        found = []
+        for region_id in self.cells.get(key, ()):
+            min_latitude, min_longitude, max_latitude, max_longitude = self.bounds[region_id]
+            if (
+                min_latitude <= latitude <= max_latitude and min_longitude <= longitude <= max_longitude
+                and polygons_contain(self.polygons[region_id], longitude, latitude)
+            ):
+                found.append(region_id)
+        return found
+
+    def locate_brute_force(self, latitude, longitude):
+        """locate() testing every region, the reference the grid is checked against"""
+        return [
+            region_id for region_id, polygons in self.polygons.items()
+            if polygons_contain(polygons, longitude, latitude)
+        ]
+
+
+class TruckIndex:
+    """
+    Truck positions sorted by grid cell. A cell's trucks are one slice of the arrays,
+    found with a binary search on the sorted cell keys.
+    """
+
+    def __init__(self, truck_ids, vendor_ids, latitudes, longitudes, cell_size):
+        self.grid = Grid(cell_size)
+        keys = self.grid.key(self.grid.row(latitudes), self.grid.column(longitudes))
+        order = numpy.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.truck_ids = numpy.asarray(truck_ids, dtype=numpy.int64)[order]
+        self.vendor_ids = numpy.asarray(vendor_ids, dtype=numpy.int64)[order]
+        self.latitudes = numpy.asarray(latitudes, dtype=float)[order]
+        self.longitudes = numpy.asarray(longitudes, dtype=float)[order]
+        # Array positions grouped by vendor, a vendor's trucks are one slice
+        self.by_vendor = numpy.argsort(self.vendor_ids, kind='stable')
+        self.vendor_keys = self.vendor_ids[self.by_vendor]
+
+    def __len__(self):
+        return len(self.truck_ids)
+
+    def ring_keys(self, row, column, radius):
+        """Keys of the cells radius cells away from (row, column), wrapping around in longitude"""
+        span = numpy.arange(-radius, radius + 1)
+        if radius == 0:
+            rows, columns = numpy.array([row]), numpy.array([column])
+        else:
+            edge = numpy.full(len(span), radius)
+            rows = numpy.concatenate([row - edge, row + edge, row + span[1:-1], row + span[1:-1]])
+            columns = numpy.concatenate([column + span, column + span, column - edge[1:-1], column + edge[1:-1]])
+        inside = (rows >= 0) & (rows < self.grid.rows)
+        return numpy.unique(self.grid.key(rows[inside], columns[inside] % self.grid.columns))
+
+    def cell_members(self, keys):
+        """Array positions of the trucks in the given cells"""
+        starts = numpy.searchsorted(self.keys, keys, side='left')
+        lengths = numpy.searchsorted(self.keys, keys, side='right') - starts
+        total = int(lengths.sum())
+        if not total:
+            return numpy.empty(0, dtype=int)
+        # Concatenated ranges starts[i]..starts[i] + lengths[i]
+        offsets = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+        return offsets + numpy.arange(total)
+
+    def unseen_distance_km(self, latitude, radius):
+        """
+        Lower bound of the distance from a point to any cell more than radius cells away.
+        Such a cell is radius cells of latitude away, or radius cells of longitude away within
+        the latitudes searched so far.
+        """
+        if radius == 0:
+            return 0.0
+        by_latitude = radius * self.grid.cell_latitude * KM_PER_DEGREE
+        longitude_gap = min(math.pi, math.radians(radius * self.grid.cell_longitude))
+        widest = math.radians(min(90.0, abs(latitude) + (radius + 1) * self.grid.cell_latitude))
+        by_longitude = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(widest) * math.sin(longitude_gap / 2)))
+        return min(by_latitude, by_longitude)
+
+    def vendor_members(self, vendor_id):
+        """Array positions of the vendor's trucks"""
+        start, end = numpy.searchsorted(self.vendor_keys, [vendor_id, vendor_id + 1])
+        return self.by_vendor[start:end]
+
+    def nearest(self, latitude, longitude, k, vendor_id=None):
+        """
+        (truck ids, latitudes, longitudes, distances in km) of the k trucks nearest to the
+        point, closest first, only the vendor's trucks when vendor_id is given.
+
+        Rings of cells are searched outwards until k trucks are found that are closer than
+        anything in the cells not searched yet. When more cells than trucks would have to be
+        looked at, every truck is measured instead, as are the trucks of a vendor with a
+        small fleet.
+        """
+        if vendor_id is not None and len(self.vendor_members(vendor_id)) <= VENDOR_SCAN_MAX_TRUCKS:
+            return self.nearest_brute_force(latitude, longitude, k, vendor_id)
+        row = int(self.grid.row(latitude))
+        column = int(self.grid.column(longitude))
+        found = []
+        distances = []
+        count = 0
+        radius = 0
+        while True:
+            members = self.cell_members(self.ring_keys(row, column, radius))
+            if vendor_id is not None:
+                members = members[self.vendor_ids[members] == vendor_id]
+            if len(members):
+                found.append(members)
+                distances.append(haversine_km(latitude, longitude, self.latitudes[members], self.longitudes[members]))
+                count += len(members)
+
+            covered = 2 * radius + 1 >= self.grid.columns and radius >= max(row, self.grid.rows - 1 - row)
+            if covered:
+                break
+            if count >= k:
+                kth = numpy.partition(numpy.concatenate(distances), k - 1)[k - 1]
+                if kth <= self.unseen_distance_km(latitude, radius):
+                    break
+            radius += 1
+            # Past half the globe the rings wrap onto cells already searched
+            if (2 * radius + 1) ** 2 > len(self) or 2 * radius + 1 > self.grid.columns:
+                return self.nearest_brute_force(latitude, longitude, k, vendor_id)
+
+        if not found:
+            return self.take(numpy.empty(0, dtype=int), numpy.empty(0))
+        return self.closest(numpy.concatenate(found), numpy.concatenate(distances), k)
+
+    def nearest_brute_force(self, latitude, longitude, k, vendor_id=None):
+        """nearest() measuring every truck, also the reference the grid is checked against"""
+        members = numpy.arange(len(self)) if vendor_id is None else self.vendor_members(vendor_id)
+        return self.closest(members, haversine_km(latitude, longitude, self.latitudes[members], self.longitudes[members]), k)
+
+    def closest(self, members, distances, k):
+        if len(members) > k:
+            nearest = numpy.argpartition(distances, k - 1)[:k]
+            members, distances = members[nearest], distances[nearest]
+        order = numpy.argsort(distances, kind='stable')
+        return self.take(members[order], distances[order])
+
+    def take(self, members, distances):
+        return self.truck_ids[members], self.latitudes[members], self.longitudes[members], distances
+
+
+class CachedIndex:
+    """One index per process, rebuilt by build() once it is older than timeout seconds"""
+
+    def __init__(self, build, timeout):
+        self.build = build
+        self.timeout = timeout
+        self._index = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._index is None or self._expires_at < time.monotonic():
+                self._index = self.build()
+                self._expires_at = time.monotonic() + self.timeout
+            return self._index
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+
+
+def build_region_index():
+    """Index of every region that has a boundary"""
+    regions = Region.objects.exclude(boundary=None).values_list('pk', 'boundary')
+    return RegionIndex(
+        ((region_id, parse_boundary(boundary)) for region_id, boundary in regions),
+        getattr(settings, 'GEO_INDEX_CELL_SIZE', 0.5)
+    )
+
+
+def available_truck_positions():
+    """
+    (truck id, vendor id, latitude, longitude) of the active trucks with a known position
+    that are not assigned to a pending or active mission.
+    """
+    busy = TrucksForMission.objects.filter(mission__status__in=['pending', 'Active']).values('truck_id')
+    return list(
+        TruckLatestPosition.objects.filter(truck__status='active').exclude(truck_id__in=busy)
+        .values_list('truck_id', 'truck__vendor_id', 'latitude', 'longitude')
+    )
+
+
+def build_truck_index():
+    """Index of the available trucks at their latest position"""
+    rows = available_truck_positions()
+    columns = numpy.array(rows, dtype=float).reshape(-1, 4)
+    return TruckIndex(
+        columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3],
+        getattr(settings, 'GEO_INDEX_CELL_SIZE', 0.5)
+    )
+
+
+region_index = CachedIndex(build_region_index, getattr(settings, 'REGION_INDEX_TIMEOUT', 3600))
+truck_index = CachedIndex(build_truck_index, getattr(settings, 'TRUCK_INDEX_TIMEOUT', 30))
+
+
+def locate_regions(latitude, longitude):
+    """Regions containing the point and the vendors operating in any of them"""
+    region_ids = region_index.get().locate(latitude, longitude)
+    regions = list(Region.objects.filter(pk__in=region_ids).order_by('pk').values('id', 'unique_id', 'region_name'))
+    vendors = Vendor.objects.filter(operationregion__region__in=region_ids).distinct().order_by('pk')
+    return regions, vendors
+
+
+def nearest_available_trucks(latitude, longitude, k, vendor_id=None):
+    """[(truck id, latitude, longitude, distance in km)] of the k nearest available trucks"""
+    truck_ids, latitudes, longitudes, distances = truck_index.get().nearest(latitude, longitude, k, vendor_id)
+    return list(zip(truck_ids.tolist(), latitudes.tolist(), longitudes.tolist(), distances.tolist()))
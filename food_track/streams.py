@@ -0,0 +1,128 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from Accounts.authentication import ClaimsJWTAuthentication
+from food_track.realtime import get_broker
+from food_track.utils import VendorUtils
+
+WEBSOCKET_PATH = '/ws/updates/'
+
+
+def authenticate_stream(raw_token):
+    """
+    Resolve the vendor a stream subscribes to from a raw access token. Returns None unless
+    the token is valid and its user is a contact of a vendor, like the vendor portal. Runs once per connection.
+    """
+    if not raw_token:
+        return None
+    try:
+        authentication = ClaimsJWTAuthentication()
+        user = authentication.get_user(authentication.get_validated_token(raw_token.encode()))
+        vendor = VendorUtils.get_vendor_for_user(user.pk)
+        return vendor.pk if vendor else None
+    except (InvalidToken, TokenError):
+        return None
+    finally:
+        # Streams outlive requests, do not keep a connection open for them
+        close_old_connections()
+
+
+def stream_token(authorization, query_token):
+    """The bearer token from the Authorization header, or ?token= for browser clients that cannot set headers"""
+    if authorization and authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):]
+    return query_token
+
+
+def format_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(vendor_id):
+    broker = get_broker()
+    subscription = broker.subscribe(vendor_id)
+    heartbeat = getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 25)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def vendor_events(request):
+    """
+    Server-sent events stream of the vendor's mission status changes, new truck assignments
+    and allocation changes. Needs an ASGI server, under WSGI the stream would hold a worker.
+    """
+    token = stream_token(request.headers.get('Authorization'), request.GET.get('token'))
+    vendor_id = await sync_to_async(authenticate_stream)(token)
+    if vendor_id is None:
+        return JsonResponse({"error": "A valid vendor access token is required"}, status=401)
+
+    response = StreamingHttpResponse(event_stream(vendor_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def websocket_updates(scope, receive, send):
+    """
+    WebSocket carrying the same events as vendor_events, one JSON message per event. The
+    access token is passed as ?token=, browsers cannot set headers on a WebSocket.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    vendor_id = await sync_to_async(authenticate_stream)(query.get('token', [None])[0])
+    if vendor_id is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    broker = get_broker()
+    subscription = broker.subscribe(vendor_id)
+
+    async def forward():
+        while True:
+            event = await subscription.get()
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    forwarder = asyncio.create_task(forward())
+    try:
+        # Messages from the client are not used, wait for it to go away
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+    finally:
+        forwarder.cancel()
+        broker.unsubscribe(subscription)
+
+
+def realtime_router(django_application):
+    """ASGI application sending WebSocket connections to websocket_updates and everything else to Django"""
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'websocket':
+            if scope['path'] == WEBSOCKET_PATH:
+                return await websocket_updates(scope, receive, send)
+            await receive()
+            return await send({'type': 'websocket.close', 'code': 4404})
+        return await django_application(scope, receive, send)
+
+    return application
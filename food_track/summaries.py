@@ -0,0 +1,101 @@
+from django.db.models import Count, Sum
+from food_track.commit_hooks import CommitBatch
+from food_track.models import CargoItems, Mission, MissionSummary, TrucksForMission
+
+# Missions recomputed per batch by rebuild_mission_summaries
+SUMMARY_BATCH_SIZE = 1000
+
+SUMMARY_FIELDS = [
+    'title', 'type', 'status', 'start_date', 'end_date', 'cargo_item_count', 'total_quantity',
+    'allocated_quantity', 'trucks_assigned', 'truck_capacity', 'updated_at',
+]
+
+
+def refresh_mission_summaries(mission_ids):
+    """
+    Recompute the summary rows of the given missions with two grouped queries and upsert them.
+    Ids of missions that no longer exist are ignored.
+    """
+    missions = list(
+        Mission.objects.filter(pk__in=mission_ids)
+        .values_list('pk', 'title', 'type', 'status', 'start_date', 'end_date')
+    )
+    if not missions:
+        return 0
+    ids = [mission[0] for mission in missions]
+
+    cargo_totals = {
+        row['cargo__mission_id']: row
+        for row in CargoItems.objects.filter(cargo__mission_id__in=ids).values('cargo__mission_id').annotate(
+            cargo_item_count=Count('id'),
+            total_quantity=Sum('quantity'),
+            allocated_quantity=Sum('allocated_quantity')
+        ).order_by()
+    }
+    truck_totals = {
+        row['mission_id']: row
+        for row in TrucksForMission.objects.filter(mission_id__in=ids).values('mission_id').annotate(
+            trucks_assigned=Count('id'),
+            truck_capacity=Sum('truck__capacity')
+        ).order_by()
+    }
+
+    summaries = []
+    for mission_id, title, mission_type, mission_status, start_date, end_date in missions:
+        cargo = cargo_totals.get(mission_id, {})
+        trucks = truck_totals.get(mission_id, {})
+        summaries.append(MissionSummary(
+            mission_id=mission_id,
+            title=title,
+            type=mission_type,
+            status=mission_status,
+            start_date=start_date,
+            end_date=end_date,
+            cargo_item_count=cargo.get('cargo_item_count', 0),
+            total_quantity=cargo.get('total_quantity') or 0,
+            allocated_quantity=cargo.get('allocated_quantity') or 0,
+            trucks_assigned=trucks.get('trucks_assigned', 0),
+            truck_capacity=trucks.get('truck_capacity') or 0,
+        ))
+
+    MissionSummary.objects.bulk_create(
+        summaries, update_conflicts=True, unique_fields=['mission'], update_fields=SUMMARY_FIELDS
+    )
+    return len(summaries)
+
+
+class PendingSummaryRefresh(CommitBatch):
+    """on_commit callback refreshing every mission touched in the transaction once"""
+
+    def __init__(self):
+        super().__init__()
+        self.mission_ids = set()
+
+    def run(self):
+        refresh_mission_summaries(self.mission_ids)
+
+
+def schedule_summary_refresh(mission_ids):
+    """
+    Refresh the summaries of the given missions once the current transaction commits, or
+    right away outside a transaction. Repeated calls in one transaction share one refresh.
+    """
+    mission_ids = {mission_id for mission_id in mission_ids if mission_id is not None}
+    if not mission_ids:
+        return
+    PendingSummaryRefresh.add(lambda pending: pending.mission_ids.update(mission_ids))
+
+
+def rebuild_mission_summaries(batch_size=SUMMARY_BATCH_SIZE):
+    """Recompute the summary of every mission, batch by batch"""
+    total = 0
+    mission_ids = Mission.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for mission_id in mission_ids.iterator(chunk_size=batch_size):
+        batch.append(mission_id)
+        if len(batch) == batch_size:
+            total += refresh_mission_summaries(batch)
+            batch = []
+    if batch:
+        total += refresh_mission_summaries(batch)
+    return total
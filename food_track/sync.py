@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Min, Q
+from food_track.commit_hooks import CommitBatch
+from food_track.models import Contact, Mission, SyncChange, SyncPrune, Truck, Vendor, VendorMission
+from food_track.serializers import ComprehensiveMissionSerializer, ContactGetSerializer, TruckGetSerializer
+
+# Response keys per synced entity
+SYNC_ENTITIES = {
+    'contact': 'contacts',
+    'truck': 'trucks',
+    'mission': 'missions',
+}
+
+# Key of the PostgreSQL advisory lock serializing the numbering of the sync log
+SYNC_LOG_LOCK_KEY = 0x53594e43
+
+
+class NumberSyncChanges(CommitBatch):
+    """on_commit callback numbering the sync log once the changes logged in the transaction are visible"""
+
+    def run(self):
+        number_changes()
+
+
+def record_changes(changes):
+    """
+    Log (action, entity, object id, vendor id) changes in the current transaction. A vendor
+    id of None on a mission change means every vendor the mission is assigned to.
+
+    The rows commit or roll back with the change itself and are numbered after commit. A
+    numbering that does not run (a failing hook, a worker killed in between) is caught up
+    by the next one, or by the next sync request.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    # Fan mission changes out to the vendors the mission is assigned to now
+    mission_ids = {object_id for _, entity, object_id, vendor_id in changes if entity == 'mission' and vendor_id is None}
+    mission_vendors = {}
+    for mission_id, vendor_id in VendorMission.objects.filter(mission_id__in=mission_ids).values_list('mission_id', 'vendor_id'):
+        mission_vendors.setdefault(mission_id, []).append(vendor_id)
+
+    # Only the last action per record matters, keep the order in which they happened
+    latest = {}
+    for action, entity, object_id, vendor_id in changes:
+        vendor_ids = mission_vendors.get(object_id, []) if vendor_id is None else [vendor_id]
+        for vendor in vendor_ids:
+            latest.pop((vendor, entity, object_id), None)
+            latest[(vendor, entity, object_id)] = action
+    if not latest:
+        return
+
+    SyncChange.objects.bulk_create([
+        SyncChange(vendor_id=vendor, entity=entity, object_id=object_id, action=action)
+        for (vendor, entity, object_id), action in latest.items()
+    ])
+    # One numbering per transaction, however many changes it logs
+    NumberSyncChanges.add(lambda batch: None)
+
+
+def record_mission_changes(mission_ids):
+    record_changes(('upsert', 'mission', mission_id, None) for mission_id in set(mission_ids) if mission_id)
+
+
+def number_changes():
+    """
+    Give the committed changes without a sequence number one, after every number handed
+    out so far and in the order they were logged.
+
+    Numberings run one at a time and each commits before the next starts, so the numbered
+    changes a reader sees are always every change up to some sequence number: a cursor
+    never moves past a change that is numbered later.
+    """
+    if not SyncChange.objects.filter(sequence=None).exists():
+        return
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SYNC_LOG_LOCK_KEY])
+        numbers = SyncChange.objects.aggregate(
+            first=Min('id', filter=Q(sequence=None)), last=Max('sequence')
+        )
+        if numbers['first'] is None:
+            return
+        # Ids increase in the order rows are logged, shifted past the last number when a
+        # row logged earlier committed after later ones were numbered
+        offset = max(0, (numbers['last'] or 0) + 1 - numbers['first'])
+        # Rows committing meanwhile with a lower id wait for the next numbering
+        SyncChange.objects.filter(sequence=None, id__gte=numbers['first']).update(sequence=F('id') + offset)
+
+
+def serialize_records(vendor, ids_by_entity):
+    """Serialize the vendor's current contacts, trucks and missions with the given ids"""
+    querysets = {
+        'contact': Contact.objects.filter(vendor=vendor).select_related('vendor'),
+        'truck': Truck.objects.filter(vendor=vendor).select_related('vendor'),
+        'mission': ComprehensiveMissionSerializer.setup_eager_loading(
+            Mission.objects.filter(id__in=VendorMission.objects.filter(vendor=vendor).values('mission_id'))
+        ),
+    }
+    serializers = {
+        'contact': ContactGetSerializer,
+        'truck': TruckGetSerializer,
+        'mission': ComprehensiveMissionSerializer,
+    }
+    records = {}
+    for entity, queryset in querysets.items():
+        if ids_by_entity is not None:
+            if not ids_by_entity.get(entity):
+                records[entity] = ([], set())
+                continue
+            queryset = queryset.filter(pk__in=ids_by_entity[entity])
+        objects = list(queryset.order_by('pk'))
+        records[entity] = (serializers[entity](objects, many=True).data, {obj.pk for obj in objects})
+    return records
+
+
+def build_sync_response(vendor, since=None, limit=None):
+    """
+    Changes of the vendor's contacts, trucks and missions after the since cursor.
+
+    Without a cursor the full data set is returned with the cursor to continue from. With
+    one, only records changed since are read: upserts carry the current record, deletes
+    (and records that left the vendor's scope) come back as tombstones.
+
+    A cursor older than the last prune_sync_changes run may have lost changes to the prune,
+    it gets the full data set like a first sync.
+    """
+    limit = limit or getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    number_changes()
+
+    if since is not None:
+        changes = list(
+            SyncChange.objects.filter(vendor=vendor, sequence__gt=since)
+            .order_by('sequence').values_list('sequence', 'entity', 'object_id', 'action')[:limit + 1]
+        )
+        # Checked after reading the changes, so a prune committing in between is seen
+        if SyncPrune.objects.filter(pruned_through__gt=since).exists():
+            since = None
+
+    if since is None:
+        # Read the cursor first, anything logged while the snapshot is built is synced next time
+        cursor = SyncChange.objects.aggregate(latest=Max('sequence'))['latest'] or 0
+        records = serialize_records(vendor, None)
+        return {
+            'cursor': cursor,
+            'full': True,
+            'has_more': False,
+            **{SYNC_ENTITIES[entity]: data for entity, (data, _) in records.items()},
+            'deleted': {key: [] for key in SYNC_ENTITIES.values()},
+        }
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    latest = {}
+    for _, entity, object_id, action in changes:
+        latest[(entity, object_id)] = action
+    upserts = {entity: set() for entity in SYNC_ENTITIES}
+    deleted = {entity: set() for entity in SYNC_ENTITIES}
+    for (entity, object_id), action in latest.items():
+        (upserts if action == 'upsert' else deleted)[entity].add(object_id)
+
+    records = serialize_records(vendor, upserts)
+    for entity, (_, found) in records.items():
+        # Gone or no longer the vendor's since the change was logged
+        deleted[entity] |= upserts[entity] - found
+
+    return {
+        'cursor': changes[-1][0] if changes else since,
+        'full': False,
+        'has_more': has_more,
+        **{SYNC_ENTITIES[entity]: data for entity, (data, _) in records.items()},
+        'deleted': {SYNC_ENTITIES[entity]: sorted(ids) for entity, ids in deleted.items()},
+    }
+
+
+def prune_changes(older_than):
+    """
+    Delete the changes numbered up to the last one logged before older_than, and the changes
+    of deleted vendors. Cursors before the pruned changes get a full sync from then on.
+    Returns the number of changes deleted.
+    """
+    number_changes()
+    with transaction.atomic():
+        pruned_through = SyncChange.objects.filter(created_at__lt=older_than).aggregate(
+            latest=Max('sequence')
+        )['latest']
+        deleted = 0
+        if pruned_through is not None:
+            deleted, _ = SyncChange.objects.filter(sequence__lte=pruned_through).delete()
+            SyncPrune.objects.create(pruned_through=pruned_through, deleted=deleted)
+        orphans, _ = SyncChange.objects.exclude(vendor_id__in=Vendor.objects.values('pk')).delete()
+    return deleted + orphans
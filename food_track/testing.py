@@ -0,0 +1,55 @@
+"""Factories shared by the test modules of the apps, not used at runtime"""
+import datetime
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from Accounts.models import UserProfile, UserRoles, UsersWithRoles
+from food_track.models import (
+    Cargo, CargoItems, Contact, Mission, Product, Truck, TrucksForMission, TruckCargoItem, Vendor, VendorMission
+)
+
+
+def create_user_with_role(username, role_name=None):
+    """A user with a profile, holding role_name when given"""
+    user = User.objects.create_user(username=username, email=username, password='secret-pass-1')
+    UserProfile.objects.create(profile_user=user, profile_organization=username)
+    if role_name:
+        role, _ = UserRoles.objects.get_or_create(role_name=role_name)
+        UsersWithRoles.objects.create(user_with_role_role=role, user_with_role_user=user)
+    return user
+
+
+def create_vendor_user(name='Acme'):
+    """A user holding the vendor role with a contact at a new vendor"""
+    vendor = Vendor.objects.create(name=name, vendor_type='Mixed', fleet_size=10, description='', status='approved')
+    user = create_user_with_role(f'{name}@example.com', 'vendor')
+    Contact.objects.create(user=user, vendor=vendor)
+    return vendor, user
+
+
+def client_for(user):
+    """API client sending an access token of the user"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+def create_mission(vendor, trucks=2, items=3, quantity=300, status='Active'):
+    """A mission assigned to the vendor with cargo items allocated to new trucks of the vendor"""
+    mission = Mission.objects.create(
+        title='Mission', type='regular', number_of_beneficiaries=10, description='', dept_location='A',
+        destination_location='B', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 2, 1), status=status
+    )
+    VendorMission.objects.create(vendor=vendor, mission=mission)
+    cargo = Cargo.objects.create(mission=mission, total_products_quantity=items * quantity)
+    cargo_items = [
+        CargoItems.objects.create(cargo=cargo, product=Product.objects.create(name=f'Product {number}', quantity=1000), quantity=quantity)
+        for number in range(items)
+    ]
+    for number in range(trucks):
+        truck = Truck.objects.create(vehicle_name=f'Truck {number}', year=2020, model='M', capacity=1000, vendor=vendor)
+        truck_mission = TrucksForMission.objects.create(mission=mission, truck=truck, vendor=vendor)
+        for cargo_item in cargo_items:
+            TruckCargoItem.objects.create(truck_mission=truck_mission, cargo_item=cargo_item, transferring_quantity=10)
+    return mission
@@ -1,3 +1,519 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import threading
+import unittest
 
-# Create your tests here.
+import numpy
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from Accounts.utils import RoleUtils
+from food_track.allocation import CargoAllocationError, allocate_cargo_to_truck
+from food_track.checks import check_response_cache_backend
+from food_track.commit_hooks import CommitBatch
+from food_track.models import (
+    CargoItems, Contact, MissionSummary, Product, SyncChange, SyncPrune, Truck, TrucksForMission, TruckCargoItem, Vendor, VendorMission
+)
+from food_track.position_format import HEADER, MAGIC, MEDIA_TYPE, VERSION, decode_pings, encode_pings
+from food_track.positions import create_position_partitions, write_positions
+from food_track.summaries import schedule_summary_refresh
+from food_track.sync import build_sync_response
+from food_track.testing import client_for, create_mission, create_user_with_role, create_vendor_user
+from food_track.tracks import time_buckets
+from food_track.utils import VendorUtils
+
+
+class MissionQueryCountTests(TestCase):
+    """Mission payloads are built with a fixed number of queries whatever the number of missions"""
+
+    def setUp(self):
+        self.vendor, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+        create_mission(self.vendor)
+
+    def count_queries(self, url):
+        # Role, vendor and response caches would make the first request the only one to query
+        cache.clear()
+        RoleUtils.invalidate_all()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_query_count(self, url):
+        one_mission = self.count_queries(url)
+        for _ in range(4):
+            create_mission(self.vendor)
+        cache.clear()
+        RoleUtils.invalidate_all()
+        with self.assertNumQueries(one_mission):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_mission_list(self):
+        response = self.assert_constant_query_count('/api/missions/')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_vendor_mission_list(self):
+        response = self.assert_constant_query_count('/api/vendor/missions/')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_vendor_user_data(self):
+        response = self.assert_constant_query_count('/api/vendor-user-data/')
+        self.assertEqual(len(response.data['missions']), 5)
+        self.assertEqual(len(response.data['trucks']), 10)
+
+
+class BulkAssignmentTests(TestCase):
+    def setUp(self):
+        self.vendor, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+        self.mission = create_mission(self.vendor, trucks=0)
+        self.truck = Truck.objects.create(vehicle_name='Spare', year=2020, model='M', capacity=1000, vendor=self.vendor)
+
+    def assign(self):
+        return self.client.post(
+            '/api/vendor/trucks-for-mission/bulk/',
+            {'mission': self.mission.pk, 'assignments': [{'truck': self.truck.pk}]},
+            format='json'
+        )
+
+    def test_truck_is_assigned_to_a_mission_once(self):
+        self.assertEqual(self.assign().status_code, 201)
+        response = self.assign()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already assigned", response.data['results'][0]['errors'][0])
+        self.assertEqual(TrucksForMission.objects.filter(mission=self.mission, truck=self.truck).count(), 1)
+
+    def test_database_rejects_duplicate_assignments(self):
+        TrucksForMission.objects.create(mission=self.mission, truck=self.truck, vendor=self.vendor)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrucksForMission.objects.create(mission=self.mission, truck=self.truck, vendor=self.vendor)
+
+
+class ConditionalMissionTests(TestCase):
+    """A mission's ETag changes when a row embedded in its payload changes"""
+
+    def setUp(self):
+        self.vendor, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+        self.mission = create_mission(self.vendor)
+        self.url = f'/api/vendor/missions/{self.mission.pk}/'
+
+    def assert_modified_by(self, change):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_truck_change(self):
+        truck = Truck.objects.filter(vendor=self.vendor).first()
+        truck.vehicle_name = 'Renamed'
+        self.assert_modified_by(truck.save)
+
+    def test_product_change(self):
+        product = Product.objects.first()
+        product.name = 'Renamed'
+        self.assert_modified_by(product.save)
+
+    def test_vendor_change(self):
+        self.vendor.name = 'Renamed'
+        self.assert_modified_by(self.vendor.save)
+
+    def test_contact_profile_change(self):
+        profile = self.user.profile
+        profile.profile_phone = '555'
+        self.assert_modified_by(profile.save)
+
+    def test_contact_user_change(self):
+        self.user.first_name = 'Renamed'
+        self.assert_modified_by(self.user.save)
+
+    def test_login_does_not_modify(self):
+        etag = self.client.get(self.url)['ETag']
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class FailingBatch(CommitBatch):
+    def run(self):
+        raise RuntimeError("batch failed")
+
+
+class CommitBatchTests(TestCase):
+    def setUp(self):
+        # Run the batches of the setup so the tests start their own
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor, _ = create_vendor_user()
+            self.missions = [create_mission(vendor, trucks=1, items=1) for _ in range(2)]
+        MissionSummary.objects.all().delete()
+
+    def test_one_batch_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            schedule_summary_refresh([self.missions[0].pk])
+            schedule_summary_refresh([self.missions[1].pk])
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(MissionSummary.objects.count(), 2)
+
+    def test_rolled_back_batch_is_replaced(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                schedule_summary_refresh([self.missions[0].pk])
+                raise RuntimeError
+            schedule_summary_refresh([self.missions[1].pk])
+        self.assertEqual(list(MissionSummary.objects.values_list('mission_id', flat=True)), [self.missions[1].pk])
+
+    def test_failing_batch_does_not_stop_later_hooks(self):
+        with self.assertLogs('django', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                FailingBatch.add(lambda batch: None)
+                schedule_summary_refresh([self.missions[0].pk])
+        self.assertTrue(MissionSummary.objects.filter(mission=self.missions[0]).exists())
+
+
+@unittest.skipIf(connection.vendor == 'postgresql', "PostgreSQL serializes sync log writes instead")
+@override_settings(VENDOR_CACHE_TIMEOUT=300)
+class VendorCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor, self.user = create_vendor_user()
+
+    def test_cached_vendor_is_dropped_when_the_change_commits(self):
+        self.assertEqual(VendorUtils.get_vendor_for_user(self.user.pk).name, 'Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.name = 'Renamed'
+            self.vendor.save()
+            # Until the commit other requests would cache the old row again
+            self.assertIsNotNone(cache.get(VendorUtils.cache_key(self.user.pk)))
+        self.assertIsNone(cache.get(VendorUtils.cache_key(self.user.pk)))
+        self.assertEqual(VendorUtils.get_vendor_for_user(self.user.pk).name, 'Renamed')
+
+    def test_rolled_back_change_keeps_the_cached_vendor(self):
+        VendorUtils.get_vendor_for_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Contact.objects.filter(user=self.user).delete()
+                transaction.set_rollback(True)
+        self.assertIsNotNone(cache.get(VendorUtils.cache_key(self.user.pk)))
+
+
+class VendorPortalAccessTests(TestCase):
+    """The vendor portal serves any user with a vendor contact, whatever their role"""
+
+    def setUp(self):
+        cache.clear()
+        RoleUtils.invalidate_all()
+        self.vendor, _ = create_vendor_user()
+
+    def test_contact_without_the_vendor_role_is_served(self):
+        admin = create_user_with_role('admin@example.com', 'admin')
+        Contact.objects.create(user=admin, vendor=self.vendor)
+        for url in ['/api/vendor-user-data/', '/api/vendor/trucks/', '/api/vendor/sync/']:
+            self.assertEqual(client_for(admin).get(url).status_code, 200, url)
+
+    def test_user_without_a_contact_is_not_served(self):
+        user = create_user_with_role('nobody@example.com')
+        self.assertEqual(client_for(user).get('/api/vendor-user-data/').status_code, 404)
+
+
+class SyncLogTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor, _ = create_vendor_user()
+
+    def create_truck(self, number=0):
+        return Truck.objects.create(vehicle_name=f'Truck {number}', year=2020, model='M', capacity=1000, vendor=self.vendor)
+
+    def test_changes_are_logged_in_the_transaction_and_numbered_after_commit(self):
+        cursor = build_sync_response(self.vendor)['cursor']
+        with self.captureOnCommitCallbacks():
+            truck = self.create_truck()
+            change = SyncChange.objects.get(entity='truck', object_id=truck.pk)
+            self.assertIsNone(change.sequence)
+        # Nothing is lost when the numbering hook does not run, the next sync numbers it
+        data = build_sync_response(self.vendor, since=cursor)
+        self.assertEqual([row['id'] for row in data['trucks']], [truck.pk])
+        change.refresh_from_db()
+        self.assertEqual(data['cursor'], change.sequence)
+
+    def test_change_committed_late_is_numbered_after_the_ones_synced(self):
+        with self.captureOnCommitCallbacks():
+            late, numbered = self.create_truck(0), self.create_truck(1)
+        # The later change committed, was numbered and synced first
+        SyncChange.objects.filter(object_id=numbered.pk).update(sequence=F('id'))
+        cursor = SyncChange.objects.get(object_id=numbered.pk).sequence
+        data = build_sync_response(self.vendor, since=cursor)
+        self.assertEqual([row['id'] for row in data['trucks']], [late.pk])
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_prune_forces_a_full_sync_of_older_cursors(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old_trucks = [self.create_truck(number) for number in range(2)]
+        SyncChange.objects.update(created_at=timezone.now() - datetime.timedelta(days=40))
+        before = build_sync_response(self.vendor)['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_truck(2)
+
+        call_command('prune_sync_changes', days=30, stdout=io.StringIO())
+        self.assertFalse(SyncChange.objects.filter(object_id__in=[truck.pk for truck in old_trucks]).exists())
+        self.assertEqual(SyncPrune.objects.get().pruned_through, before)
+
+        data = build_sync_response(self.vendor, since=before - 1)
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['trucks']), 3)
+        data = build_sync_response(self.vendor, since=before)
+        self.assertFalse(data['full'])
+        self.assertEqual(len(data['trucks']), 1)
+
+
+class SyncTombstoneTests(TestCase):
+    def test_moved_assignment_is_deleted_from_the_previous_vendor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor, _ = create_vendor_user()
+            other_vendor, _ = create_vendor_user('Other')
+            mission = create_mission(vendor, trucks=0, items=1)
+        cursor = build_sync_response(vendor)['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = VendorMission.objects.get(mission=mission)
+            assignment.vendor = other_vendor
+            assignment.save()
+
+        data = build_sync_response(vendor, since=cursor)
+        self.assertEqual(data['deleted']['missions'], [mission.pk])
+        self.assertEqual(data['missions'], [])
+        data = build_sync_response(other_vendor, since=cursor)
+        self.assertEqual([row['id'] for row in data['missions']], [mission.pk])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        RoleUtils.invalidate_all()
+        self.vendor, self.user = create_vendor_user()
+        self.other_vendor, _ = create_vendor_user('Other')
+        self.mission = create_mission(self.vendor)
+        self.other_mission = create_mission(self.other_vendor)
+
+    def export(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            return response.status_code, None
+        return 200, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_malformed_ids_are_rejected(self):
+        client = client_for(self.user)
+        for query in ['mission=abc', 'vendor=1.5', 'mission=-1', f'mission={2 ** 70}']:
+            status, _ = self.export(client, f'/api/exports/truck-cargo/?{query}')
+            self.assertEqual(status, 400, query)
+
+    def test_vendor_exports_only_its_own_rows(self):
+        client = client_for(self.user)
+        _, missions = self.export(client, '/api/exports/missions/')
+        self.assertEqual([row['id'] for row in missions], [self.mission.pk])
+        _, items = self.export(client, '/api/exports/cargo-items/')
+        self.assertEqual({row['cargo__mission_id'] for row in items}, {self.mission.pk})
+        _, allocations = self.export(client, f'/api/exports/truck-cargo/?vendor={self.other_vendor.pk}')
+        self.assertEqual(allocations, [])
+
+    def test_admin_exports_every_row(self):
+        admin = create_user_with_role('admin@example.com', 'admin')
+        _, missions = self.export(client_for(admin), '/api/exports/missions/')
+        self.assertEqual([row['id'] for row in missions], [self.mission.pk, self.other_mission.pk])
+
+    def test_users_without_a_role_are_refused(self):
+        user = create_user_with_role('nobody@example.com')
+        status, _ = self.export(client_for(user), '/api/exports/missions/')
+        self.assertEqual(status, 403)
+
+
+class PositionIngestTests(TestCase):
+    def setUp(self):
+        self.vendor, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+        self.truck = Truck.objects.create(vehicle_name='Truck', year=2020, model='M', capacity=1000, vendor=self.vendor)
+
+    def ping(self, truck, **values):
+        return {'truck': truck, 'timestamp': int(timezone.now().timestamp()) - 60, 'lat': -1.28, 'lon': 36.82, **values}
+
+    def post_binary(self, body):
+        return self.client.post('/api/vendor/positions/', body, content_type=MEDIA_TYPE)
+
+    def test_binary_batch_is_stored(self):
+        response = self.post_binary(encode_pings([self.ping(self.truck.pk, speed=54.2), self.ping(self.truck.pk)]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'accepted': 2, 'rejected': []})
+
+    def test_malformed_binary_batches_are_rejected(self):
+        body = encode_pings([self.ping(self.truck.pk)])
+        malformed = {
+            'truncated header': body[:HEADER.size - 3],
+            'wrong magic': b'XX' + body[2:],
+            'wrong version': body[:2] + bytes([VERSION + 1]) + body[3:],
+            'truncated record': body[:-1],
+            'trailing bytes': body + b'\0',
+            'record count too high': HEADER.pack(MAGIC, VERSION, 0, 2 ** 32 - 1) + body[HEADER.size:],
+        }
+        for name, data in malformed.items():
+            with self.assertRaises(ValueError, msg=name):
+                decode_pings(data)
+            self.assertEqual(self.post_binary(data).status_code, 400, name)
+
+    def test_out_of_range_binary_coordinates_are_rejected(self):
+        pings = [self.ping(self.truck.pk, lat=90.5), self.ping(self.truck.pk, lon=-180.5), self.ping(0)]
+        response = self.post_binary(encode_pings(pings))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['accepted'], 0)
+        self.assertEqual([rejection['index'] for rejection in response.data['rejected']], [0, 1, 2])
+
+    def test_non_finite_json_values_are_rejected(self):
+        pings = [
+            self.ping(self.truck.pk, lat='NaN'),
+            self.ping(self.truck.pk, lon='Infinity'),
+            self.ping(self.truck.pk, speed='nan'),
+            self.ping(self.truck.pk, timestamp=1e300),
+        ]
+        response = self.client.post('/api/vendor/positions/', {'pings': pings}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([rejection['index'] for rejection in response.data['rejected']], [0, 1, 2, 3])
+        # A bare NaN is not JSON
+        response = self.client.post(
+            '/api/vendor/positions/', '{"pings": [{"truck": 1, "timestamp": 0, "lat": NaN, "lon": 0}]}',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_truck_ids_are_rejected_per_ping(self):
+        pings = [self.ping(self.truck.pk), self.ping(2 ** 70), self.ping(-1), self.ping(0)]
+        response = self.client.post('/api/vendor/positions/', {'pings': pings}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['accepted'], 1)
+        self.assertEqual([rejection['index'] for rejection in response.data['rejected']], [1, 2, 3])
+        self.assertIn("truck must be a truck id", response.data['rejected'][0]['errors'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Truck positions are only partitioned on PostgreSQL")
+class PositionPartitionTests(TestCase):
+    def test_rows_in_the_default_partition_move_to_the_new_month(self):
+        vendor, _ = create_vendor_user()
+        truck = Truck.objects.create(vehicle_name='Truck', year=2020, model='M', capacity=1000, vendor=vendor)
+        recorded_at = datetime.datetime(2100, 1, 15, tzinfo=datetime.timezone.utc)
+        write_positions([(truck.pk, recorded_at, -1.28, 36.82, None)])
+
+        created = create_position_partitions(2, first=datetime.date(2100, 1, 1))
+        self.assertEqual(created, ['food_track_truckposition_2100_01', 'food_track_truckposition_2100_02'])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM food_track_truckposition_2100_01")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("SELECT count(*) FROM food_track_truckposition_default")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(create_position_partitions(2, first=datetime.date(2100, 1, 1)), [])
+
+
+class TimeBucketTests(TestCase):
+    def test_bucket_count_never_exceeds_max_points(self):
+        for duration, max_points in [(100, 10), (99, 10), (7, 7), (3600, 60), (1, 1)]:
+            times = numpy.arange(duration + 1, dtype=float) + 1_700_000_000
+            bucket_times, latitude, _, _ = time_buckets(times, numpy.zeros(len(times)), numpy.zeros(len(times)), 1, max_points)
+            self.assertLessEqual(len(bucket_times), max_points, (duration, max_points))
+            self.assertEqual(len(latitude), len(bucket_times))
+
+    def test_narrow_buckets_are_kept(self):
+        times = numpy.arange(10, dtype=float)
+        bucket_times, _, _, width = time_buckets(times, numpy.zeros(10), numpy.zeros(10), 2, 100)
+        self.assertEqual(width, 2)
+        self.assertEqual(bucket_times.tolist(), [0.5, 2.5, 4.5, 6.5, 8.5])
+
+
+class ResponseCacheSettingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        RoleUtils.invalidate_all()
+        _, self.user = create_vendor_user()
+        self.client = client_for(self.user)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_responses_are_not_cached_when_disabled(self):
+        self.assertNotIn('ETag', self.client.get('/api/vendors/'))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_responses_are_cached_when_enabled(self):
+        etag = self.client.get('/api/vendors/')['ETag']
+        self.assertEqual(self.client.get('/api/vendors/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_login_keeps_cached_missions(self):
+        mission = create_mission(Vendor.objects.get())
+        url = f'/api/missions/{mission.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renamed'
+            self.user.save(update_fields=['first_name'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_per_process_cache_is_flagged(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with self.settings(RESPONSE_CACHE_ENABLED=True, CACHES=locmem):
+            self.assertEqual([warning.id for warning in check_response_cache_backend(None)], ['food_track.W001'])
+        with self.settings(RESPONSE_CACHE_ENABLED=False, CACHES=locmem):
+            self.assertEqual(check_response_cache_backend(None), [])
+        with self.settings(RESPONSE_CACHE_ENABLED=True, CACHES=redis):
+            self.assertEqual(check_response_cache_backend(None), [])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Needs row locks, run against PostgreSQL")
+class ConcurrentAllocationTests(TransactionTestCase):
+    """Concurrent allocations of the same cargo item never allocate more than its quantity"""
+
+    def test_concurrent_allocations_do_not_over_allocate(self):
+        vendor, _ = create_vendor_user()
+        mission = create_mission(vendor, trucks=12, items=1, quantity=100)
+        TruckCargoItem.objects.all().delete()
+        cargo_item = CargoItems.objects.get()
+        truck_missions = list(TrucksForMission.objects.filter(mission=mission))
+
+        barrier = threading.Barrier(len(truck_missions))
+        succeeded = []
+        rejected = []
+        failures = []
+
+        def allocate(truck_mission):
+            try:
+                barrier.wait()
+                allocate_cargo_to_truck(truck_mission, [{'cargo_item_id': str(cargo_item.unique_id), 'quantity': 30}])
+                succeeded.append(truck_mission.pk)
+            except CargoAllocationError:
+                rejected.append(truck_mission.pk)
+            except Exception as e:
+                failures.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate, args=(truck_mission,)) for truck_mission in truck_missions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        cargo_item.refresh_from_db()
+        allocated = TruckCargoItem.objects.filter(cargo_item=cargo_item).aggregate(total=Sum('transferring_quantity'))['total']
+        self.assertLessEqual(cargo_item.allocated_quantity, cargo_item.quantity)
+        self.assertEqual(cargo_item.allocated_quantity, allocated)
+        self.assertEqual(len(succeeded), 3)
+        self.assertEqual(len(rejected), len(truck_missions) - 3)
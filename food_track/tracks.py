@@ -0,0 +1,212 @@
+import datetime
+import math
+
+import numpy
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from food_track.models import TruckPosition
+
+# Zoom levels of a web map the simplified tracks are precomputed for
+TRACK_ZOOM_LEVELS = range(0, 19)
+
+
+def track_window(truck_mission):
+    """Time range of an assignment's track, the days of its mission"""
+    mission = truck_mission.mission
+    start = timezone.make_aware(datetime.datetime.combine(mission.start_date, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(mission.end_date + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def load_track(truck_mission):
+    """(epoch seconds, latitude, longitude) arrays of the assignment's pings in time order"""
+    start, end = track_window(truck_mission)
+    queryset = TruckPosition.objects.filter(
+        truck_id=truck_mission.truck_id, recorded_at__gte=start, recorded_at__lt=end
+    ).order_by('recorded_at').values_list('recorded_at', 'latitude', 'longitude')
+    # Read straight from the cursor, building a model row per ping dominates otherwise
+    sql, params = queryset.query.sql_with_params()
+    converter = connection.ops.convert_datetimefield_value
+    field = TruckPosition._meta.get_field('recorded_at')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return numpy.empty(0), numpy.empty(0), numpy.empty(0)
+    recorded_at, latitude, longitude = zip(*rows)
+    if not isinstance(recorded_at[0], datetime.datetime):
+        recorded_at = [converter(value, field, connection) for value in recorded_at]
+    times = numpy.fromiter((value.timestamp() for value in recorded_at), dtype=float, count=len(rows))
+    return times, numpy.asarray(latitude, dtype=float), numpy.asarray(longitude, dtype=float)
+
+
+def douglas_peucker_importance(latitude, longitude, min_tolerance=0.0):
+    """
+    Douglas–Peucker run to the end, recording for every point the tolerance above which it
+    is dropped. Simplifying with any tolerance is then keeping the points whose importance
+    exceeds it, so one pass serves every zoom level. Segments are not split further once
+    no point is farther than min_tolerance, their points keep an importance of 0.
+
+    All open segments are split together with array operations, the number of Python
+    iterations is the depth of the split tree rather than the number of points.
+    Distances are in degrees of latitude on an equirectangular projection.
+    """
+    count = len(latitude)
+    importance = numpy.zeros(count)
+    if count == 0:
+        return importance
+    importance[0] = importance[-1] = numpy.inf
+    if count < 3:
+        return importance
+
+    x = longitude * math.cos(math.radians(float(numpy.mean(latitude))))
+    y = latitude
+    # Kept points split the track into segments, each capped by the importance of the split
+    # above it. Only the points inside segments still being split are looked at.
+    breaks = numpy.array([0, count - 1])
+    caps = numpy.array([numpy.inf])
+    points = numpy.arange(1, count - 1)
+
+    while len(points):
+        segment = numpy.searchsorted(breaks, points, side='right') - 1
+        start = breaks[segment]
+        end = breaks[segment + 1]
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        length = numpy.hypot(dx, dy)
+        distance = numpy.where(
+            length > 0,
+            numpy.abs(dx * (y[points] - y[start]) - dy * (x[points] - x[start])) / numpy.where(length > 0, length, 1),
+            numpy.hypot(x[points] - x[start], y[points] - y[start]),
+        )
+
+        # Points are in order, so each segment's points are one contiguous group
+        group_starts = numpy.concatenate([[0], numpy.flatnonzero(numpy.diff(segment)) + 1])
+        group_sizes = numpy.diff(numpy.concatenate([group_starts, [len(points)]]))
+        farthest = numpy.maximum.reduceat(distance, group_starts)
+        splitting = farthest > min_tolerance
+        if not splitting.any():
+            break
+
+        group = numpy.repeat(numpy.arange(len(group_starts)), group_sizes)
+        candidates = splitting[group] & (distance == farthest[group])
+        split_groups, first = numpy.unique(group[candidates], return_index=True)
+        split_points = points[candidates][first]
+        split_segments = segment[group_starts[split_groups]]
+        split_importance = numpy.minimum(farthest[split_groups], caps[split_segments])
+        importance[split_points] = split_importance
+
+        # A split point lies inside its segment, so both halves take its place in order
+        halves = numpy.ones(len(caps), dtype=int)
+        halves[split_segments] = 2
+        new_caps = caps.copy()
+        new_caps[split_segments] = split_importance
+        caps = numpy.repeat(new_caps, halves)
+        breaks = numpy.sort(numpy.concatenate([breaks, split_points]))
+
+        keep = splitting[group]
+        keep[numpy.searchsorted(points, split_points)] = False
+        points = points[keep]
+
+    return importance
+
+
+def zoom_tolerance(zoom):
+    """Degrees covered by TRACK_PIXEL_TOLERANCE pixels at a web map zoom level"""
+    return 360 / (256 * 2 ** zoom) * getattr(settings, 'TRACK_PIXEL_TOLERANCE', 1)
+
+
+def simplified_indices(importance, tolerance, max_points):
+    """Indices of the points kept at tolerance, the most important max_points at most"""
+    kept = numpy.flatnonzero(importance > tolerance)
+    if len(kept) > max_points:
+        kept = numpy.sort(kept[numpy.argpartition(importance[kept], -max_points)[-max_points:]])
+    return kept
+
+
+def time_buckets(times, latitude, longitude, bucket_seconds, max_points):
+    """
+    Average position per bucket_seconds window, widened when it would give more than
+    max_points buckets. Returns the arrays and the bucket width used.
+    """
+    duration = times[-1] - times[0]
+    bucket_seconds = max(bucket_seconds, math.ceil(duration / max_points) if duration else 1)
+    # A duration that is a whole number of buckets puts the last ping one bucket past max_points
+    bucket = numpy.minimum((times - times[0]) // bucket_seconds, max_points - 1).astype(int)
+    # Buckets without pings are left out
+    _, bucket, counts = numpy.unique(bucket, return_inverse=True, return_counts=True)
+    average = lambda values: numpy.bincount(bucket, weights=values) / counts
+    return average(times), average(latitude), average(longitude), bucket_seconds
+
+
+def track_points(times, latitude, longitude):
+    """[epoch seconds, lat, lon] rows, rounded to what a map can show"""
+    return numpy.column_stack([
+        numpy.round(times), numpy.round(latitude, 6), numpy.round(longitude, 6)
+    ]).tolist()
+
+
+def track_cache_key(truck_mission, suffix):
+    mission = truck_mission.mission
+    return f"food_track:track:{truck_mission.pk}:{mission.start_date}:{mission.end_date}:{suffix}"
+
+
+def simplified_tracks(truck_mission, zoom_levels):
+    """The assignment's track simplified for each zoom level, with the raw ping count"""
+    times, latitude, longitude = load_track(truck_mission)
+    max_points = getattr(settings, 'TRACK_MAX_POINTS', 2000)
+    importance = douglas_peucker_importance(latitude, longitude, zoom_tolerance(TRACK_ZOOM_LEVELS[-1]))
+    tracks = {}
+    for zoom in zoom_levels:
+        kept = simplified_indices(importance, zoom_tolerance(zoom), max_points)
+        tracks[zoom] = track_points(times[kept], latitude[kept], longitude[kept])
+    return tracks, len(times)
+
+
+def get_simplified_track(truck_mission, zoom):
+    """
+    The assignment's track at a zoom level, simplified with Douglas–Peucker. Tracks of
+    completed missions no longer change: every zoom level is computed in the same pass
+    and cached, later requests read one cache entry.
+    """
+    completed = truck_mission.mission.status == 'Completed'
+    key = track_cache_key(truck_mission, f"zoom:{zoom}")
+    if completed:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    tracks, raw_points = simplified_tracks(truck_mission, TRACK_ZOOM_LEVELS if completed else [zoom])
+    results = {
+        level: {'raw_points': raw_points, 'zoom': level, 'points': points}
+        for level, points in tracks.items()
+    }
+    if completed:
+        cache.set_many(
+            {track_cache_key(truck_mission, f"zoom:{level}"): result for level, result in results.items()},
+            getattr(settings, 'TRACK_CACHE_TIMEOUT', 7 * 24 * 3600)
+        )
+    return results[zoom]
+
+
+def get_bucketed_track(truck_mission, bucket_seconds):
+    """The assignment's track averaged over time buckets, cached for completed missions"""
+    completed = truck_mission.mission.status == 'Completed'
+    key = track_cache_key(truck_mission, f"bucket:{bucket_seconds}")
+    if completed:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    times, latitude, longitude = load_track(truck_mission)
+    result = {'raw_points': len(times), 'bucket_seconds': bucket_seconds, 'points': []}
+    if len(times):
+        times, latitude, longitude, result['bucket_seconds'] = time_buckets(
+            times, latitude, longitude, bucket_seconds, getattr(settings, 'TRACK_MAX_POINTS', 2000)
+        )
+        result['points'] = track_points(times, latitude, longitude)
+    if completed:
+        cache.set(key, result, getattr(settings, 'TRACK_CACHE_TIMEOUT', 7 * 24 * 3600))
+    return result
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from .views import *
 from django.urls import path
+from food_track.streams import vendor_events
 
 router = DefaultRouter()
 router.register('vendors', VendorViewSet, basename="vendors")
@@ -23,6 +24,9 @@ urlpatterns = router.urls
 urlpatterns += [
     # General vendor data views
     path('vendor-user-data/', VendorUserDataView.as_view(), name='vendor-user-data'),
+    path('vendor/sync/', VendorSyncView.as_view(), name='vendor-sync'),
+    path('vendor/events/', vendor_events, name='vendor-events'),
+    path('vendor/positions/', VendorPositionIngestView.as_view(), name='vendor-positions'),
     path('vendor-data/<int:vendor_id>/', VendorDataByIdView.as_view(), name='vendor-data-by-id'),
     
     # Vendor-specific resource views
@@ -37,10 +41,19 @@ urlpatterns += [
     # Missions
     path('vendor/missions/', VendorMissionListView.as_view(), name='vendor-missions-list'),
     path('vendor/missions/<int:mission_id>/', VendorMissionDetailView.as_view(), name='vendor-mission-detail'),
+    path('vendor/missions/<int:mission_id>/load-plan/', VendorMissionLoadPlanView.as_view(), name='vendor-mission-load-plan'),
     
     # TrucksForMission with cargo items
     path('vendor/trucks-for-mission/', VendorTrucksForMissionListCreateView.as_view(), name='vendor-trucks-for-mission-list-create'),
+    path('vendor/trucks-for-mission/bulk/', VendorTrucksForMissionBulkCreateView.as_view(), name='vendor-trucks-for-mission-bulk-create'),
     path('vendor/trucks-for-mission/<int:assignment_id>/', VendorTrucksForMissionDetailView.as_view(), name='vendor-trucks-for-mission-detail'),
     path('vendor/trucks-for-mission/<int:assignment_id>/cargo/', VendorTrucksForMissionCargoView.as_view(), name='vendor-trucks-for-mission-cargo'),
+    path('vendor/trucks-for-mission/<int:assignment_id>/track/', VendorTrucksForMissionTrackView.as_view(), name='vendor-trucks-for-mission-track'),
     path('vendor/truck-cargo/', VendorTruckCargoListView.as_view(), name='vendor-truck-cargo-list'),
+    
+    # Streaming exports for reporting
+    path('exports/<str:dataset>/', ExportView.as_view(), name='export'),
+
+    # Nearest available trucks to a point or a mission's departure
+    path('trucks/nearest/', NearestTrucksView.as_view(), name='nearest-trucks'),
 ]
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from food_track.models import Contact
+
+# Cached in place of a vendor for users without a vendor contact
+NO_VENDOR = 'no-vendor'
+
+
+class VendorUtils:
+    @staticmethod
+    def cache_key(user_id):
+        return f"food_track:user_vendor:{user_id}"
+
+    @staticmethod
+    def get_vendor_for_user(user_id):
+        """
+        Resolve the vendor of a user through its contact, using the Django cache when
+        VENDOR_CACHE_TIMEOUT is set. Entries are dropped when a Contact or Vendor changes.
+        """
+        timeout = getattr(settings, 'VENDOR_CACHE_TIMEOUT', 300)
+        if timeout:
+            vendor = cache.get(VendorUtils.cache_key(user_id))
+            if vendor is not None:
+                return None if vendor == NO_VENDOR else vendor
+
+        contact = Contact.objects.filter(user_id=user_id).select_related('vendor').order_by('id').first()
+        vendor = contact.vendor if contact else None
+        if timeout:
+            cache.set(VendorUtils.cache_key(user_id), vendor or NO_VENDOR, timeout)
+        return vendor
+
+    @staticmethod
+    def get_request_vendor(request):
+        """Resolve the vendor of the authenticated user once per request"""
+        # DRF wraps the HttpRequest, memoize on the underlying one so every view sees it
+        http_request = getattr(request, '_request', request)
+        if not hasattr(http_request, 'food_track_vendor'):
+            user = request.user
+            http_request.food_track_vendor = (
+                VendorUtils.get_vendor_for_user(user.pk) if user and user.is_authenticated else None
+            )
+        return http_request.food_track_vendor
+
+    @staticmethod
+    def invalidate_users(user_ids):
+        """
+        Drop the cached vendor of the users once the current transaction commits, so a
+        concurrent request cannot cache the old vendor again before the change is visible.
+        """
+        keys = [VendorUtils.cache_key(user_id) for user_id in user_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
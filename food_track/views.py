@@ -1,22 +1,87 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import viewsets, status, generics
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from Accounts.authentication import ClaimsReadAuthenticationMixin
+from Accounts.models import UserProfile
+from Accounts.permissions import ADMIN_ROLE, IsAdmin, IsVendor
+from Accounts.utils import RoleUtils
 from .models import *
+from food_track.analytics import get_vendor_analytics
+from food_track.allocation import (
+    BulkAssignmentError, CargoAllocationError, allocate_cargo_to_truck, assign_trucks_to_mission
+)
+from food_track.caching import (
+    ConditionalGetMixin, ResponseCacheMixin, assignment_last_modified, mission_last_modified
+)
+from food_track.exports import EXPORT_DATASETS, export_rows, parse_export_filters, stream_csv, stream_ndjson
+from food_track.pagination import IdCursorPagination
+from food_track.planner import build_mission_load_plan
+from food_track.parsers import PositionBatchParser
+from food_track.position_format import MEDIA_TYPE as POSITION_BATCH_MEDIA_TYPE
+from food_track.positions import ingest_position_records, ingest_positions
+from food_track.spatial import locate_regions, nearest_available_trucks
+from food_track.tracks import TRACK_ZOOM_LEVELS, get_bucketed_track, get_simplified_track
 from food_track.serializers import *
+from food_track.sync import build_sync_response
+from food_track.utils import VendorUtils
 
 # Create your views here.
 
 
+def parse_date_params(query_params, params):
+    """Read optional YYYY-MM-DD query parameters, raises ValueError naming the bad one"""
+    dates = {}
+    for param in params:
+        value = query_params.get(param)
+        if not value:
+            dates[param] = None
+            continue
+        try:
+            dates[param] = datetime.date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"{param} must be a date in YYYY-MM-DD format")
+    return dates
+
+
+def parse_point_params(query_params):
+    """Required ?lat= and ?lon= query parameters in degrees, raises ValueError when they are not"""
+    try:
+        latitude = float(query_params['lat'])
+        longitude = float(query_params['lon'])
+    except (KeyError, ValueError):
+        raise ValueError("lat and lon are required and must be numbers")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError("lat must be within -90..90 and lon within -180..180")
+    return latitude, longitude
+
+
+def located_regions_response(latitude, longitude):
+    regions, vendors = locate_regions(latitude, longitude)
+    return Response({
+        "latitude": latitude,
+        "longitude": longitude,
+        "regions": regions,
+        "vendors": VendorGetSerializer(vendors, many=True).data,
+    }, status=status.HTTP_200_OK)
+
+
 # Base ViewSet to handle separate serializers for create and retrieve
 class BaseViewSet(viewsets.ModelViewSet):
     """
     Base ViewSet for handling separate serializers for create/update and retrieve operations.
     Uses pk as the lookup field.
     """
-
+    pagination_class = IdCursorPagination
     
     def create(self, request, *args, **kwargs):
         create_serializer = self.create_serializer_class(data=request.data)
@@ -41,14 +106,10 @@ class BaseViewSet(viewsets.ModelViewSet):
 
     # Helper method to get vendor for the authenticated user
     def get_vendor_for_user(self):
-        user = self.request.user
-        contact = Contact.objects.filter(user=user).first()
-        if not contact:
-            return None
-        return contact.vendor
+        return VendorUtils.get_request_vendor(self.request)
 
 
-class VendorViewSet(BaseViewSet):
+class VendorViewSet(ResponseCacheMixin, BaseViewSet):
     """
     API endpoints for managing Vendor resources.
     
@@ -56,14 +117,35 @@ class VendorViewSet(BaseViewSet):
     """
     queryset = Vendor.objects.all()
     # permission_classes = [permissions.IsAuthenticated]
+    cache_models = (Vendor,)
     create_serializer_class = VendorCreateSerializer
     get_serializer_class_attr = VendorGetSerializer
     
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def analytics(self, request):
+        """
+        Performance KPIs per vendor: missions served, units allocated and moved, average truck
+        utilization and fleet status counts.
+        Filters: ?vendor= and the mission start date range ?start_date_from=, ?start_date_to=.
+        """
+        vendor_id = request.query_params.get('vendor')
+        if vendor_id is not None and not vendor_id.isdigit():
+            return Response({"error": "vendor must be a vendor id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            dates = parse_date_params(request.query_params, ['start_date_from', 'start_date_to'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = get_vendor_analytics(
+            int(vendor_id) if vendor_id else None, dates['start_date_from'], dates['start_date_to']
+        )
+        return Response({"count": len(results), "results": results}, status=status.HTTP_200_OK)
+
 
-class ProductViewSet(BaseViewSet):
+class ProductViewSet(ResponseCacheMixin, BaseViewSet):
     """
     API endpoints for managing Product resources.
     
@@ -71,6 +153,7 @@ class ProductViewSet(BaseViewSet):
     """
     queryset = Product.objects.all()
     # permission_classes = [permissions.IsAuthenticated]
+    cache_models = (Product,)
     create_serializer_class = ProductCreateSerializer
     get_serializer_class_attr = ProductGetSerializer
 
@@ -111,9 +194,15 @@ class CargoItemsViewSet(BaseViewSet):
     create_serializer_class = CargoItemsCreateSerializer
     get_serializer_class_attr = CargoItemsGetSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.select_related('cargo__mission', 'product')
+        return queryset
+
 
 
-class RegionViewSet(BaseViewSet):
+class RegionViewSet(ResponseCacheMixin, BaseViewSet):
     """
     API endpoints for managing Region resources.
     
@@ -121,9 +210,21 @@ class RegionViewSet(BaseViewSet):
     """
     queryset = Region.objects.all()
     # permission_classes = [permissions.IsAuthenticated]
+    cache_models = (Region,)
     create_serializer_class = RegionCreateSerializer
     get_serializer_class_attr = RegionGetSerializer
 
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def locate(self, request):
+        """
+        Regions whose boundary contains the point ?lat=&lon= and the vendors operating in them.
+        """
+        try:
+            latitude, longitude = parse_point_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return located_regions_response(latitude, longitude)
+
 
 
 class ContactViewSet(BaseViewSet):
@@ -171,7 +272,7 @@ class TrucksForMissionViewSet(BaseViewSet):
 
 
 
-class MissionViewSet(BaseViewSet):
+class MissionViewSet(ResponseCacheMixin, BaseViewSet):
     """
     API endpoints for managing Mission resources.
     
@@ -181,6 +282,52 @@ class MissionViewSet(BaseViewSet):
     # permission_classes = [permissions.IsAuthenticated]
     create_serializer_class = MissionCreateSerializer
     get_serializer_class_attr = ComprehensiveMissionSerializer
+    # Everything the comprehensive mission payload is built from
+    cache_models = (
+        Mission, Cargo, CargoItems, Product, TrucksForMission, Truck, TruckCargoItem,
+        VendorMission, Vendor, Contact, User, UserProfile,
+    )
+    cached_actions = ('retrieve',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = ComprehensiveMissionSerializer.setup_eager_loading(queryset)
+        return queryset
+
+    @action(detail=False, methods=['get'], serializer_class=MissionSummarySerializer)
+    def summary(self, request):
+        """
+        Dashboard totals per mission read from the MissionSummary table.
+        Filters: ?status=, ?type=, ?start_date_from= and ?start_date_to= (YYYY-MM-DD).
+        """
+        queryset = MissionSummary.objects.all()
+        for param in ['status', 'type']:
+            if request.query_params.get(param):
+                queryset = queryset.filter(**{param: request.query_params[param]})
+
+        try:
+            dates = parse_date_params(request.query_params, ['start_date_from', 'start_date_to'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if dates['start_date_from']:
+            queryset = queryset.filter(start_date__gte=dates['start_date_from'])
+        if dates['start_date_to']:
+            queryset = queryset.filter(start_date__lte=dates['start_date_to'])
+
+        page = self.paginate_queryset(queryset)
+        serializer = MissionSummarySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], pagination_class=None)
+    def vendors(self, request, pk=None):
+        """
+        Regions containing the mission's destination and the vendors operating in them.
+        """
+        mission = get_object_or_404(Mission, pk=pk)
+        if mission.destination_latitude is None:
+            return Response({"error": "Mission has no destination coordinates"}, status=status.HTTP_400_BAD_REQUEST)
+        return located_regions_response(mission.destination_latitude, mission.destination_longitude)
 
 
 
@@ -221,7 +368,7 @@ class DocumentsAndAgreementsViewSet(BaseViewSet):
     get_serializer_class_attr = DocumentsAndAgreementsGetSerializer
 
 
-class VendorUserDataView(APIView):
+class VendorUserDataView(ClaimsReadAuthenticationMixin, APIView):
     """
     View for a vendor user to retrieve all their associated data:
     - Contacts
@@ -231,32 +378,27 @@ class VendorUserDataView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        # Get the logged in user
-        user = request.user
-        
-        # Find contact associated with this user
-        contact = Contact.objects.filter(user=user).first()
+        # Get the vendor associated with the logged in user
+        vendor = VendorUtils.get_request_vendor(request)
         
-        if not contact:
+        if not vendor:
             return Response(
                 {"error": "No vendor association found for this user"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get the vendor from the contact
-        vendor = contact.vendor
-        
         # Get all contacts for this vendor
-        vendor_contacts = Contact.objects.filter(vendor=vendor)
+        vendor_contacts = Contact.objects.filter(vendor=vendor).select_related('vendor')
         contacts_data = ContactGetSerializer(vendor_contacts, many=True).data
         
         # Get all trucks for this vendor
-        vendor_trucks = Truck.objects.filter(vendor=vendor)
+        vendor_trucks = Truck.objects.filter(vendor=vendor).select_related('vendor')
         trucks_data = TruckGetSerializer(vendor_trucks, many=True).data
         
         # Get missions through VendorMission
-        vendor_missions = VendorMission.objects.filter(vendor=vendor)
-        missions = [vm.mission for vm in vendor_missions]
+        missions = ComprehensiveMissionSerializer.setup_eager_loading(
+            Mission.objects.filter(id__in=VendorMission.objects.filter(vendor=vendor).values('mission_id'))
+        )
         missions_data = ComprehensiveMissionSerializer(missions, many=True).data
         
         response_data = {
@@ -269,6 +411,80 @@ class VendorUserDataView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class VendorSyncView(ClaimsReadAuthenticationMixin, APIView):
+    """
+    Delta sync of the vendor's contacts, trucks and missions.
+    
+    Without ?since= the full data set is returned with a cursor. Passing that cursor back
+    returns only the records changed since, and the ids of deleted ones, with the next cursor.
+    Keep requesting while has_more is true.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        since = request.query_params.get('since')
+        limit = request.query_params.get('limit')
+        if (since is not None and not since.isdigit()) or (limit is not None and not limit.isdigit()):
+            return Response({"error": "since and limit must be non-negative integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        vendor = VendorUtils.get_request_vendor(request)
+        if not vendor:
+            return Response(
+                {"error": "No vendor association found for this user"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        page_size = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+        limit = min(int(limit), page_size) if limit else page_size
+        data = build_sync_response(vendor, int(since) if since is not None else None, limit)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class VendorPositionIngestView(APIView):
+    """
+    Stores a batch of position pings for the vendor's trucks:
+    {"pings": [{"truck": 1, "timestamp": "2025-01-01T10:00:00Z", "lat": -1.28, "lon": 36.82, "speed": 54.2}]}
+    
+    Devices on slow links can send the compact binary format of food_track.position_format
+    instead, with Content-Type application/x-position-batch.
+    
+    Valid pings are stored even when others in the batch are rejected, the response lists the
+    rejected ones by their index in the batch.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, PositionBatchParser]
+    
+    def post(self, request):
+        binary = request.content_type.startswith(POSITION_BATCH_MEDIA_TYPE)
+        if binary:
+            pings = request.data
+        else:
+            pings = request.data.get('pings') if isinstance(request.data, dict) else None
+            if not isinstance(pings, list):
+                pings = []
+        if not len(pings):
+            return Response({"error": "pings must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        max_batch = getattr(settings, 'POSITION_MAX_BATCH', 5000)
+        if len(pings) > max_batch:
+            return Response({"error": f"At most {max_batch} pings per request"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        vendor = VendorUtils.get_request_vendor(request)
+        if not vendor:
+            return Response(
+                {"error": "No vendor association found for this user"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if binary:
+            accepted, rejected = ingest_position_records(vendor, pings)
+        else:
+            accepted, rejected = ingest_positions(vendor, pings)
+        return Response(
+            {"accepted": accepted, "rejected": rejected},
+            status=status.HTTP_201_CREATED if accepted else status.HTTP_400_BAD_REQUEST
+        )
+
+
 class VendorDataByIdView(APIView):
     """
     Admin view to retrieve all data for a specific vendor by ID:
@@ -289,16 +505,17 @@ class VendorDataByIdView(APIView):
             )
         
         # Get all contacts for this vendor
-        vendor_contacts = Contact.objects.filter(vendor=vendor)
+        vendor_contacts = Contact.objects.filter(vendor=vendor).select_related('vendor')
         contacts_data = ContactGetSerializer(vendor_contacts, many=True).data
         
         # Get all trucks for this vendor
-        vendor_trucks = Truck.objects.filter(vendor=vendor)
+        vendor_trucks = Truck.objects.filter(vendor=vendor).select_related('vendor')
         trucks_data = TruckGetSerializer(vendor_trucks, many=True).data
         
         # Get missions through VendorMission
-        vendor_missions = VendorMission.objects.filter(vendor=vendor)
-        missions = [vm.mission for vm in vendor_missions]
+        missions = ComprehensiveMissionSerializer.setup_eager_loading(
+            Mission.objects.filter(id__in=VendorMission.objects.filter(vendor=vendor).values('mission_id'))
+        )
         missions_data = ComprehensiveMissionSerializer(missions, many=True).data
         
         response_data = {
@@ -312,18 +529,16 @@ class VendorDataByIdView(APIView):
 
 
 # Vendor-specific views
-class VendorItemMixin:
+class VendorItemMixin(ClaimsReadAuthenticationMixin):
     """
     Mixin to filter items by the vendor associated with the authenticated user
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
     
     def get_vendor(self):
         # Get vendor associated with the authenticated user through contact
-        contact = Contact.objects.filter(user=self.request.user).first()
-        if not contact:
-            return None
-        return contact.vendor
+        return VendorUtils.get_request_vendor(self.request)
     
     def get_queryset(self):
         vendor = self.get_vendor()
@@ -415,30 +630,74 @@ class VendorMissionListView(VendorItemMixin, generics.ListAPIView):
             return Mission.objects.none()
         
         # Get missions through VendorMission
-        vendor_missions = VendorMission.objects.filter(vendor=vendor)
-        mission_ids = [vm.mission.id for vm in vendor_missions]
-        return Mission.objects.filter(id__in=mission_ids)
+        return ComprehensiveMissionSerializer.setup_eager_loading(
+            Mission.objects.filter(id__in=VendorMission.objects.filter(vendor=vendor).values('mission_id'))
+        )
 
 
-class VendorMissionDetailView(generics.RetrieveAPIView):
-    """View for retrieving a specific mission for a vendor"""
+class VendorMissionDetailView(ClaimsReadAuthenticationMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    """View for retrieving a specific mission for a vendor, supports conditional GET"""
     permission_classes = [IsAuthenticated]
     serializer_class = ComprehensiveMissionSerializer
     lookup_field = 'pk'
     lookup_url_kwarg = 'mission_id'
+    etag_prefix = 'mission'
     
-    def get_queryset(self):
+    def get_vendor_missions(self):
         # Get vendor associated with the authenticated user
-        contact = Contact.objects.filter(user=self.request.user).first()
-        if not contact:
+        vendor = VendorUtils.get_request_vendor(self.request)
+        if not vendor:
             return Mission.objects.none()
         
-        vendor = contact.vendor
-        
         # Get missions through VendorMission
-        vendor_missions = VendorMission.objects.filter(vendor=vendor)
-        mission_ids = [vm.mission.id for vm in vendor_missions]
-        return Mission.objects.filter(id__in=mission_ids)
+        return Mission.objects.filter(id__in=VendorMission.objects.filter(vendor=vendor).values('mission_id'))
+
+    def get_queryset(self):
+        return ComprehensiveMissionSerializer.setup_eager_loading(self.get_vendor_missions())
+
+    def get_last_modified(self):
+        return mission_last_modified(self.get_vendor_missions().filter(pk=self.kwargs['mission_id']))
+
+
+class VendorMissionLoadPlanView(VendorItemMixin, generics.GenericAPIView):
+    """
+    View for planning how a mission's unallocated cargo fits on the vendor's free trucks.
+    
+    Returns the plan, or creates the planned truck assignments when commit is true.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = LoadPlanRequestSerializer
+    
+    def post(self, request, mission_id):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        vendor = self.get_vendor()
+        if not vendor:
+            return Response({"error": "User is not associated with any vendor"}, status=status.HTTP_404_NOT_FOUND)
+        
+        mission = Mission.objects.filter(pk=mission_id, vendormission__vendor=vendor).first()
+        if not mission:
+            return Response({"error": "This mission is not assigned to your vendor"}, status=status.HTTP_404_NOT_FOUND)
+        
+        plan = build_mission_load_plan(vendor, mission)
+        if not serializer.validated_data['commit']:
+            return Response(plan, status=status.HTTP_200_OK)
+        
+        if not plan['assignments']:
+            return Response({"error": "No cargo left to plan for this mission"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Committing re-validates the plan under row locks
+        try:
+            truck_missions = assign_trucks_to_mission(vendor, mission, plan['assignments'])
+        except BulkAssignmentError as error:
+            return Response({"results": error.results}, status=status.HTTP_409_CONFLICT)
+        
+        plan['results'] = [
+            {'truck': truck_mission.truck_id, 'id': truck_mission.id, 'assignment_id': truck_mission.unique_id}
+            for truck_mission in truck_missions
+        ]
+        return Response(plan, status=status.HTTP_201_CREATED)
 
 
 # Vendor TrucksForMission Views
@@ -494,18 +753,58 @@ class VendorTrucksForMissionListCreateView(VendorItemMixin, generics.ListCreateA
         serializer.save(vendor=vendor)
 
 
-class VendorTrucksForMissionDetailView(VendorItemMixin, generics.RetrieveUpdateDestroyAPIView):
+class VendorTrucksForMissionBulkCreateView(VendorItemMixin, generics.GenericAPIView):
+    """View for assigning many trucks with their cargo to a mission in one request"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = TrucksForMissionBulkCreateSerializer
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        vendor = self.get_vendor()
+        if not vendor:
+            return Response({"error": "User is not associated with any vendor"}, status=status.HTTP_404_NOT_FOUND)
+        
+        # Check if the vendor is assigned to this mission
+        mission = Mission.objects.filter(pk=serializer.validated_data['mission']).first()
+        if not mission or not VendorMission.objects.filter(vendor=vendor, mission=mission).exists():
+            return Response({"error": "This mission is not assigned to your vendor"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            truck_missions = assign_trucks_to_mission(vendor, mission, serializer.validated_data['assignments'])
+        except BulkAssignmentError as error:
+            return Response({"results": error.results}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = [
+            {
+                'index': index,
+                'truck': truck_mission.truck_id,
+                'id': truck_mission.id,
+                'assignment_id': truck_mission.unique_id,
+                'assigned_load': truck_mission.assigned_load,
+            }
+            for index, truck_mission in enumerate(truck_missions)
+        ]
+        return Response({"results": results}, status=status.HTTP_201_CREATED)
+
+
+class VendorTrucksForMissionDetailView(ConditionalGetMixin, VendorItemMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
-    """View for retrieving, updating and deleting a vendor's truck-mission assignment"""
+    """View for retrieving, updating and deleting a vendor's truck-mission assignment, supports conditional GET"""
     model = TrucksForMission
     lookup_field = 'pk'
     lookup_url_kwarg = 'assignment_id'
+    etag_prefix = 'assignment'
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return TrucksForMissionCreateSerializer
         return TrucksForMissionGetSerializer
 
+    def get_last_modified(self):
+        return assignment_last_modified(super().get_queryset().filter(pk=self.kwargs['assignment_id']))
+
 
 class VendorTrucksForMissionCargoView(generics.UpdateAPIView):
     """View for assigning cargo items to a truck for a mission"""
@@ -516,11 +815,11 @@ class VendorTrucksForMissionCargoView(generics.UpdateAPIView):
     
     def get_queryset(self):
         # Get vendor associated with the authenticated user
-        contact = Contact.objects.filter(user=self.request.user).first()
-        if not contact:
+        vendor = VendorUtils.get_request_vendor(self.request)
+        if not vendor:
             return TrucksForMission.objects.none()
         
-        return TrucksForMission.objects.filter(vendor=contact.vendor)
+        return TrucksForMission.objects.filter(vendor=vendor)
     
     def update(self, request, *args, **kwargs):
         trucks_for_mission = self.get_object()
@@ -534,86 +833,177 @@ class VendorTrucksForMissionCargoView(generics.UpdateAPIView):
             )
         
         # Verify the mission is assigned to this vendor
-        vendor = trucks_for_mission.vendor
-        mission = trucks_for_mission.mission
-        vendor_mission = VendorMission.objects.filter(vendor=vendor, mission=mission).exists()
+        vendor_mission = VendorMission.objects.filter(
+            vendor_id=trucks_for_mission.vendor_id, mission_id=trucks_for_mission.mission_id
+        ).exists()
         if not vendor_mission:
             return Response(
                 {"error": "This mission is not assigned to your vendor"}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Verify cargo items belong to the mission
-        mission_cargo = Cargo.objects.filter(mission=trucks_for_mission.mission).first()
-        if not mission_cargo:
+        # Verify the mission has cargo to allocate
+        if not Cargo.objects.filter(mission_id=trucks_for_mission.mission_id).exists():
             return Response(
                 {"error": "No cargo found for this mission"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Process each cargo item
-        errors = []
-        cargo_item_ids = [item.get('cargo_item_id') for item in cargo_items if item.get('cargo_item_id')]
-        
-        # Remove any cargo items no longer in the list
-        TruckCargoItem.objects.filter(truck_mission=trucks_for_mission).exclude(
-            cargo_item__unique_id__in=cargo_item_ids
-        ).delete()
-        
-        # Update or create cargo items
-        for item_data in cargo_items:
-            if not item_data.get('cargo_item_id') or not item_data.get('quantity'):
-                errors.append(f"Each cargo item must have cargo_item_id and quantity")
-                continue
-                
-            try:
-                cargo_item = CargoItems.objects.get(
-                    unique_id=item_data['cargo_item_id'],
-                    cargo=mission_cargo
-                )
-            except CargoItems.DoesNotExist:
-                errors.append(f"Cargo item with ID {item_data['cargo_item_id']} not found or doesn't belong to this mission")
-                continue
-                
-            quantity = int(item_data['quantity'])
-            
-            # Check if quantity is valid
-            other_allocations = TruckCargoItem.objects.filter(
-                cargo_item=cargo_item
-            ).exclude(truck_mission=trucks_for_mission).aggregate(
-                models.Sum('transferring_quantity')
-            )['transferring_quantity__sum'] or 0
-            
-            available = cargo_item.quantity - other_allocations
-            if quantity > available:
-                errors.append(f"Cargo item {cargo_item.product.name} only has {available} units available")
-                continue
-                
-            # Update or create the truck cargo item
-            TruckCargoItem.objects.update_or_create(
-                truck_mission=trucks_for_mission,
-                cargo_item=cargo_item,
-                defaults={'transferring_quantity': quantity}
-            )
-        
-        if errors:
-            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        # Validate and write the whole cargo list in one locked transaction
+        try:
+            trucks_for_mission = allocate_cargo_to_truck(trucks_for_mission, cargo_items)
+        except CargoAllocationError as error:
+            return Response({"errors": error.errors}, status=status.HTTP_400_BAD_REQUEST)
             
         # Return updated truck-mission data
         serializer = self.get_serializer(trucks_for_mission)
         return Response(serializer.data)
 
 
-class VendorTruckCargoListView(generics.ListAPIView):
+class VendorTrucksForMissionTrackView(VendorItemMixin, generics.GenericAPIView):
+    """
+    Track of a vendor's truck assignment over the days of its mission, as [epoch seconds, lat, lon] points.
+    
+    ?method=simplify (default) applies Douglas–Peucker at the tolerance of one pixel at ?zoom=
+    (0-18, default 12). ?method=bucket averages the pings of each ?bucket= seconds (default 60).
+    Either way at most TRACK_MAX_POINTS points are returned, however many pings were stored.
+    """
+    model = TrucksForMission
+    
+    def get(self, request, assignment_id):
+        method = request.query_params.get('method', 'simplify')
+        if method not in ['simplify', 'bucket']:
+            return Response({"error": "method must be simplify or bucket"}, status=status.HTTP_400_BAD_REQUEST)
+        zoom = request.query_params.get('zoom', '12')
+        if not zoom.isdigit() or int(zoom) not in TRACK_ZOOM_LEVELS:
+            return Response(
+                {"error": f"zoom must be between {TRACK_ZOOM_LEVELS[0]} and {TRACK_ZOOM_LEVELS[-1]}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bucket = request.query_params.get('bucket', '60')
+        if not bucket.isdigit() or int(bucket) < 1:
+            return Response({"error": "bucket must be a positive number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        truck_mission = self.get_queryset().select_related('mission').filter(pk=assignment_id).first()
+        if not truck_mission:
+            return Response({"error": "Truck assignment not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        if method == 'simplify':
+            track = get_simplified_track(truck_mission, int(zoom))
+        else:
+            track = get_bucketed_track(truck_mission, int(bucket))
+        return Response({'assignment_id': truck_mission.pk, 'method': method, **track}, status=status.HTTP_200_OK)
+
+
+class VendorTruckCargoListView(ClaimsReadAuthenticationMixin, generics.ListAPIView):
     """View for listing all truck cargo assignments for a vendor"""
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
     serializer_class = TruckCargoAssignmentSerializer
     
     def get_queryset(self):
         # Get vendor associated with the authenticated user
-        contact = Contact.objects.filter(user=self.request.user).first()
-        if not contact:
+        vendor = VendorUtils.get_request_vendor(self.request)
+        if not vendor:
             return TrucksForMission.objects.none()
         
         # Get all truck-mission assignments for the vendor
-        return TrucksForMission.objects.filter(vendor=contact.vendor)
+        return TrucksForMission.objects.filter(vendor=vendor)
+
+
+class ExportView(APIView):
+    """
+    Streams missions, cargo items or truck cargo allocations as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and written as they arrive, so memory use does not
+    depend on the size of the export. Use ?output=csv for CSV, NDJSON is the default.
+    Admins export every row, vendors only the rows of their own missions and trucks.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin | IsVendor]
+    
+    def get(self, request, dataset):
+        if dataset not in EXPORT_DATASETS:
+            return Response(
+                {"error": f"Unknown export {dataset}, expected one of {', '.join(EXPORT_DATASETS)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ['ndjson', 'csv']:
+            return Response({"error": "output must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            filters = parse_export_filters(dataset, request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        vendor = None
+        if not RoleUtils.user_has_role(request.user.pk, ADMIN_ROLE):
+            vendor = VendorUtils.get_request_vendor(request)
+            if not vendor:
+                return Response({"error": "No vendor association found for this user"}, status=status.HTTP_403_FORBIDDEN)
+        
+        fields, rows = export_rows(dataset, filters, vendor)
+        if output == 'csv':
+            response = StreamingHttpResponse(stream_csv(fields, rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(fields, rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+        return response
+
+
+class NearestTrucksView(APIView):
+    """
+    The ?k= (10 by default) available trucks nearest to ?lat=&lon=, or to the departure of
+    ?mission=, closest first. ?vendor= keeps one vendor's trucks.
+
+    Available trucks are active, have reported a position and are not assigned to a pending
+    or active mission. They are looked up in an in-process grid index of their latest
+    positions, which is at most TRUCK_INDEX_TIMEOUT seconds old.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        k = params.get('k', '10')
+        vendor_id = params.get('vendor')
+        mission_id = params.get('mission')
+        if not k.isdigit() or not 1 <= int(k) <= getattr(settings, 'NEAREST_TRUCKS_MAX', 100):
+            return Response(
+                {"error": f"k must be between 1 and {getattr(settings, 'NEAREST_TRUCKS_MAX', 100)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if vendor_id is not None and not vendor_id.isdigit():
+            return Response({"error": "vendor must be a vendor id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if mission_id is not None:
+            if not mission_id.isdigit():
+                return Response({"error": "mission must be a mission id"}, status=status.HTTP_400_BAD_REQUEST)
+            mission = get_object_or_404(Mission, pk=mission_id)
+            if mission.dept_latitude is None:
+                return Response({"error": "Mission has no departure coordinates"}, status=status.HTTP_400_BAD_REQUEST)
+            latitude, longitude = mission.dept_latitude, mission.dept_longitude
+        else:
+            try:
+                latitude, longitude = parse_point_params(params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        nearest = nearest_available_trucks(latitude, longitude, int(k), int(vendor_id) if vendor_id else None)
+        trucks = Truck.objects.select_related('vendor').in_bulk([truck_id for truck_id, *_ in nearest])
+        results = [
+            {
+                "truck": TruckGetSerializer(trucks[truck_id]).data,
+                "latitude": truck_latitude,
+                "longitude": truck_longitude,
+                "distance_km": round(distance, 3),
+            }
+            # A truck deleted since the index was built is left out
+            for truck_id, truck_latitude, truck_longitude, distance in nearest if truck_id in trucks
+        ]
+        return Response({
+            "latitude": latitude,
+            "longitude": longitude,
+            "count": len(results),
+            "results": results,
+        }, status=status.HTTP_200_OK)
@@ -105,6 +105,31 @@ DATABASES = {
 }
 
 
+# Shared by the response cache, the vendor cache and token revocation. Set REDIS_URL so all
+# workers see the same entries, otherwise every process keeps its own in-memory cache
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Cache list and detail responses, only with the shared cache: with the in-memory fallback
+# every worker would keep serving what another worker's writes made stale
+RESPONSE_CACHE_ENABLED = bool(os.environ.get('REDIS_URL'))
+
+# Seconds a cached list or detail response is kept, entries are also dropped when the
+# models they were built from change
+RESPONSE_CACHE_TIMEOUT = 600
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -125,12 +150,64 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
 
+    # Loads the user on every request so deactivated users are rejected. Read-only vendor
+    # portal views authenticate from the token claims instead, see ClaimsReadAuthenticationMixin
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Default and upper bound for the ?page_size= query parameter on paginated endpoints
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Seconds a user's vendor stays cached, 0 resolves it from the database on every request
+VENDOR_CACHE_TIMEOUT = 300
+
+# Seconds vendor analytics stay cached per set of filters, 0 disables the cache
+VENDOR_ANALYTICS_CACHE_TIMEOUT = 300
+
+# Most changes returned by one vendor sync request, and the days of changes prune_sync_changes
+# keeps. Clients that have not synced for longer get the full data set again
+SYNC_PAGE_SIZE = 500
+SYNC_RETENTION_DAYS = 30
+
+# Live updates pushed over /api/vendor/events/ and /ws/updates/. The in-process broker only
+# reaches clients of the same worker, with REDIS_URL events go through Redis pub/sub instead
+REALTIME_REDIS_URL = os.environ.get('REDIS_URL')
+REALTIME_BROKER = (
+    'food_track.realtime.RedisBroker' if REALTIME_REDIS_URL else 'food_track.realtime.InProcessBroker'
+)
+# Events queued per client before it is told to resync, and seconds between SSE keepalives
+REALTIME_QUEUE_SIZE = 100
+REALTIME_HEARTBEAT_SECONDS = 25
+
+# Most position pings accepted per request, and how far ahead of the server clock a ping's
+# timestamp may be before it is rejected
+POSITION_MAX_BATCH = 5000
+POSITION_MAX_CLOCK_SKEW = 300
+
+# Most points in a returned truck track, the simplification tolerance in map pixels and how
+# long the tracks of completed missions stay cached
+TRACK_MAX_POINTS = 2000
+TRACK_PIXEL_TOLERANCE = 1
+TRACK_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# Grid cell size in degrees of the in-process region and truck indexes, and how long each
+# process keeps them. Region changes rebuild the region index at once in the process that
+# saved them, truck positions and assignments are picked up when the truck index expires
+GEO_INDEX_CELL_SIZE = 0.5
+REGION_INDEX_TIMEOUT = 3600
+TRUCK_INDEX_TIMEOUT = 30
+# Most trucks returned by one nearest truck query
+NEAREST_TRUCKS_MAX = 100
+
+# Per-process cache of user roles used by the permission classes, entries live for
+# ROLE_CACHE_TIMEOUT seconds at most
+ROLE_CACHE_SIZE = 10000
+ROLE_CACHE_TIMEOUT = 60
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Your Project API',
     'DESCRIPTION': 'Your project description',
@@ -148,8 +225,11 @@ SIMPLE_JWT = {
     'SIGNING_KEY': "SECRET_KEY",
 
     'AUTH_HEADER_TYPES': ('Bearer',),
-
 }
+
+# Reject revoked tokens, checked against the cache on every authenticated request.
+# Needs a cache shared by all workers to take effect everywhere.
+JWT_REVOCATION_ENABLED = False
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 